@@ -1,31 +1,9 @@
+import pandas as pd
 import streamlit as st
-from langchain_neo4j import GraphCypherQAChain, Neo4jGraph
-from langchain_anthropic import ChatAnthropic
 from langchain.prompts import PromptTemplate
-from langchain.callbacks.base import BaseCallbackHandler
 import os
-
-# Use Streamlit secrets for sensitive info
-def get_llm(api_key):
-    return ChatAnthropic(
-        model="claude-3-5-sonnet-20241022",
-        anthropic_api_key=api_key
-    )
-
-class SimpleGraphTracker(BaseCallbackHandler):
-    def __init__(self):
-        self.nodes_count = 0
-        self.context = ""
-        self.cypher = ""
-    def on_text(self, text: str, **kwargs):
-        if "MATCH" in text or "RETURN" in text:
-            self.cypher = text.strip()
-        if text.startswith("[{") and "}]" in text:
-            self.context = text.strip()
-            try:
-                self.nodes_count = len(eval(text))
-            except:
-                self.nodes_count = 0
+from backend.qa_stream import QueryStream
+from backend.resources import get_graph, get_hybrid_qa, get_llm, get_qa_chain
 
 custom_cypher_prompt = PromptTemplate.from_template("""
 You are a Cypher expert working with a knowledge graph about prompt engineering concepts, techniques, parameters, and best practices.
@@ -35,7 +13,11 @@ Generate a Cypher query to answer the following question:
 {question}
 
 Guidelines:
-- Use flexible matching with `toLower(n.id)` or `CONTAINS` instead of exact `id` matches.
+- Find entities through the full-text index, never with `toLower(n.id)` or `CONTAINS` scans:
+  `CALL db.index.fulltext.queryNodes('entity_fulltext', 'temperature OR sampling~') YIELD node, score`
+  then match relationships from `node`. Append `~` to a word to tolerate misspellings.
+- For an exact name, match the indexed `normalized_id` (lowercase, punctuation replaced by spaces):
+  `MATCH (n:__Entity__ {{normalized_id: 'top p'}})`.
 - Prefer `MATCH (a)-[r]->(b)` patterns to explore relationships.
 - Use `LIMIT` to avoid overly large result sets.
 - If the question involves multiple concepts (e.g., temperature, top-k, top-p), try to find how they relate via shared concepts or recommendations.
@@ -60,29 +42,18 @@ with st.form("db_form"):
     # neo4j_password = st.text_input("Neo4j Password", type="password", value=st.secrets.get("NEO4J_PASSWORD", ""))
     connect_clicked = st.form_submit_button("Connect DB")
 
-if 'graph' not in st.session_state:
-    st.session_state['graph'] = None
-    st.session_state['chain'] = None
-    st.session_state['tracker'] = None
+# Sessions only keep credentials; drivers, clients and chains are pooled
+# process-wide per credential set (backend.resources)
+if 'credentials' not in st.session_state:
+    st.session_state['credentials'] = None
     st.session_state['connected'] = False
 
 if connect_clicked:
     try:
-        graph = Neo4jGraph(url=neo4j_url, username=neo4j_username, password=neo4j_password, enhanced_schema=True)
-        llm = get_llm(api_key)
-        tracker = SimpleGraphTracker()
-        schema = graph.get_schema
-        chain = GraphCypherQAChain.from_llm(
-            llm=llm,
-            graph=graph,
-            verbose=True,
-            top_k=15,
-            allow_dangerous_requests=True,
-            callbacks=[tracker]
-        )
-        st.session_state['graph'] = graph
-        st.session_state['chain'] = chain
-        st.session_state['tracker'] = tracker
+        # Schema comes from the stored snapshot unless the graph changed (backend.schema_cache)
+        get_graph(neo4j_url, neo4j_username, neo4j_password, enhanced_schema=True)
+        get_llm("Anthropic", api_key, temperature=None)
+        st.session_state['credentials'] = (api_key, neo4j_url, neo4j_username, neo4j_password)
         st.session_state['connected'] = True
         st.success("Connected to Neo4j database!")
     except Exception as e:
@@ -94,17 +65,44 @@ if st.session_state['connected']:
     st.subheader("Ask a Question")
     with st.form("query_form"):
         question = st.text_input("Enter your question")
+        hybrid = st.checkbox("Vector + graph retrieval", value=True,
+                             help="Find the closest text chunks and expand their entities instead of generating Cypher")
         query_clicked = st.form_submit_button("Query")
     if query_clicked and question:
-        with st.spinner("Querying knowledge graph..."):
-            try:
-                result = st.session_state['chain'].invoke({"query": question})
-                tracker = st.session_state['tracker']
-                with st.container(border=True):
-                    st.markdown(f"**Answer:** {result['result']}")
-                    st.caption(f"Retrieved Nodes: {tracker.nodes_count}")
-                    st.caption(f"Cypher Query: {tracker.cypher}")
-            except Exception as e:
-                st.error(f"Query failed: {e}")
+        try:
+            api_key, neo4j_url, neo4j_username, neo4j_password = st.session_state['credentials']
+            graph = get_graph(neo4j_url, neo4j_username, neo4j_password, enhanced_schema=True)
+            llm = get_llm("Anthropic", api_key, temperature=None)
+            # The prompt steers entity lookups to the full-text index (backend.graph_index)
+            chain = (get_hybrid_qa if hybrid else get_qa_chain)(llm, graph, top_k=15,
+                                                               cypher_prompt=custom_cypher_prompt)
+            # Submitting a new question cancels the one still streaming in this session
+            stream = st.session_state.setdefault('qa_stream', QueryStream())
+            with st.container(border=True):
+                cypher_box, rows_box, answer_box = st.empty(), st.empty(), st.empty()
+                cypher_box.caption("Generating Cypher...")
+                answer = ""
+                for event, payload in stream.submit(chain, question):
+                    if event == "cypher":
+                        if payload['cached'] == "hybrid":
+                            cached = " (vector retrieval + graph expansion)"
+                        else:
+                            cached = f" (from cache: {payload['cached']} match)" if payload['cached'] else ""
+                        cypher_box.caption(f"Cypher Query{cached}: {payload['cypher']}")
+                        rows_box.caption("Querying knowledge graph...")
+                    elif event == "rows":
+                        rows_box.caption(f"Retrieved Nodes: {len(payload)}")
+                    elif event == "token":
+                        answer += payload
+                        answer_box.markdown(f"**Answer:** {answer}▌")
+                    elif event == "done":
+                        answer_box.markdown(f"**Answer:** {answer}")
+                        st.caption(f"Timings: {payload['trace'].timing_summary()}")
+                        # Per-stage breakdown (ms) of this question
+                        st.bar_chart(pd.Series(payload['trace'].stage_timings_ms(), name="ms"), horizontal=True)
+                    elif event == "error":
+                        raise payload
+        except Exception as e:
+            st.error(f"Query failed: {e}")
 else:
     st.info("Please connect to the Neo4j database first.")
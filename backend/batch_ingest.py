@@ -0,0 +1,256 @@
+"""
+Batch ingestion of many PDFs and CSVs into one graph.
+
+The script and the Studio ingest one file at a time, and parsing and
+chunking run in the same process (on one core) as extraction. Here the
+sources are parsed and chunked in a process pool, one source per task, so
+parsing 1,000 PDFs scales with the number of cores. Prepared chunks from
+every source are fanned into one shared extraction queue
+(backend.extraction.iter_graph_documents), so the concurrency and rate
+limits apply to the whole batch, and the results are written to one graph.
+Every chunk keeps its `source` (and page / row) metadata, so each source's
+Document nodes and manifest entries stay separate: sources can later be
+re-ingested or removed one by one.
+
+    python -m backend.batch_ingest papers/ "exports/**/*.csv" --workers 8
+
+Worker processes also drop chunks the manifest already has, so unchanged
+files cost one parse and no LLM call. CSV rows are packed into
+token-budgeted prompts (backend.packing) in the worker as well. A source
+that fails to parse is reported with its error and the rest of the batch
+goes on. Sources are named by their absolute path, so the same file keeps
+its manifest entries whatever directory the batch is started from, and the
+CLI only saves its own sources into the shared manifest.
+"""
+import argparse
+import glob
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from backend.bulk_loader import bulk_write_graph_documents
+from backend.extraction import iter_graph_documents
+from backend.graph_version import bump_graph_version
+from backend.incremental import fingerprint, record_graph_documents, remove_unseen_chunks
+from backend.packing import DEFAULT_TOKEN_BUDGET, iter_unpacked, pack_documents
+
+SOURCE_SUFFIXES = (".pdf", ".csv")
+
+
+def expand_sources(patterns):
+    """Absolute paths of the files named by `patterns` (files, directories searched recursively, globs), sorted."""
+    paths = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for root, _, files in os.walk(pattern):
+                paths.update(os.path.join(root, name) for name in files if name.lower().endswith(SOURCE_SUFFIXES))
+        elif glob.has_magic(pattern):
+            paths.update(path for path in glob.glob(pattern, recursive=True)
+                         if os.path.isfile(path) and path.lower().endswith(SOURCE_SUFFIXES))
+        elif os.path.isfile(pattern):
+            paths.add(pattern)
+        else:
+            raise FileNotFoundError(pattern)
+    return sorted(os.path.abspath(path) for path in paths)
+
+
+def prepare_source(path, known=(), chunk_budget=None, max_rows=None, pack_budget=DEFAULT_TOKEN_BUDGET):
+    """
+    Parse and chunk one source; runs in a worker process.
+
+    `known` holds the fingerprints the manifest already has for this source.
+    Returns {"source", "documents" (to extract), "fingerprints" (all chunks
+    seen), "chunks", "skipped"}.
+    """
+    from backend.chunking import TokenChunker
+    from backend.pdf_pipeline import iter_pdf_chunks
+    from backend.structured import iter_csv_documents
+
+    if path.lower().endswith(".csv"):
+        chunks = iter_csv_documents(path, path, max_rows=max_rows)
+    else:
+        chunks = iter_pdf_chunks(path, path, chunker=TokenChunker(budget=chunk_budget))
+    known = set(known)
+    fingerprints, documents = set(), []
+    for chunk in chunks:
+        chunk_hash = fingerprint(chunk.page_content)
+        if chunk_hash in fingerprints:
+            continue
+        fingerprints.add(chunk_hash)
+        if chunk_hash not in known:
+            documents.append(chunk)
+    if path.lower().endswith(".csv"):
+        documents = list(pack_documents(documents, token_budget=pack_budget))
+    return {"source": path, "documents": documents, "fingerprints": fingerprints,
+            "chunks": len(fingerprints), "skipped": len(fingerprints & known)}
+
+
+def iter_prepared_sources(paths, manifest=None, max_workers=None, max_pending=None, **options):
+    """
+    Yield prepare_source results as workers finish them (not in input
+    order). At most `max_pending` sources (default twice the workers) are
+    parsed or waiting to be consumed at a time, which bounds memory. A
+    source that could not be prepared yields {"source", "error"}.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    max_pending = max_pending or 2 * max_workers
+    paths = iter(paths)
+    # Spawned, not forked: the caller may be a threaded server
+    with ProcessPoolExecutor(max_workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        pending = {}
+
+        def _fill():
+            for path in paths:
+                known = list(manifest.sources.get(path, {})) if manifest is not None else ()
+                pending[pool.submit(prepare_source, path, known, **options)] = path
+                if len(pending) >= max_pending:
+                    return
+
+        _fill()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path = pending.pop(future)
+                try:
+                    yield future.result()
+                except Exception as e:
+                    yield {"source": path, "error": repr(e)}
+            _fill()
+
+
+def ingest_batch(paths, graph_transformer, graph, manifest=None, resolver=None, max_workers=None,
+                 chunk_budget=None, max_rows=None, max_concurrency=8, requests_per_second=None,
+                 write_batch_size=64, on_progress=None):
+    """
+    Parse `paths` in a process pool and extract and write them into `graph`.
+
+    With a `manifest`, chunks already ingested are skipped and chunks of a
+    source that disappeared from its file are removed afterwards. With a
+    `resolver` entity ids are resolved across all sources before each write.
+    `on_progress(report)` is called after every write.
+    Returns {"sources", "chunks", "added", "skipped", "removed", "failed",
+    "per_source": {source: {"chunks", "added", "skipped", "removed"} or {"error"}}}.
+    """
+    report = {"sources": 0, "chunks": 0, "added": 0, "skipped": 0, "removed": 0, "failed": 0, "per_source": {}}
+    seen = {}
+
+    def _documents():
+        # Sources arrive as workers finish them; their chunks go straight to extraction
+        for prepared in iter_prepared_sources(paths, manifest, max_workers,
+                                              chunk_budget=chunk_budget, max_rows=max_rows):
+            source = prepared["source"]
+            if "error" in prepared:
+                # Left as it was in the graph and the manifest
+                report["per_source"][source] = {"error": prepared["error"]}
+                report["failed"] += 1
+                continue
+            seen[source] = prepared["fingerprints"]
+            report["per_source"][source] = {"chunks": prepared["chunks"], "added": 0,
+                                            "skipped": prepared["skipped"], "removed": 0}
+            report["sources"] += 1
+            report["chunks"] += prepared["chunks"]
+            report["skipped"] += prepared["skipped"]
+            yield from prepared["documents"]
+
+    def _flush(batch):
+        if resolver is not None:
+            batch, resolved = resolver.resolve(batch)
+            report["entities_merged"] = report.get("entities_merged", 0) + resolved["merged"]
+        if manifest is None:
+            bulk_write_graph_documents(graph, batch, include_source=True)
+        else:
+            # Other processes' chunk removals wait until this batch is recorded
+            with manifest.lock():
+                bulk_write_graph_documents(graph, batch, include_source=True)
+                record_graph_documents(manifest, batch)
+                manifest.save()
+        for graph_document in batch:
+            report["per_source"][graph_document.source.metadata["source"]]["added"] += 1
+        report["added"] += len(batch)
+        if on_progress:
+            on_progress(report)
+
+    try:
+        batch = []
+        extracted = iter_graph_documents(graph_transformer, _documents(), max_buffered=write_batch_size,
+                                         max_concurrency=max_concurrency,
+                                         requests_per_second=requests_per_second)
+        # Packed CSV prompts are split back into one GraphDocument per row
+        for graph_document in iter_unpacked(extracted):
+            batch.append(graph_document)
+            if len(batch) >= write_batch_size:
+                _flush(batch)
+                batch = []
+        if batch:
+            _flush(batch)
+
+        if manifest is not None:
+            for source, fingerprints in seen.items():
+                removed = remove_unseen_chunks(graph, manifest, source, fingerprints)["removed"]
+                report["per_source"][source]["removed"] = removed
+                report["removed"] += removed
+    finally:
+        # Whatever was written stays recorded, so a rerun skips it
+        if manifest is not None:
+            manifest.save()
+        if resolver is not None:
+            resolver.save()
+        if report["added"] or report["removed"]:
+            bump_graph_version(graph)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest a batch of PDFs and CSVs into one graph")
+    parser.add_argument("sources", nargs="+", help="files, directories or glob patterns of PDFs / CSVs")
+    parser.add_argument("--workers", type=int, help="parsing processes (default: one per core)")
+    parser.add_argument("--provider", default="Anthropic", choices=("Anthropic", "OpenAI"))
+    parser.add_argument("--model", help="chat model (default: the provider's default)")
+    parser.add_argument("--max-concurrency", type=int, default=8, help="parallel LLM calls")
+    parser.add_argument("--requests-per-second", type=float, help="LLM request rate limit")
+    parser.add_argument("--max-rows", type=int, help="rows read per CSV (default: all)")
+    parser.add_argument("--dry-run", action="store_true", help="only list the sources that would be ingested")
+    args = parser.parse_args(argv)
+
+    paths = expand_sources(args.sources)
+    if args.dry_run:
+        print("\n".join(paths))
+        return
+    print(f"{len(paths)} sources")
+
+    from dotenv import load_dotenv
+    from langchain_experimental.graph_transformers import LLMGraphTransformer
+
+    from backend.chunking import TokenChunker
+    from backend.entity_resolution import AliasTable, EntityResolver
+    from backend.extraction_cache import CachedGraphTransformer, ExtractionCache
+    from backend.incremental import IngestionManifest
+    from backend.resources import alias_path, env_scope, get_llm, manifest_path
+    from backend.schema_cache import connect_graph
+
+    load_dotenv()
+    api_key = os.getenv("ANTHROPIC_API_KEY" if args.provider == "Anthropic" else "OPENAI_API_KEY")
+    llm = get_llm(args.provider, api_key, args.model)
+    graph = connect_graph(os.getenv("NEO4J_URI"), os.getenv("NEO4J_USERNAME"), os.getenv("NEO4J_PASSWORD"))
+    transformer = CachedGraphTransformer(LLMGraphTransformer(llm=llm, node_properties=False,
+                                                             relationship_properties=False),
+                                         ExtractionCache(), model=llm.model_name if args.provider == "OpenAI"
+                                         else llm.model, temperature=llm.temperature)
+    # Scoped: other processes ingesting into the same manifest keep their sources
+    scope = env_scope()
+    report = ingest_batch(paths, transformer, graph, manifest=IngestionManifest(manifest_path(scope), scope=paths),
+                          resolver=EntityResolver(AliasTable(alias_path(scope), merge_on_save=True)),
+                          max_workers=args.workers,
+                          chunk_budget=TokenChunker.for_llm(llm).budget, max_rows=args.max_rows,
+                          max_concurrency=args.max_concurrency, requests_per_second=args.requests_per_second,
+                          on_progress=lambda r: print(f"{r['sources']}/{len(paths)} sources parsed, "
+                                                      f"{r['added']} chunks written", end="\r", flush=True))
+    print(f"\n✅ {report['sources']} sources, {report['chunks']} chunks: added {report['added']}, "
+          f"skipped {report['skipped']} unchanged, removed {report['removed']} stale")
+    for source, entry in report["per_source"].items():
+        if "error" in entry:
+            print(f"❌ {source}: {entry['error']}")
+
+
+if __name__ == "__main__":
+    main()
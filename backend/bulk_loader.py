@@ -0,0 +1,182 @@
+"""
+Batched UNWIND writer for GraphDocuments.
+
+Neo4jGraph.add_graph_documents issues two queries per document and merges
+every node through apoc.merge.node on its own label, with no constraint
+behind the MERGE, so each write scans the whole label. This loader:
+
+- creates a uniqueness constraint on __Entity__.id / Document.id (plus an
+  id index per entity label and the search indexes of backend.graph_index)
+  up front, so every MERGE is an index seek
+- groups nodes by label and relationships by type across all documents
+- writes them with parameterised UNWIND batches of `batch_size` rows, each
+  batch committed as one transaction
+
+Entity nodes carry the shared __Entity__ label, the same convention as
+add_graph_documents(baseEntityLabel=True); it is hidden from the schema.
+They also get `normalized_id`, the key fuzzy lookups match on.
+"""
+from collections import defaultdict
+from hashlib import md5
+
+from backend import telemetry
+from backend.graph_index import BASE_ENTITY_LABEL, ensure_search_indexes, normalize_id
+
+DEFAULT_BATCH_SIZE = 1000
+
+CONSTRAINT_QUERIES = [
+    f"CREATE CONSTRAINT entity_id IF NOT EXISTS FOR (n:`{BASE_ENTITY_LABEL}`) REQUIRE n.id IS UNIQUE",
+    "CREATE CONSTRAINT document_id IF NOT EXISTS FOR (d:Document) REQUIRE d.id IS UNIQUE",
+]
+
+DOCUMENT_QUERY = """
+UNWIND $rows AS row
+MERGE (d:Document {id: row.id})
+SET d.text = row.text
+SET d += row.metadata
+"""
+
+MENTIONS_QUERY = f"""
+UNWIND $rows AS row
+MATCH (d:Document {{id: row.doc_id}})
+MATCH (n:`{BASE_ENTITY_LABEL}` {{id: row.id}})
+MERGE (d)-[:MENTIONS]->(n)
+"""
+
+
+def _escape(name):
+    return "`" + str(name).replace("`", "") + "`"
+
+
+def node_query(label):
+    return f"""
+UNWIND $rows AS row
+MERGE (n:`{BASE_ENTITY_LABEL}` {{id: row.id}})
+SET n:{_escape(label)}
+SET n += row.properties
+SET n.normalized_id = row.normalized_id
+"""
+
+
+def relationship_query(rel_type):
+    return f"""
+UNWIND $rows AS row
+MATCH (s:`{BASE_ENTITY_LABEL}` {{id: row.source}})
+MATCH (t:`{BASE_ENTITY_LABEL}` {{id: row.target}})
+MERGE (s)-[r:{_escape(rel_type)}]->(t)
+SET r += row.properties
+"""
+
+
+def ensure_constraints(graph, labels=()):
+    """Create the uniqueness constraints, per-label id indexes and search indexes (idempotent)."""
+    for query in CONSTRAINT_QUERIES:
+        graph.query(query)
+    ensure_search_indexes(graph)
+    for label in sorted(set(labels)):
+        index_name = "id_" + "".join(ch if ch.isalnum() else "_" for ch in label)
+        graph.query(f"CREATE INDEX {index_name} IF NOT EXISTS FOR (n:{_escape(label)}) ON (n.id)")
+
+
+def _batches(rows, batch_size):
+    for start in range(0, len(rows), batch_size):
+        yield rows[start:start + batch_size]
+
+
+def _relationship_type(rel_type):
+    # Same normalisation Neo4jGraph.add_graph_documents applies
+    return rel_type.replace(" ", "_").upper().replace("`", "")
+
+
+def group_graph_documents(graph_documents, include_source=True):
+    """
+    Collapse GraphDocuments into write rows: nodes by label, relationships by type.
+    Relationship endpoints missing from `nodes` are added so the MATCH never misses.
+    """
+    nodes = defaultdict(dict)          # label -> {id: properties}
+    relationships = defaultdict(dict)  # type -> {(source, target): properties}
+    documents = {}
+    mentions = set()
+
+    def _add_node(node):
+        label = node.type.replace("`", "")
+        properties = nodes[label].setdefault(node.id, {})
+        properties.update(node.properties or {})
+
+    for graph_document in graph_documents:
+        for node in graph_document.nodes:
+            _add_node(node)
+        for rel in graph_document.relationships:
+            _add_node(rel.source)
+            _add_node(rel.target)
+            key = (rel.source.id, rel.target.id)
+            relationships[_relationship_type(rel.type)].setdefault(key, {}).update(rel.properties or {})
+
+        source = graph_document.source
+        if include_source and source is not None:
+            if not source.metadata.get("id"):
+                source.metadata["id"] = md5(source.page_content.encode("utf-8")).hexdigest()
+            doc_id = source.metadata["id"]
+            documents[doc_id] = {"id": doc_id, "text": source.page_content, "metadata": source.metadata}
+            mentions.update((doc_id, node.id) for node in graph_document.nodes)
+
+    return {
+        "nodes": {label: [{"id": i, "properties": p} for i, p in rows.items()] for label, rows in nodes.items()},
+        "relationships": {
+            rel_type: [{"source": s, "target": t, "properties": p} for (s, t), p in rows.items()]
+            for rel_type, rows in relationships.items()
+        },
+        "documents": list(documents.values()),
+        "mentions": [{"doc_id": d, "id": i} for d, i in sorted(mentions, key=str)],
+    }
+
+
+def write_grouped_rows(graph, grouped, batch_size=DEFAULT_BATCH_SIZE, create_constraints=True):
+    """
+    Write rows shaped like group_graph_documents() output. Sources that can
+    build these rows directly (e.g. CSV schema mapping) skip GraphDocuments.
+
+    Returns counts of nodes, relationships, documents and transactions written.
+    """
+    with telemetry.span("write") as span:
+        if create_constraints:
+            ensure_constraints(graph, grouped["nodes"].keys())
+
+        transactions = 0
+
+        def _write(query, rows):
+            nonlocal transactions
+            for batch in _batches(rows, batch_size):
+                # Each graph.query call runs as a single auto-committed transaction
+                graph.query(query, {"rows": batch})
+                transactions += 1
+
+        for label, rows in grouped["nodes"].items():
+            for row in rows:
+                row.setdefault("normalized_id", normalize_id(row["id"]))
+            _write(node_query(label), rows)
+        _write(DOCUMENT_QUERY, grouped.get("documents", []))
+        _write(MENTIONS_QUERY, grouped.get("mentions", []))
+        for rel_type, rows in grouped["relationships"].items():
+            _write(relationship_query(rel_type), rows)
+
+        counts = {
+            "nodes": sum(len(rows) for rows in grouped["nodes"].values()),
+            "relationships": sum(len(rows) for rows in grouped["relationships"].values()),
+            "documents": len(grouped.get("documents", [])),
+            "transactions": transactions,
+        }
+        span.update(counts)
+    for kind in ("nodes", "relationships", "documents"):
+        telemetry.REGISTRY.inc("graphrag_rows_written_total", counts[kind], kind=kind)
+    return counts
+
+
+def bulk_write_graph_documents(graph, graph_documents, batch_size=DEFAULT_BATCH_SIZE,
+                               include_source=True, create_constraints=True):
+    """
+    Write GraphDocuments with UNWIND batches. Drop-in for
+    graph.add_graph_documents(graph_documents, include_source=True).
+    """
+    grouped = group_graph_documents(graph_documents, include_source)
+    return write_grouped_rows(graph, grouped, batch_size, create_constraints)
@@ -0,0 +1,270 @@
+"""
+Token-aware chunking of PDF pages for graph extraction.
+
+The ingestion paths used RecursiveCharacterTextSplitter with hard-coded
+character sizes (1200 in the Studio, 2200 in the script). Characters say
+little about LLM tokens, and nothing about the extraction output, which is
+what gets truncated at the model's `max_tokens`. TokenChunker instead:
+
+- derives the chunk budget from the LLM's output limit (`token_budget`):
+  extraction output grows roughly in proportion to its input, so the input
+  is capped at `safety * max_output_tokens / output_ratio` tokens;
+- drops header and footer lines repeated across pages (running titles, page
+  numbers) before they are paid for once per chunk;
+- packs whole paragraphs, in order, up to the budget. Section headings
+  start a new chunk (short sections are grouped), page breaks are only
+  crossed between paragraphs, and paragraphs larger than the budget are
+  split at sentences;
+- can `estimate` the LLM calls and tokens of a file before any call is made.
+
+No overlap is added: extraction works on self-contained paragraphs, and
+overlap would only be extracted twice.
+"""
+import re
+from collections import Counter
+
+from langchain_core.documents import Document
+
+from utils.tokens import count_tokens
+
+DEFAULT_MAX_OUTPUT_TOKENS = 4096
+# Extraction output tokens per input token; entity-dense text comes close to 1
+DEFAULT_OUTPUT_RATIO = 1.0
+DEFAULT_SAFETY = 0.8
+# Larger chunks extract fewer relationships per entity; cap them even when
+# the output limit would allow more
+DEFAULT_MAX_CHUNK_TOKENS = 4000
+# LLMGraphTransformer's instructions and tool schema, sent with every chunk
+FALLBACK_PROMPT_TOKENS = 1000
+
+_DIGITS_RE = re.compile(r"\d+")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(])")
+_HEADING_RE = re.compile(
+    r"^(?:(?i:chapter|section|part|appendix)\s+[\dIVXLC]+\b.*"  # Chapter 3 ..., Part II
+    r"|\d+(?:\.\d+)*\.?\s+[A-Z][^.!?]{0,80}"                    # 2.1 Sampling parameters
+    r"|[A-Z][A-Z0-9 ,:&'-]{3,60})$"                             # SAMPLING PARAMETERS
+)
+
+
+def token_budget(max_output_tokens=None, output_ratio=DEFAULT_OUTPUT_RATIO, safety=DEFAULT_SAFETY,
+                 max_chunk_tokens=DEFAULT_MAX_CHUNK_TOKENS):
+    """Largest chunk (in tokens) whose extraction should fit in max_output_tokens."""
+    max_output_tokens = max_output_tokens or DEFAULT_MAX_OUTPUT_TOKENS
+    return max(200, min(max_chunk_tokens, int(max_output_tokens * safety / output_ratio)))
+
+
+def llm_output_limit(llm):
+    """The chat model's max_tokens (ChatAnthropic / ChatOpenAI), if set."""
+    for name in ("max_tokens", "max_tokens_to_sample"):
+        value = getattr(llm, name, None)
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def extraction_prompt_tokens():
+    try:
+        from langchain_experimental.graph_transformers.llm import get_default_prompt
+    except ImportError:
+        return FALLBACK_PROMPT_TOKENS
+    prompt = get_default_prompt().format(input="")
+    # The tool schema adds roughly as much again as the default prompt
+    return max(FALLBACK_PROMPT_TOKENS, 2 * count_tokens(prompt))
+
+
+def is_heading(line):
+    line = line.strip()
+    return 3 <= len(line) <= 90 and not line.endswith((".", ",", ";")) and bool(_HEADING_RE.match(line))
+
+
+def _line_key(line):
+    # Page numbers change from page to page; the rest of a running header does not
+    return _DIGITS_RE.sub("#", line.strip().lower())
+
+
+class BoilerplateFilter:
+    """
+    Learns repeated header/footer lines from the first `sample_pages` pages
+    and strips them from every page. A line is boilerplate when it is among
+    the first or last `edge_lines` lines of at least `min_fraction` of the
+    sampled pages.
+    """
+
+    def __init__(self, sample_pages=20, edge_lines=3, min_fraction=0.5, min_pages=3):
+        self.sample_pages = sample_pages
+        self.edge_lines = edge_lines
+        self.min_fraction = min_fraction
+        self.min_pages = min_pages
+        self.keys = set()
+        self.removed = 0
+
+    def learn(self, pages):
+        counts = Counter()
+        for page in pages:
+            lines = [line for line in page.page_content.splitlines() if line.strip()]
+            counts.update({_line_key(line) for line in lines[:self.edge_lines] + lines[-self.edge_lines:]})
+        if len(pages) >= self.min_pages:
+            self.keys = {key for key, n in counts.items() if n >= self.min_fraction * len(pages)}
+
+    def clean(self, page):
+        lines = page.page_content.splitlines()
+        content = [i for i, line in enumerate(lines) if line.strip()]
+        edges = set(content[:self.edge_lines] + content[-self.edge_lines:])
+        kept = [line for i, line in enumerate(lines) if not (i in edges and _line_key(line) in self.keys)]
+        self.removed += len(lines) - len(kept)
+        return Document(page_content="\n".join(kept), metadata=page.metadata)
+
+    def __call__(self, pages):
+        """Stream cleaned pages; only the sample is held back while learning."""
+        pages = iter(pages)
+        sample = []
+        for page in pages:
+            sample.append(page)
+            if len(sample) >= self.sample_pages:
+                break
+        self.learn(sample)
+        for page in sample:
+            yield self.clean(page)
+        for page in pages:
+            yield self.clean(page)
+
+
+def iter_paragraphs(pages):
+    """
+    Yield (page, is_section_start, text) for every paragraph. Lines are
+    joined with spaces (hyphenated line breaks are rejoined) and a heading
+    line starts a new section.
+    """
+    for page in pages:
+        page_number = page.metadata.get("page", 0)
+        lines, section_start = [], False
+
+        def _flush():
+            text = " ".join(lines).strip()
+            lines.clear()
+            return text
+
+        for raw in page.page_content.splitlines():
+            line = raw.strip()
+            if not line:
+                text = _flush()
+                if text:
+                    yield page_number, section_start, text
+                    section_start = False
+                continue
+            if is_heading(line):
+                text = _flush()
+                if text:
+                    yield page_number, section_start, text
+                section_start = True
+            if lines and lines[-1].endswith("-") and line[:1].islower():
+                lines[-1] = lines[-1][:-1] + line
+            else:
+                lines.append(line)
+        text = _flush()
+        if text:
+            yield page_number, section_start, text
+
+
+def _split_oversized(text, budget, count):
+    """Sentences, then word windows, of at most `budget` tokens."""
+    pieces, current, current_tokens = [], [], 0
+    for sentence in _SENTENCE_RE.split(text):
+        tokens = count(sentence)
+        if tokens > budget:
+            words = sentence.split()
+            step = max(1, len(words) * budget // tokens)
+            parts = [" ".join(words[i:i + step]) for i in range(0, len(words), step)]
+        else:
+            parts = [sentence]
+        for part in parts:
+            part_tokens = count(part)
+            if current and current_tokens + part_tokens > budget:
+                pieces.append(" ".join(current))
+                current, current_tokens = [], 0
+            current.append(part)
+            current_tokens += part_tokens + 1  # joining space; keeps the sum an upper bound
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+class TokenChunker:
+    """
+    `min_chunk_tokens` (default a quarter of the budget) lets short sections
+    share a chunk: a heading only closes the current chunk once it holds that
+    many tokens, so a run of one-paragraph sections does not cost one LLM
+    call each.
+    """
+
+    def __init__(self, budget=None, max_output_tokens=None, count=count_tokens, boilerplate=True,
+                 min_chunk_tokens=None, **budget_kwargs):
+        self.budget = budget or token_budget(max_output_tokens, **budget_kwargs)
+        self.min_chunk_tokens = self.budget // 4 if min_chunk_tokens is None else min_chunk_tokens
+        self.count = count
+        self.boilerplate = boilerplate
+        self.filter = None
+
+    @classmethod
+    def for_llm(cls, llm, **kwargs):
+        """Chunker whose budget fits the extraction output in the LLM's max_tokens."""
+        return cls(max_output_tokens=llm_output_limit(llm), **kwargs)
+
+    def iter_chunks(self, pages, source):
+        """Yield chunk Documents with `page` (first page), `page_end` and `tokens` metadata."""
+        if self.boilerplate:
+            self.filter = BoilerplateFilter()
+            pages = self.filter(pages)
+        parts, tokens, first_page, last_page = [], 0, None, None
+
+        def _chunk():
+            content = "\n".join(parts)
+            return Document(page_content=content, metadata={
+                "page": first_page, "page_end": last_page, "source": source, "tokens": self.count(content),
+            })
+
+        for page, section_start, text in iter_paragraphs(pages):
+            text_tokens = self.count(text)
+            pieces = [(text, text_tokens)] if text_tokens <= self.budget else [
+                (piece, self.count(piece)) for piece in _split_oversized(text, self.budget, self.count)
+            ]
+            for piece, piece_tokens in pieces:
+                if parts and ((section_start and tokens >= self.min_chunk_tokens)
+                              or tokens + piece_tokens > self.budget):
+                    yield _chunk()
+                    parts, tokens = [], 0
+                if not parts:
+                    first_page = page
+                parts.append(piece)
+                tokens += piece_tokens + 1
+                last_page = page
+                section_start = False
+        if parts:
+            yield _chunk()
+
+    def estimate(self, pages, source="", prompt_tokens=None, output_ratio=DEFAULT_OUTPUT_RATIO):
+        """
+        Chunk without calling the LLM and report what extraction would cost:
+        {"pages", "chunks" (= LLM calls), "chunk_tokens", "input_tokens"
+        (chunks plus the prompt sent with each), "expected_output_tokens",
+        "largest_chunk", "budget", "boilerplate_lines_removed"}.
+        """
+        prompt_tokens = extraction_prompt_tokens() if prompt_tokens is None else prompt_tokens
+        seen_pages = set()
+
+        def _pages():
+            for page in pages:
+                seen_pages.add(page.metadata.get("page", len(seen_pages)))
+                yield page
+
+        sizes = [chunk.metadata["tokens"] for chunk in self.iter_chunks(_pages(), source)]
+        return {
+            "pages": len(seen_pages),
+            "chunks": len(sizes),
+            "chunk_tokens": sum(sizes),
+            "input_tokens": sum(sizes) + prompt_tokens * len(sizes),
+            "expected_output_tokens": int(sum(sizes) * output_ratio),
+            "largest_chunk": max(sizes, default=0),
+            "budget": self.budget,
+            "boilerplate_lines_removed": self.filter.removed if self.filter else 0,
+        }
@@ -0,0 +1,428 @@
+"""
+Precomputed community and hub summaries for broad questions.
+
+A broad question ("prompting techniques") makes the generated Cypher walk
+variable-length paths at query time, and the answer prompt then gets the
+first `top_k` raw rows of a large result. build_community_summaries runs
+offline, after ingestion, instead:
+
+1. reads the entity graph once (keyset-paged on the indexed `id`);
+2. detects communities: Louvain when networkx is installed, label
+   propagation (pure Python) otherwise or on request;
+3. writes one compact summary per community (size, entity types, central
+   entities, strongest relations inside it) and one per high-degree entity
+   (its neighbours by relationship type, hop-bounded, default two hops);
+4. embeds the summaries into a local vector index next to them
+   (.graphrag_cache/communities, stamped with the graph version).
+
+CommunityGraphQA answers a question from the best-matching summaries, one
+embedding call and no database query, and falls back to its wrapped chain
+(HybridGraphQA or CachedGraphQA) when no summary scores `min_score`. Only
+the entity names, types and relations of a summary are embedded, not its
+wording ("Community of N entities", "is connected to"), which every summary
+shares and would otherwise match any question phrased like it; a hub
+summary is only used when the question names its entity. Summaries are only
+as fresh as the last build: once the graph version moved on (`stale()`),
+questions go to the wrapped chain until they are rebuilt.
+
+    python -m backend.communities build
+    python -m backend.communities show
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from collections import Counter, defaultdict, deque
+
+import numpy as np
+
+from backend.bulk_loader import DEFAULT_BATCH_SIZE
+from backend.graph_index import BASE_ENTITY_LABEL, normalize_id
+from backend.graph_version import get_graph_version
+from backend.hybrid_retriever import VectorIndex, _model_name, _unit
+from backend.qa_trace import QueryTrace, StageTimer
+
+DEFAULT_COMMUNITY_DIR = os.getenv("GRAPHRAG_COMMUNITIES", os.path.join(".graphrag_cache", "communities"))
+
+ENTITY_PAGE_QUERY = f"""
+MATCH (n:`{BASE_ENTITY_LABEL}`)
+WHERE n.id > $after
+WITH n ORDER BY n.id LIMIT $limit
+RETURN n.id AS id, [l IN labels(n) WHERE l <> '{BASE_ENTITY_LABEL}'][0] AS label,
+       [(n)-[r]->(m:`{BASE_ENTITY_LABEL}`) | [type(r), m.id]] AS out
+"""
+
+COMMUNITY_PROMPT = """Summarize this group of related entities from a knowledge graph in at most three sentences.
+Name the central entities and say what connects them. Use only the facts given.
+
+{summary}"""
+
+
+def read_entity_graph(graph, page_size=DEFAULT_BATCH_SIZE):
+    """({entity id: label}, [(source, type, target)]) of every entity and relationship between entities."""
+    labels, triples = {}, []
+    after = ""
+    while True:
+        page = graph.query(ENTITY_PAGE_QUERY, {"after": after, "limit": page_size})
+        if not page:
+            break
+        for record in page:
+            labels[record["id"]] = record["label"] or "Entity"
+            triples.extend((record["id"], rel_type, target) for rel_type, target in record["out"])
+        after = page[-1]["id"]
+    return labels, triples
+
+
+def build_adjacency(nodes, triples):
+    """Undirected {id: {neighbour: weight}}; the weight counts the relationships between the two."""
+    adjacency = {node: {} for node in nodes}
+    for source, _, target in triples:
+        if source == target:
+            continue
+        for a, b in ((source, target), (target, source)):
+            neighbours = adjacency.setdefault(a, {})
+            neighbours[b] = neighbours.get(b, 0) + 1
+    return adjacency
+
+
+def label_propagation(adjacency, seed=42, max_iterations=100):
+    """
+    Communities by asynchronous label propagation: every node repeatedly
+    takes the label carrying the most edge weight among its neighbours
+    (ties broken at random, seeded) until no label changes.
+    """
+    rng = random.Random(seed)
+    labels = {node: node for node in adjacency}
+    order = sorted(adjacency)
+    for _ in range(max_iterations):
+        rng.shuffle(order)
+        changed = False
+        for node in order:
+            if not adjacency[node]:
+                continue
+            weights = Counter()
+            for neighbour, weight in adjacency[node].items():
+                weights[labels[neighbour]] += weight
+            best = max(weights.values())
+            candidates = sorted(label for label, weight in weights.items() if weight == best)
+            if labels[node] in candidates:
+                continue
+            labels[node] = rng.choice(candidates)
+            changed = True
+        if not changed:
+            break
+    groups = defaultdict(set)
+    for node, label in labels.items():
+        groups[label].add(node)
+    return list(groups.values())
+
+
+def detect_communities(adjacency, method="louvain", resolution=1.0, seed=42):
+    """Communities (sets of entity ids), largest first. Louvain needs networkx; without it label propagation runs."""
+    if method not in ("louvain", "label_propagation"):
+        raise ValueError(f"Unknown community detection method: {method}")
+    if method == "louvain":
+        try:
+            import networkx as nx
+        except ImportError:
+            method = "label_propagation"
+    if method == "louvain":
+        nx_graph = nx.Graph()
+        nx_graph.add_nodes_from(adjacency)
+        nx_graph.add_weighted_edges_from((a, b, weight) for a, neighbours in adjacency.items()
+                                         for b, weight in neighbours.items() if a < b)
+        communities = nx.community.louvain_communities(nx_graph, weight="weight", resolution=resolution, seed=seed)
+    else:
+        communities = label_propagation(adjacency, seed)
+    return sorted((set(c) for c in communities), key=lambda c: (-len(c), min(c)))
+
+
+def _within_hops(adjacency, start, hops):
+    """{node: distance} of the nodes 1..hops away from `start`."""
+    distances = {start: 0}
+    queue = deque([start])
+    while queue:
+        node = queue.popleft()
+        if distances[node] == hops:
+            continue
+        for neighbour in adjacency[node]:
+            if neighbour not in distances:
+                distances[neighbour] = distances[node] + 1
+                queue.append(neighbour)
+    del distances[start]
+    return distances
+
+
+def community_summary(index, members, labels, triples, degree, max_entities=10, max_facts=15):
+    central = sorted(members, key=lambda node: (-degree[node], node))[:max_entities]
+    types = Counter(labels.get(node, "Entity") for node in members).most_common(5)
+    facts = sorted({triple for triple in triples if triple[0] in members and triple[2] in members},
+                   key=lambda t: (-(degree[t[0]] + degree[t[2]]), t))[:max_facts]
+    text = (f"Community of {len(members)} entities ("
+            + ", ".join(f"{label} {count}" for label, count in types) + "). "
+            + "Central entities: " + ", ".join(f"{node} ({labels.get(node, 'Entity')})" for node in central) + ". "
+            + ("Key relations: " + "; ".join(f"{s} {t} {o}" for s, t, o in facts) + "." if facts else ""))
+    return {"id": f"community:{index}", "kind": "community", "size": len(members),
+            "entities": central, "types": dict(types), "facts": [list(f) for f in facts], "text": text.strip()}
+
+
+def hub_summary(node, labels, triples_by_node, adjacency, degree, community, hops=2, max_neighbours=12):
+    by_type = defaultdict(list)
+    for source, rel_type, target in triples_by_node[node]:
+        if source == node:
+            by_type[rel_type].append(target)
+        else:
+            by_type[f"{rel_type} (from)"].append(source)
+    relations = {rel_type: sorted(set(others), key=lambda n: (-degree[n], n))[:max_neighbours]
+                 for rel_type, others in sorted(by_type.items())}
+    distances = _within_hops(adjacency, node, hops)
+    farther = sorted((n for n, d in distances.items() if d > 1), key=lambda n: (-degree[n], n))[:max_neighbours]
+    text = (f"{node} ({labels.get(node, 'Entity')}) is connected to {degree[node]} entities"
+            + (f" and {len(distances) - degree[node]} more within {hops} hops" if hops > 1 else "") + ". "
+            + "; ".join(f"{rel_type}: {', '.join(others)}" for rel_type, others in relations.items()) + "."
+            + (f" Within {hops} hops: {', '.join(farther)}." if farther else ""))
+    return {"id": f"entity:{node}", "kind": "entity", "entity": node, "degree": degree[node],
+            "community": community, "relations": relations, "text": text}
+
+
+def search_text(summary):
+    """What a summary is matched on: its entities, their types and relations, none of the template text."""
+    if summary["kind"] == "entity":
+        parts = [summary["entity"]]
+        for rel_type, others in summary["relations"].items():
+            parts.append(rel_type.replace(" (from)", "").replace("_", " ").lower())
+            parts.extend(others)
+    else:
+        parts = list(summary["entities"]) + list(summary["types"])
+        for source, rel_type, target in summary["facts"]:
+            parts += [source, rel_type.replace("_", " ").lower(), target]
+    return ", ".join(dict.fromkeys(parts))
+
+
+class CommunityStore:
+    """Summaries (summaries.json) and their embeddings (vectors.npy), rebuilt as a whole."""
+
+    def __init__(self, embeddings, path=DEFAULT_COMMUNITY_DIR, backend=None):
+        self.embeddings = embeddings
+        self.path = path
+        self.backend = backend
+        self.model = _model_name(embeddings)
+        self.version = None
+        self.summaries = []
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self._index = VectorIndex(self.vectors, backend)
+        self._loaded_mtime = None
+        self.reload()
+
+    @property
+    def _meta_path(self):
+        return os.path.join(self.path, "summaries.json")
+
+    def reload(self):
+        """Pick up a build written by another process; returns True when something was (re)loaded."""
+        if not os.path.exists(self._meta_path):
+            return False
+        mtime = os.path.getmtime(self._meta_path)
+        if mtime == self._loaded_mtime:
+            return False
+        with open(self._meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        self._loaded_mtime = mtime
+        if meta.get("model") != self.model:
+            return False
+        self.version, self.summaries = meta["version"], meta["summaries"]
+        self.vectors = np.load(os.path.join(self.path, "vectors.npy"))
+        self._index = VectorIndex(self.vectors, self.backend)
+        return True
+
+    def save(self, version, summaries, method):
+        texts = [search_text(summary) for summary in summaries]
+        vectors = _unit(self.embeddings.embed_documents(texts)) if texts else np.zeros((0, 0), dtype=np.float32)
+        os.makedirs(self.path, exist_ok=True)
+        np.save(os.path.join(self.path, "vectors.npy"), vectors)
+        tmp = self._meta_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"model": self.model, "version": version, "method": method, "built": time.time(),
+                       "summaries": summaries}, f, ensure_ascii=False)
+        os.replace(tmp, self._meta_path)
+        self.reload()
+
+    def stale(self, graph):
+        return self.version != get_graph_version(graph)
+
+    def search(self, question, k=4):
+        """[(summary, cosine score)], best first."""
+        if not self.summaries:
+            return []
+        query = _unit([self.embeddings.embed_query(question)])[0]
+        return [(self.summaries[position], score) for position, score in self._index.search(query, k)]
+
+
+def build_community_summaries(graph, store, method="louvain", resolution=1.0, min_size=3,
+                              hubs=50, min_hub_degree=3, hops=2, llm=None, seed=42):
+    """
+    Detect communities over the current graph and replace the store's
+    summaries. Communities smaller than `min_size` get no summary; the
+    `hubs` highest-degree entities (with at least `min_hub_degree`
+    neighbours) get one each. With an `llm` every community summary is
+    condensed to prose (one call per community).
+    Returns {"version", "entities", "relationships", "communities", "hubs", "seconds"}.
+    """
+    started = time.perf_counter()
+    version = get_graph_version(graph)
+    labels, triples = read_entity_graph(graph)
+    adjacency = build_adjacency(labels, triples)
+    degree = {node: len(neighbours) for node, neighbours in adjacency.items()}
+    communities = [c for c in detect_communities(adjacency, method, resolution, seed) if len(c) >= min_size]
+
+    summaries, community_of = [], {}
+    for index, members in enumerate(communities):
+        summary = community_summary(index, members, labels, triples, degree)
+        if llm is not None:
+            summary["text"] = llm.invoke(COMMUNITY_PROMPT.format(summary=summary["text"])).content.strip()
+        summaries.append(summary)
+        community_of.update((node, summary["id"]) for node in members)
+
+    triples_by_node = defaultdict(list)
+    for triple in triples:
+        triples_by_node[triple[0]].append(triple)
+        triples_by_node[triple[2]].append(triple)
+    ranked = sorted((node for node in adjacency if degree[node] >= min_hub_degree), key=lambda n: (-degree[n], n))
+    for node in ranked[:hubs]:
+        summaries.append(hub_summary(node, labels, triples_by_node, adjacency, degree,
+                                     community_of.get(node), hops))
+
+    store.save(version, summaries, method)
+    return {"version": version, "entities": len(labels), "relationships": len(triples),
+            "communities": len(communities), "hubs": min(len(ranked), hubs),
+            "seconds": time.perf_counter() - started}
+
+
+class CommunityGraphQA:
+    """
+    Drop-in for CachedGraphQA / HybridGraphQA (same invoke / astream results
+    and events) that answers from precomputed summaries; "cached" is
+    "community".
+    """
+
+    def __init__(self, fallback, store, k=4, min_score=0.35, reload_ttl=5.0):
+        self.fallback = fallback
+        self.graph = fallback.graph
+        self.qa_chain = getattr(fallback, "qa_chain", None) or fallback.chain.qa_chain
+        self.store = store
+        self.k = k
+        self.min_score = min_score
+        self.reload_ttl = reload_ttl
+        self._reload_checked = 0.0
+        self._stale = False
+
+    def search(self, question):
+        """
+        [(summary, score)] of the top-k summaries scoring at least
+        min_score; hub summaries only when the question names their
+        entity. Empty while the summaries are stale.
+        """
+        now = time.monotonic()
+        if now - self._reload_checked >= self.reload_ttl:
+            self.store.reload()
+            self._stale = self.store.stale(self.graph)
+            self._reload_checked = now
+        if self._stale:
+            return []
+        named = f" {normalize_id(question)} "
+        # Rank every summary (a few hundred at most) so filtered hubs do not crowd out communities
+        hits = [(summary, score) for summary, score in self.store.search(question, len(self.store.summaries))
+                if score >= self.min_score
+                and (summary["kind"] != "entity" or f" {normalize_id(summary['entity'])} " in named)]
+        return hits[:self.k]
+
+    def _context(self, hits):
+        return [{"summary": summary["text"], "score": round(score, 3)} for summary, score in hits]
+
+    def _params(self, hits):
+        return {"summaries": [summary["id"] for summary, _ in hits]}
+
+    def invoke(self, question):
+        """Returns {"result", "cypher", "params", "context", "cached", "trace"}; cypher is None."""
+        trace = QueryTrace(question=question)
+        timer = StageTimer(trace)
+        with timer("retrieval"):
+            hits = self.search(question)
+        if not hits:
+            return self.fallback.invoke(question)
+        context, params = self._context(hits), self._params(hits)
+        with timer("answer"):
+            result = self.qa_chain.invoke({"question": question, "context": context})
+        trace.params, trace.records, trace.cached = params, context, "community"
+        return {"result": result, "cypher": None, "params": params, "context": context,
+                "cached": "community", "trace": timer.finish()}
+
+    async def astream(self, question):
+        """The event stream of CachedGraphQA.astream; the "cypher" event names the summaries used."""
+        trace = QueryTrace(question=question)
+        timer = StageTimer(trace)
+        with timer("retrieval"):
+            hits = await asyncio.to_thread(self.search, question)
+        if not hits:
+            async for event in self.fallback.astream(question):
+                yield event
+            return
+        context, params = self._context(hits), self._params(hits)
+        trace.params, trace.records, trace.cached = params, context, "community"
+        yield "cypher", {"cypher": None, "params": params, "cached": "community"}
+        yield "rows", context
+
+        answer = []
+        with timer("answer"):
+            async for chunk in self.qa_chain.astream({"question": question, "context": context}):
+                if not answer:
+                    trace.timings["first_token"] = time.perf_counter() - timer.started
+                answer.append(chunk)
+                yield "token", chunk
+        yield "done", {"result": "".join(answer), "cypher": None, "params": params,
+                       "context": context, "cached": "community", "trace": timer.finish()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute community and hub summaries of the graph")
+    parser.add_argument("--path", help="summary store directory (default: the database's under "
+                                       f"{DEFAULT_COMMUNITY_DIR})")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="detect communities and rewrite the summaries")
+    build.add_argument("--method", default="louvain", choices=("louvain", "label_propagation"))
+    build.add_argument("--resolution", type=float, default=1.0, help="Louvain resolution (higher: smaller communities)")
+    build.add_argument("--min-size", type=int, default=3, help="smallest community that gets a summary")
+    build.add_argument("--hubs", type=int, default=50, help="high-degree entities that get a summary")
+    build.add_argument("--hops", type=int, default=2, help="neighbourhood radius of hub summaries")
+    show = commands.add_parser("show", help="print the stored summaries")
+    show.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    from dotenv import load_dotenv
+
+    from backend.resources import env_scope, scoped_dir
+    from utils.embeddings import default_embeddings
+
+    load_dotenv()
+    path = args.path or scoped_dir(DEFAULT_COMMUNITY_DIR, env_scope())
+    store = CommunityStore(default_embeddings(), path=path)
+    if args.command == "show":
+        print(f"{len(store.summaries)} summaries (graph version {store.version})")
+        for summary in store.summaries[:args.limit]:
+            print(f"\n[{summary['id']}] {summary['text']}")
+        return
+
+    from backend.schema_cache import connect_graph
+
+    graph = connect_graph(os.getenv("NEO4J_URI"), os.getenv("NEO4J_USERNAME"), os.getenv("NEO4J_PASSWORD"))
+    report = build_community_summaries(graph, store, method=args.method, resolution=args.resolution,
+                                       min_size=args.min_size, hubs=args.hubs, hops=args.hops)
+    print(f"✅ {report['entities']} entities, {report['relationships']} relationships -> "
+          f"{report['communities']} communities, {report['hubs']} hubs summarized in {report['seconds']:.1f}s "
+          f"(graph version {report['version']})")
+
+
+if __name__ == "__main__":
+    main()
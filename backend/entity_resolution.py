@@ -0,0 +1,353 @@
+"""
+Entity resolution between extraction and the graph write.
+
+LLMGraphTransformer names the same entity differently from chunk to chunk
+("Top-K", "top k", "TopK"), and every surface form used to become its own
+node. `EntityResolver.resolve` maps each extracted id to a canonical id
+before the bulk loader sees it:
+
+1. blocking on a resolution key (the normalized id without spaces) merges
+   forms that differ only in case, accents, punctuation or spacing;
+2. MinHash LSH over character 3-grams of the keys finds near-duplicates
+   ("Large Language Model" / "Large Language Models") without comparing
+   all pairs: each key is hashed into `bands` buckets and only keys sharing
+   a bucket are compared. Pairs must agree on at least `threshold` of their
+   MinHash signature and on the numbers they contain ("GPT-3" never merges
+   with "GPT-4").
+
+The canonical id of a new cluster is its most mentioned surface form.
+Relationships are rewired to canonical ids; self-loops created by a merge
+are dropped. The alias table (surface id -> canonical id) is persisted, so
+later ingestions resolve new mentions to the nodes already in the graph.
+Everything is hashed in NumPy batches and bucketed with dicts, so the cost
+grows linearly with the number of distinct entities.
+"""
+import json
+import os
+import re
+import zlib
+from collections import Counter, defaultdict
+
+import numpy as np
+from langchain_community.graphs.graph_document import GraphDocument, Node, Relationship
+
+from backend.graph_index import normalize_id
+from utils.file_lock import locked
+
+DEFAULT_ALIAS_PATH = os.getenv("GRAPHRAG_ALIASES", ".graphrag_cache/aliases.json")
+
+_PRIME = (1 << 31) - 1
+_BAND_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+_DIGITS_RE = re.compile(r"\d+")
+
+
+def resolution_key(entity_id):
+    """'Top-K' / 'top k' / 'TopK' -> 'topk'."""
+    return normalize_id(entity_id).replace(" ", "")
+
+
+def shingles(key, size=3):
+    padded = f"#{key}#"
+    if len(padded) <= size:
+        return {padded}
+    return {padded[i:i + size] for i in range(len(padded) - size + 1)}
+
+
+class MinHashLSH:
+    """Banded MinHash index over strings, addressed by insertion position."""
+
+    def __init__(self, num_perm=128, bands=16, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        rng = np.random.default_rng(seed)
+        self.num_perm, self.bands, self.rows = num_perm, bands, num_perm // bands
+        self._a = rng.integers(1, _PRIME, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, num_perm, dtype=np.uint64)
+        self._buckets = [defaultdict(list) for _ in range(bands)]
+        self._band_hashes = np.zeros((0, bands), dtype=np.uint64)
+        self.signatures = np.zeros((0, num_perm), dtype=np.uint32)
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def signature_matrix(self, keys, batch_size=4096):
+        """(len(keys), num_perm) MinHash signatures of the keys' 3-gram sets."""
+        result = np.empty((len(keys), self.num_perm), dtype=np.uint32)
+        for start in range(0, len(keys), batch_size):
+            grams = [[zlib.crc32(g.encode("utf-8")) for g in shingles(key)] for key in keys[start:start + batch_size]]
+            offsets = np.cumsum([0] + [len(g) for g in grams[:-1]])
+            hashes = np.fromiter((h for g in grams for h in g), dtype=np.uint64) % _PRIME
+            permuted = (self._a[:, None] * hashes[None, :] + self._b[:, None]) % _PRIME
+            result[start:start + len(grams)] = np.minimum.reduceat(permuted, offsets, axis=1).T
+        return result
+
+    def add(self, keys):
+        """Index keys; returns their positions."""
+        first = len(self)
+        signatures = self.signature_matrix(keys)
+        banded = signatures.reshape(len(keys), self.bands, self.rows).astype(np.uint64)
+        band_hashes = np.zeros((len(keys), self.bands), dtype=np.uint64)
+        for row in range(self.rows):
+            band_hashes = band_hashes * _BAND_MULTIPLIER + banded[:, :, row]
+        for band, buckets in enumerate(self._buckets):
+            for offset, value in enumerate(band_hashes[:, band].tolist()):
+                buckets[value].append(first + offset)
+        self.signatures = np.concatenate([self.signatures, signatures])
+        self._band_hashes = np.concatenate([self._band_hashes, band_hashes])
+        return range(first, first + len(keys))
+
+    def candidates(self, position, max_bucket=64):
+        """Positions sharing a band bucket with `position`; oversized buckets are skipped."""
+        found = set()
+        for band, value in enumerate(self._band_hashes[position].tolist()):
+            bucket = self._buckets[band][value]
+            if 1 < len(bucket) <= max_bucket:
+                found.update(bucket)
+        found.discard(position)
+        return found
+
+    def similarities(self, position, others):
+        """Estimated Jaccard similarity of one indexed key to each of `others`."""
+        return (self.signatures[others] == self.signatures[position]).mean(axis=1)
+
+
+class AliasTable:
+    """
+    JSON table: {"aliases": {surface id: canonical id}, "types": {canonical id: type}}.
+
+    With merge_on_save the table is shared by concurrent ingestion
+    processes: save() adds these entries to the file as it is on disk
+    (under a lock) instead of replacing it, and EntityResolver.resolve
+    reloads it first (refresh), so every process resolves against the
+    canonical ids the others already chose.
+    """
+
+    def __init__(self, path=DEFAULT_ALIAS_PATH, merge_on_save=False):
+        self.path = path
+        self.merge_on_save = merge_on_save
+        self.aliases, self.types = self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return {}, {}
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        return data.get("aliases", {}), data.get("types", {})
+
+    def save(self, replace=False):
+        """Write the table; `replace` writes it as is even with merge_on_save (after clear())."""
+        if not self.path:
+            return
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with locked(self.path):
+            aliases, types = self.aliases, self.types
+            if self.merge_on_save and not replace:
+                aliases, types = self._load()
+                aliases.update(self.aliases)
+                types.update(self.types)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"aliases": aliases, "types": types}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+
+    def refresh(self):
+        """Adopt the entries on disk (they win over this table's); returns the on-disk aliases."""
+        aliases, types = self._load()
+        self.aliases.update(aliases)
+        self.types.update(types)
+        return aliases
+
+    def clear(self):
+        self.aliases, self.types = {}, {}
+
+
+class _Clusters:
+    """Union-find that never joins two clusters already anchored to different canonical ids."""
+
+    def __init__(self):
+        self.parent, self.anchor = {}, {}
+
+    def find(self, item):
+        self.parent.setdefault(item, item)
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+
+    def union(self, first, second):
+        first, second = self.find(first), self.find(second)
+        if first == second:
+            return False
+        anchors = self.anchor.get(first), self.anchor.get(second)
+        if None not in anchors and anchors[0] != anchors[1]:
+            return False
+        self.parent[second] = first
+        self.anchor[first] = anchors[0] or anchors[1]
+        return True
+
+
+class EntityResolver:
+    def __init__(self, alias_table=None, threshold=0.8, num_perm=128, bands=16, max_bucket=64):
+        self.alias_table = alias_table if alias_table is not None else AliasTable(None)
+        self.threshold = threshold
+        self.max_bucket = max_bucket
+        self.lsh = MinHashLSH(num_perm=num_perm, bands=bands)
+        self._keys, self._numbers = [], []
+        self._canonical_by_key = {}
+        self._position_by_key = {}
+        known = defaultdict(Counter)
+        for surface, canonical in self.alias_table.aliases.items():
+            key = resolution_key(surface)
+            if key:
+                known[key][canonical] += 1
+        for key, canonicals in known.items():
+            self._canonical_by_key[key] = canonicals.most_common(1)[0][0]
+        self._index(list(self._canonical_by_key))
+
+    def _adopt(self, aliases):
+        """Take over canonical ids chosen elsewhere (a shared alias table) for these surface ids."""
+        new_keys = []
+        for surface, canonical in aliases.items():
+            key = resolution_key(surface)
+            if not key:
+                continue
+            if key not in self._position_by_key and key not in new_keys:
+                new_keys.append(key)
+            self._canonical_by_key[key] = canonical
+        self._index(new_keys)
+
+    def _index(self, keys):
+        positions = self.lsh.add(keys)
+        for key, position in zip(keys, positions):
+            self._keys.append(key)
+            self._numbers.append(tuple(_DIGITS_RE.findall(key)))
+            self._position_by_key[key] = position
+        return positions
+
+    def canonical_id(self, entity_id):
+        """The canonical id an entity id resolves to (itself when unknown)."""
+        return self.alias_table.aliases.get(entity_id) or self._canonical_by_key.get(resolution_key(entity_id), entity_id)
+
+    def resolve(self, graph_documents):
+        """
+        Returns (graph_documents with canonical ids, report). The report
+        counts distinct entity ids seen, the canonical ids they map to, the
+        ids merged into another one and the LSH candidate pairs compared.
+
+        With a shared (merge_on_save) alias table, the table on disk is
+        adopted, the batch resolved and the table saved under one lock.
+        """
+        table = self.alias_table
+        if not (table.merge_on_save and table.path):
+            return self._resolve(graph_documents)
+        with locked(table.path):
+            self._adopt(table.refresh())
+            result = self._resolve(graph_documents)
+            table.save()
+        return result
+
+    def _resolve(self, graph_documents):
+        graph_documents = list(graph_documents)
+        mentions, types = Counter(), defaultdict(Counter)
+        for graph_document in graph_documents:
+            for node in graph_document.nodes:
+                mentions[node.id] += 1
+                types[node.id][node.type] += 1
+            for rel in graph_document.relationships:
+                for node in (rel.source, rel.target):
+                    mentions.setdefault(node.id, 0)
+                    if not types[node.id]:
+                        types[node.id][node.type] += 1
+
+        mapping, surfaces_by_key = {}, defaultdict(list)
+        for surface in mentions:
+            key = resolution_key(surface)
+            if not key:
+                mapping[surface] = surface
+            elif key in self._canonical_by_key:
+                mapping[surface] = self._canonical_by_key[key]
+            else:
+                surfaces_by_key[key].append(surface)
+
+        clusters, compared = _Clusters(), 0
+        new_positions = self._index(list(surfaces_by_key))
+        for position in new_positions:
+            clusters.find(position)
+            candidates = np.fromiter(self.lsh.candidates(position, self.max_bucket), dtype=np.int64)
+            compared += len(candidates)
+            if not len(candidates):
+                continue
+            similar = candidates[self.lsh.similarities(position, candidates) >= self.threshold]
+            for other in similar.tolist():
+                if self._numbers[position] != self._numbers[other]:
+                    continue
+                existing = self._canonical_by_key.get(self._keys[other])
+                if existing is not None:
+                    clusters.anchor.setdefault(clusters.find(other), existing)
+                clusters.union(position, other)
+
+        members = defaultdict(list)
+        for position in new_positions:
+            members[clusters.find(position)].append(position)
+        for root, positions in members.items():
+            surfaces = [surface for position in positions for surface in surfaces_by_key[self._keys[position]]]
+            canonical = clusters.anchor.get(root) or min(surfaces, key=lambda s: (-mentions[s], len(s), s))
+            for position in positions:
+                self._canonical_by_key[self._keys[position]] = canonical
+            for surface in surfaces:
+                mapping[surface] = canonical
+
+        canonical_types = self.alias_table.types
+        cluster_types = defaultdict(Counter)
+        for surface, canonical in mapping.items():
+            cluster_types[canonical].update(types[surface])
+            self.alias_table.aliases[surface] = canonical
+        for canonical, counts in cluster_types.items():
+            canonical_types.setdefault(canonical, counts.most_common(1)[0][0])
+
+        resolved = [_rewrite(graph_document, mapping, canonical_types) for graph_document in graph_documents]
+        report = {
+            "entities": len(mapping),
+            "canonical": len(set(mapping.values())),
+            "merged": sum(1 for surface, canonical in mapping.items() if surface != canonical),
+            "compared_pairs": compared,
+        }
+        return resolved, report
+
+    def save(self):
+        self.alias_table.save()
+
+
+def _rewrite(graph_document, mapping, types):
+    nodes, endpoints = {}, {}
+
+    def _canonical(node):
+        canonical = mapping.get(node.id, node.id)
+        return canonical, types.get(canonical, node.type)
+
+    for node in graph_document.nodes:
+        canonical, node_type = _canonical(node)
+        nodes.setdefault(canonical, Node(id=canonical, type=node_type, properties={}))
+        nodes[canonical].properties.update(node.properties or {})
+
+    def _endpoint(node):
+        # Relationship endpoints need not be among the document's nodes (MENTIONS)
+        canonical, node_type = _canonical(node)
+        if canonical in nodes:
+            return nodes[canonical]
+        return endpoints.setdefault(canonical, Node(id=canonical, type=node_type))
+
+    relationships = {}
+    for rel in graph_document.relationships:
+        source, target = _endpoint(rel.source), _endpoint(rel.target)
+        if source.id == target.id and rel.source.id != rel.target.id:
+            continue
+        key = (source.id, rel.type, target.id)
+        if key in relationships:
+            relationships[key].properties.update(rel.properties or {})
+        else:
+            relationships[key] = Relationship(source=source, target=target, type=rel.type,
+                                              properties=dict(rel.properties or {}))
+    return GraphDocument(nodes=list(nodes.values()), relationships=list(relationships.values()),
+                         source=graph_document.source)
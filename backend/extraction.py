@@ -0,0 +1,247 @@
+"""
+Concurrent, rate-limited extraction of GraphDocuments from LangChain documents.
+
+LLMGraphTransformer.convert_to_graph_documents runs one LLM round-trip per
+chunk, one after another. This module runs the chunks concurrently under a
+concurrency limit and a token-bucket rate limiter, retries 429/overload
+errors with exponential backoff, and hands back each GraphDocument as soon
+as its chunk finishes. Every LLM call is recorded as an `extract`
+telemetry span with its latency and input / output tokens.
+"""
+import asyncio
+import inspect
+import queue
+import random
+import threading
+import time
+from functools import lru_cache
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from backend import telemetry
+from utils.tokens import count_tokens
+
+
+# Error markers that mean "slow down and try again" rather than "give up"
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504, 529}
+# Status codes only in the SDKs' own wording: a bare "429" also matches ids, token counts and row numbers
+RETRYABLE_MESSAGES = ("rate limit", "rate_limit", "overloaded", "too many requests",
+                      "error code: 429", "error code: 529")
+
+
+class TokenBucket:
+    """
+    Async token-bucket rate limiter: `rate` requests per second with bursts
+    of up to `capacity` requests.
+    """
+
+    def __init__(self, rate, capacity=None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens=1):
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+
+def is_retryable_error(exc):
+    """True for rate-limit / overload errors from Anthropic, OpenAI or the HTTP layer."""
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    if status in RETRYABLE_STATUS_CODES:
+        return True
+    name = type(exc).__name__.lower()
+    if "ratelimit" in name or "overloaded" in name:
+        return True
+    message = str(exc).lower()
+    return any(marker in message for marker in RETRYABLE_MESSAGES)
+
+
+class _TokenUsage(BaseCallbackHandler):
+    """Sums the token usage the chat model reports for one extraction call."""
+
+    def __init__(self):
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    def on_llm_end(self, response, **kwargs):
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                self.input_tokens += usage.get("input_tokens", 0)
+                self.output_tokens += usage.get("output_tokens", 0)
+
+
+@lru_cache(maxsize=None)
+def _accepts_config(function):
+    return "config" in inspect.signature(function).parameters
+
+
+def _call_with_usage(method, document, usage):
+    function = getattr(method, "__func__", method)
+    if _accepts_config(function):
+        return method(document, {"callbacks": [usage]})
+    return method(document)
+
+
+async def _extract_one(graph_transformer, document, limiter, max_retries, base_delay, max_delay):
+    attempt = 0
+    while True:
+        if limiter is not None:
+            await limiter.acquire()
+        usage = _TokenUsage()
+        try:
+            with telemetry.span("extract", attempt=attempt, chunk_tokens=count_tokens(document.page_content)) as span:
+                try:
+                    if hasattr(graph_transformer, "aprocess_response"):
+                        return await _call_with_usage(graph_transformer.aprocess_response, document, usage)
+                    return await asyncio.to_thread(_call_with_usage, graph_transformer.process_response,
+                                                   document, usage)
+                finally:
+                    span.update(input_tokens=usage.input_tokens, output_tokens=usage.output_tokens)
+                    telemetry.record_tokens(usage.input_tokens, usage.output_tokens)
+        except Exception as e:
+            if attempt >= max_retries or not is_retryable_error(e):
+                raise
+            # Exponential backoff with full jitter
+            delay = min(max_delay, base_delay * (2 ** attempt))
+            await asyncio.sleep(random.uniform(0, delay))
+            attempt += 1
+
+
+async def aiter_graph_documents(graph_transformer, documents, max_concurrency=8,
+                                requests_per_second=None, max_retries=5,
+                                base_delay=1.0, max_delay=30.0):
+    """
+    Extract graph documents concurrently and yield them in completion order.
+
+    `documents` may be any iterable; it is consumed lazily, so at most
+    `max_concurrency` chunks are in flight at once. Generators (e.g. a PDF
+    being parsed page by page) are advanced on a worker thread so slow
+    parsing never stalls chunks that are already extracting.
+    """
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be at least 1")
+    limiter = TokenBucket(requests_per_second) if requests_per_second else None
+    lazy = not isinstance(documents, (list, tuple))
+    doc_iter = iter(documents)
+    pending = set()
+    fetch = None
+    exhausted = False
+
+    def _schedule(document):
+        pending.add(asyncio.ensure_future(_extract_one(
+            graph_transformer, document, limiter, max_retries, base_delay, max_delay
+        )))
+
+    try:
+        while True:
+            if lazy:
+                if fetch is None and not exhausted and len(pending) < max_concurrency:
+                    fetch = asyncio.ensure_future(asyncio.to_thread(next, doc_iter, _EXHAUSTED))
+            else:
+                while not exhausted and len(pending) < max_concurrency:
+                    document = next(doc_iter, _EXHAUSTED)
+                    if document is _EXHAUSTED:
+                        exhausted = True
+                    else:
+                        _schedule(document)
+            waiting = pending | ({fetch} if fetch is not None else set())
+            if not waiting:
+                return
+            done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+            if fetch in done:
+                document = fetch.result()
+                fetch = None
+                if document is _EXHAUSTED:
+                    exhausted = True
+                else:
+                    _schedule(document)
+            for task in done & pending:
+                pending.discard(task)
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+_DONE = object()
+_EXHAUSTED = object()
+
+
+def iter_graph_documents(graph_transformer, documents, max_buffered=64, **kwargs):
+    """
+    Synchronous wrapper around aiter_graph_documents for scripts and Streamlit.
+
+    The event loop runs on a background thread; finished GraphDocuments are
+    handed over through a queue as they complete. The queue holds at most
+    `max_buffered` results, so a slow consumer (e.g. the Neo4j writer)
+    throttles extraction instead of piling results up in memory.
+    """
+    results = queue.Queue(maxsize=max_buffered)
+    stop = threading.Event()
+
+    def _put(item):
+        # Block while the consumer is behind, but give up once it has gone away
+        while not stop.is_set():
+            try:
+                results.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    async def _produce():
+        agen = aiter_graph_documents(graph_transformer, documents, **kwargs)
+        try:
+            async for graph_document in agen:
+                if stop.is_set():
+                    break
+                await asyncio.to_thread(_put, graph_document)
+        finally:
+            await agen.aclose()
+
+    def _run():
+        try:
+            asyncio.run(_produce())
+        except BaseException as e:
+            _put(e)
+        finally:
+            _put(_DONE)
+
+    worker = threading.Thread(target=_run, name="graph-extraction", daemon=True)
+    worker.start()
+    try:
+        while True:
+            item = results.get()
+            if item is _DONE:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+def extract_graph_documents(graph_transformer, documents, **kwargs):
+    """Concurrent drop-in for convert_to_graph_documents (results in input order)."""
+    documents = list(documents)
+    order = {id(doc): i for i, doc in enumerate(documents)}
+    graph_documents = list(iter_graph_documents(graph_transformer, documents, **kwargs))
+    graph_documents.sort(key=lambda gd: order.get(id(gd.source), len(documents)))
+    return graph_documents
@@ -0,0 +1,206 @@
+"""
+Content-addressed on-disk cache for LLM graph extraction.
+
+Entries are keyed by hash(chunk text, model name, temperature, transformer
+config) and hold the serialized nodes and relationships of a GraphDocument,
+so re-running ingestion over unchanged PDFs / CSVs never calls the LLM again.
+
+    python -m backend.extraction_cache stats
+    python -m backend.extraction_cache invalidate [--model MODEL]
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from langchain_community.graphs.graph_document import GraphDocument, Node, Relationship
+
+DEFAULT_CACHE_PATH = os.getenv("GRAPHRAG_EXTRACTION_CACHE", ".graphrag_cache/extraction.sqlite")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def cache_key(text, model, temperature, config=""):
+    payload = json.dumps([text, model, temperature, config], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def serialize_graph_document(graph_document):
+    """Nodes and relationships only; the source Document is re-attached on load."""
+    def _node(node):
+        return {"id": node.id, "type": node.type, "properties": node.properties}
+
+    return json.dumps({
+        "nodes": [_node(n) for n in graph_document.nodes],
+        "relationships": [
+            {"source": _node(r.source), "target": _node(r.target),
+             "type": r.type, "properties": r.properties}
+            for r in graph_document.relationships
+        ],
+    }, ensure_ascii=False)
+
+
+def deserialize_graph_document(payload, source=None):
+    data = json.loads(payload)
+    return GraphDocument(
+        nodes=[Node(**n) for n in data["nodes"]],
+        relationships=[
+            Relationship(source=Node(**r["source"]), target=Node(**r["target"]),
+                         type=r["type"], properties=r["properties"])
+            for r in data["relationships"]
+        ],
+        source=source,
+    )
+
+
+class ExtractionCache:
+    """SQLite-backed LRU cache of extracted GraphDocuments, bounded by total size."""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS extractions (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS extractions_lru ON extractions(last_access)")
+        self._conn.commit()
+
+    def get(self, key, source=None):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM extractions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE extractions SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return deserialize_graph_document(row[0], source)
+
+    def put(self, key, graph_document, model=None):
+        value = serialize_graph_document(graph_document)
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO extractions (key, model, value, size, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, model, value, size, time.time()),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        # Drop least-recently-used entries until the cache fits in max_bytes
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM extractions").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute(
+                "SELECT key, size FROM extractions ORDER BY last_access").fetchall():
+            self._conn.execute("DELETE FROM extractions WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def invalidate(self, model=None):
+        """Drop every entry, or only those extracted with `model`. Returns the count removed."""
+        with self._lock:
+            if model is None:
+                cursor = self._conn.execute("DELETE FROM extractions")
+            else:
+                cursor = self._conn.execute("DELETE FROM extractions WHERE model = ?", (model,))
+            self._conn.commit()
+            return cursor.rowcount
+
+    def stats(self):
+        with self._lock:
+            entries, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM extractions").fetchone()
+        return {"entries": entries, "bytes": total, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        self._conn.close()
+
+
+def _transformer_config(graph_transformer):
+    """Fingerprint of everything besides the model that changes the extraction output."""
+    return json.dumps({
+        "allowed_nodes": getattr(graph_transformer, "allowed_nodes", None),
+        "allowed_relationships": getattr(graph_transformer, "allowed_relationships", None),
+        "strict_mode": getattr(graph_transformer, "strict_mode", None),
+        "function_call": getattr(graph_transformer, "_function_call", None),
+        "prompt": repr(getattr(getattr(graph_transformer, "chain", None), "first", None)),
+    }, sort_keys=True, default=str)
+
+
+class CachedGraphTransformer:
+    """
+    Wraps an LLMGraphTransformer so cache hits skip the LLM entirely.
+    Drop-in for convert_to_graph_documents and for backend.extraction.
+    """
+
+    def __init__(self, graph_transformer, cache, model, temperature=None):
+        self.graph_transformer = graph_transformer
+        self.cache = cache
+        self.model = model
+        self.temperature = temperature
+        self._config = _transformer_config(graph_transformer)
+
+    def _key(self, document):
+        return cache_key(document.page_content, self.model, self.temperature, self._config)
+
+    def process_response(self, document, config=None):
+        key = self._key(document)
+        cached = self.cache.get(key, source=document)
+        if cached is not None:
+            return cached
+        graph_document = self.graph_transformer.process_response(document, config)
+        self.cache.put(key, graph_document, model=self.model)
+        return graph_document
+
+    async def aprocess_response(self, document, config=None):
+        key = self._key(document)
+        cached = self.cache.get(key, source=document)
+        if cached is not None:
+            return cached
+        graph_document = await self.graph_transformer.aprocess_response(document, config)
+        self.cache.put(key, graph_document, model=self.model)
+        return graph_document
+
+    def convert_to_graph_documents(self, documents, config=None):
+        return [self.process_response(document, config) for document in documents]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the graph extraction cache")
+    parser.add_argument("--path", default=DEFAULT_CACHE_PATH, help="cache database file")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("stats", help="show entry count and size")
+    invalidate = commands.add_parser("invalidate", help="drop cached extractions after a prompt or model change")
+    invalidate.add_argument("--model", help="only drop entries extracted with this model")
+    args = parser.parse_args(argv)
+
+    cache = ExtractionCache(args.path)
+    if args.command == "stats":
+        stats = cache.stats()
+        print(f"📦 {stats['entries']} entries, {stats['bytes'] / 1e6:.1f} MB of {stats['max_bytes'] / 1e6:.0f} MB")
+    elif args.command == "invalidate":
+        removed = cache.invalidate(args.model)
+        print(f"🗑️ Removed {removed} cached extractions")
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
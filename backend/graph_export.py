@@ -0,0 +1,354 @@
+"""
+Offline export / import of extracted graphs.
+
+GraphDocuments only live between extraction and the Neo4j write, so moving
+a graph to another environment meant paying for extraction again. An export
+stores the write rows of backend.bulk_loader (nodes by label, relationships
+by type, source Documents and their MENTIONS) in one of two formats:
+
+- a Parquet directory (needs pyarrow): nodes / relationships / documents /
+  mentions tables, zstd-compressed, with dictionary-encoded label, type and
+  document id columns; properties and metadata are JSON strings
+- `*.jsonl.gz` (no extra dependency): a header listing labels and types,
+  then one compact array per row in which labels and types are indexes into
+  that header
+
+Export streams: Neo4j is read page by page and each page is appended to
+the output, so memory does not grow with the graph. Import streams the rows
+back in batches straight into write_grouped_rows, the same UNWIND fast path
+ingestion uses; no GraphDocument is rebuilt.
+
+    python -m backend.graph_export export graph_export/         # Neo4j -> Parquet
+    python -m backend.graph_export export graph.jsonl.gz
+    python -m backend.graph_export import graph_export/         # Parquet -> Neo4j
+"""
+import argparse
+import gzip
+import json
+import os
+import shutil
+import warnings
+
+from backend.bulk_loader import DEFAULT_BATCH_SIZE, ensure_constraints, group_graph_documents, write_grouped_rows
+from backend.graph_index import BASE_ENTITY_LABEL
+from backend.graph_version import META_LABEL, bump_graph_version
+
+EXPORT_VERSION = 1
+# Written (and imported) in this order so every MATCH finds its endpoints
+TABLES = ("nodes", "documents", "mentions", "relationships")
+JSONL_SUFFIX = ".jsonl.gz"
+
+NODES_PAGE_QUERY = f"""
+MATCH (n:`{BASE_ENTITY_LABEL}`)
+WHERE n.id > $after
+WITH n ORDER BY n.id LIMIT $limit
+RETURN n.id AS id, [l IN labels(n) WHERE l <> '{BASE_ENTITY_LABEL}'][0] AS label,
+       properties(n) AS properties
+"""
+
+RELATIONSHIPS_QUERY = f"""
+MATCH (s:`{BASE_ENTITY_LABEL}`)-[r]->(t:`{BASE_ENTITY_LABEL}`)
+WHERE s.id IN $ids
+RETURN s.id AS source, type(r) AS type, t.id AS target, properties(r) AS properties
+"""
+
+UNLABELED_NODES_QUERY = f"""
+MATCH (n) WHERE n.id IS NOT NULL AND NOT n:`{BASE_ENTITY_LABEL}` AND NOT n:Document AND NOT n:`{META_LABEL}`
+RETURN count(n) AS count
+"""
+
+DOCUMENTS_PAGE_QUERY = """
+MATCH (d:Document)
+WHERE d.id > $after
+WITH d ORDER BY d.id LIMIT $limit
+RETURN d.id AS id, d.text AS text, properties(d) AS properties,
+       [(d)-[:MENTIONS]->(n) | n.id] AS mentions
+"""
+
+
+def export_format(path):
+    return "jsonl" if path.endswith(JSONL_SUFFIX) else "parquet"
+
+
+def _rows_from_grouped(grouped):
+    """Flat rows per table from group_graph_documents()-shaped data."""
+    return {
+        "nodes": [{"label": label, "id": row["id"], "properties": row["properties"]}
+                  for label, rows in grouped["nodes"].items() for row in rows],
+        "relationships": [{"type": rel_type, "source": row["source"], "target": row["target"],
+                           "properties": row["properties"]}
+                          for rel_type, rows in grouped["relationships"].items() for row in rows],
+        "documents": list(grouped.get("documents", [])),
+        "mentions": list(grouped.get("mentions", [])),
+    }
+
+
+def _grouped_from_rows(table, rows):
+    grouped = {"nodes": {}, "relationships": {}, "documents": [], "mentions": []}
+    if table == "nodes":
+        for row in rows:
+            grouped["nodes"].setdefault(row["label"], []).append({"id": row["id"], "properties": row["properties"]})
+    elif table == "relationships":
+        for row in rows:
+            grouped["relationships"].setdefault(row["type"], []).append(
+                {"source": row["source"], "target": row["target"], "properties": row["properties"]})
+    else:
+        grouped[table] = rows
+    return grouped
+
+
+def iter_graph_rows(graph, page_size=DEFAULT_BATCH_SIZE):
+    """
+    Yield (table, rows) pages of every entity, relationship and Document in
+    Neo4j. Pages are keyed on the indexed `id`, so each one is an index
+    range scan. Only __Entity__ nodes are exported; legacy nodes without
+    the label are counted and warned about (backfill them first).
+    """
+    unlabeled = graph.query(UNLABELED_NODES_QUERY)
+    if unlabeled and unlabeled[0]["count"]:
+        warnings.warn(f"{unlabeled[0]['count']} nodes without the {BASE_ENTITY_LABEL} label are not exported; "
+                      "label them with `python -m backend.graph_index backfill` first", stacklevel=2)
+    after = ""
+    while True:
+        page = graph.query(NODES_PAGE_QUERY, {"after": after, "limit": page_size})
+        if not page:
+            break
+        nodes = []
+        for record in page:
+            properties = {k: v for k, v in record["properties"].items() if k not in ("id", "normalized_id")}
+            nodes.append({"label": record["label"] or "Entity", "id": record["id"], "properties": properties})
+        yield "nodes", nodes
+        yield "relationships", [
+            {"type": r["type"], "source": r["source"], "target": r["target"], "properties": r["properties"]}
+            for r in graph.query(RELATIONSHIPS_QUERY, {"ids": [record["id"] for record in page]})]
+        after = page[-1]["id"]
+    after = ""
+    while True:
+        page = graph.query(DOCUMENTS_PAGE_QUERY, {"after": after, "limit": page_size})
+        if not page:
+            break
+        documents, mentions = [], []
+        for record in page:
+            metadata = {k: v for k, v in record["properties"].items() if k != "text"}
+            documents.append({"id": record["id"], "text": record["text"], "metadata": metadata})
+            mentions.extend({"doc_id": record["id"], "id": node_id} for node_id in record["mentions"])
+        yield "documents", documents
+        yield "mentions", mentions
+        after = page[-1]["id"]
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError(f"Parquet exports need pyarrow (pip install pyarrow); "
+                          f"or use a {JSONL_SUFFIX} path, which needs nothing extra") from None
+    return pyarrow, pyarrow.parquet
+
+
+class _ParquetWriter:
+    """One zstd Parquet file per table, appended to page by page."""
+
+    def __init__(self, path):
+        self.pa, self.pq = _import_pyarrow()
+        pa = self.pa
+        encoded = pa.dictionary(pa.int32(), pa.string())
+        self.schemas = {
+            "nodes": pa.schema([("label", encoded), ("id", pa.string()), ("properties", pa.string())]),
+            "relationships": pa.schema([("type", encoded), ("source", pa.string()), ("target", pa.string()),
+                                        ("properties", pa.string())]),
+            "documents": pa.schema([("id", pa.string()), ("text", pa.string()), ("metadata", pa.string())]),
+            "mentions": pa.schema([("doc_id", encoded), ("id", pa.string())]),
+        }
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.writers = {table: self.pq.ParquetWriter(os.path.join(path, f"{table}.parquet"), schema,
+                                                     compression="zstd")
+                        for table, schema in self.schemas.items()}
+
+    def write(self, table, rows):
+        if not rows:
+            return
+        schema = self.schemas[table]
+        columns = {}
+        for field in schema:
+            values = [row[field.name] for row in rows]
+            if field.name in ("properties", "metadata"):
+                values = [json.dumps(value, ensure_ascii=False) for value in values]
+            array = self.pa.array(values, type=self.pa.string())
+            columns[field.name] = array.dictionary_encode() if self.pa.types.is_dictionary(field.type) else array
+        self.writers[table].write_table(self.pa.table(columns, schema=schema))
+
+    def close(self):
+        for writer in self.writers.values():
+            writer.close()
+
+
+class _JsonlWriter:
+    """
+    Rows go to one gzip body file per table as they come; close() writes
+    the header (the labels and types seen) as a first gzip member and
+    appends the bodies in TABLES order. gzip readers treat the members as
+    one stream.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.labels, self.types = {}, {}
+        self.bodies = {table: gzip.open(f"{path}.{table}.tmp", "wt", encoding="utf-8") for table in TABLES}
+
+    def _index(self, names, name):
+        return names.setdefault(name, len(names))
+
+    def write(self, table, rows):
+        f = self.bodies[table]
+        for r in rows:
+            if table == "nodes":
+                record = ["n", self._index(self.labels, r["label"]), r["id"], r["properties"]]
+            elif table == "documents":
+                record = ["d", r["id"], r["text"], r["metadata"]]
+            elif table == "mentions":
+                record = ["m", r["doc_id"], r["id"]]
+            else:
+                record = ["r", self._index(self.types, r["type"]), r["source"], r["target"], r["properties"]]
+            f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+    def close(self):
+        for f in self.bodies.values():
+            f.close()
+        header = {"version": EXPORT_VERSION, "labels": list(self.labels), "types": list(self.types)}
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as out:
+            out.write(gzip.compress((json.dumps(header, ensure_ascii=False) + "\n").encode("utf-8")))
+            for table in TABLES:
+                with open(f"{self.path}.{table}.tmp", "rb") as body:
+                    shutil.copyfileobj(body, out)
+                os.remove(f"{self.path}.{table}.tmp")
+        os.replace(tmp_path, self.path)
+
+
+def write_export(pages, path):
+    """Write (table, rows) pages to `path` as they come; returns row counts per table."""
+    if os.path.dirname(path.rstrip("/")):
+        os.makedirs(os.path.dirname(path.rstrip("/")), exist_ok=True)
+    writer = _JsonlWriter(path) if export_format(path) == "jsonl" else _ParquetWriter(path)
+    counts = {table: 0 for table in TABLES}
+    for table, rows in pages:
+        writer.write(table, rows)
+        counts[table] += len(rows)
+    writer.close()
+    return counts
+
+
+def export_graph_documents(graph_documents, path):
+    """Export GraphDocuments (with their source Documents) to Parquet or `.jsonl.gz`."""
+    rows = _rows_from_grouped(group_graph_documents(graph_documents, include_source=True))
+    return write_export(((table, rows[table]) for table in TABLES), path)
+
+
+def export_graph(graph, path, page_size=DEFAULT_BATCH_SIZE):
+    """Export the entities, relationships and Documents stored in Neo4j, one page in memory at a time."""
+    return write_export(iter_graph_rows(graph, page_size), path)
+
+
+def _iter_parquet(path, batch_size):
+    _, pq = _import_pyarrow()
+
+    json_columns = {"properties", "metadata"}
+    for table in TABLES:
+        for batch in pq.ParquetFile(os.path.join(path, f"{table}.parquet")).iter_batches(batch_size=batch_size):
+            rows = batch.to_pylist()
+            for row in rows:
+                for column in json_columns & row.keys():
+                    row[column] = json.loads(row[column])
+            yield table, rows
+
+
+def _iter_jsonl(path, batch_size):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        header = json.loads(f.readline())
+        labels, types = header["labels"], header["types"]
+        tables = {"n": "nodes", "d": "documents", "m": "mentions", "r": "relationships"}
+        table, rows = None, []
+        for line in f:
+            record = json.loads(line)
+            kind = tables[record[0]]
+            if rows and (kind != table or len(rows) >= batch_size):
+                yield table, rows
+                rows = []
+            table = kind
+            if kind == "nodes":
+                rows.append({"label": labels[record[1]], "id": record[2], "properties": record[3]})
+            elif kind == "documents":
+                rows.append({"id": record[1], "text": record[2], "metadata": record[3]})
+            elif kind == "mentions":
+                rows.append({"doc_id": record[1], "id": record[2]})
+            else:
+                rows.append({"type": types[record[1]], "source": record[2], "target": record[3],
+                             "properties": record[4]})
+        if rows:
+            yield table, rows
+
+
+def iter_export(path, batch_size=DEFAULT_BATCH_SIZE):
+    """Yield (table, rows) batches of an export in TABLES order."""
+    if export_format(path) == "jsonl":
+        return _iter_jsonl(path, batch_size)
+    return _iter_parquet(path, batch_size)
+
+
+def export_labels(path):
+    """Entity labels of an export, read without loading its rows."""
+    if export_format(path) == "jsonl":
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return json.loads(f.readline())["labels"]
+    _, pq = _import_pyarrow()
+    return pq.read_table(os.path.join(path, "nodes.parquet"), columns=["label"]).column("label").unique().to_pylist()
+
+
+def import_graph(graph, path, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Bulk-load an export into Neo4j. Rows are merged on their ids, so
+    importing into a graph that already holds some of them is safe.
+    Returns counts of nodes, relationships, documents and transactions.
+    """
+    ensure_constraints(graph, export_labels(path))
+    totals = {"nodes": 0, "relationships": 0, "documents": 0, "transactions": 0}
+    for table, rows in iter_export(path, batch_size):
+        counts = write_grouped_rows(graph, _grouped_from_rows(table, rows), batch_size, create_constraints=False)
+        for key in totals:
+            totals[key] += counts[key]
+    if totals["transactions"]:
+        bump_graph_version(graph)
+    return totals
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export a Neo4j knowledge graph to Parquet / JSONL, or import one")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="rows per transaction / page")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="write the graph to a Parquet directory or a .jsonl.gz file")
+    export.add_argument("path")
+    load = commands.add_parser("import", help="bulk-load an export into Neo4j")
+    load.add_argument("path")
+    args = parser.parse_args(argv)
+
+    from dotenv import load_dotenv
+
+    from backend.schema_cache import connect_graph
+
+    load_dotenv()
+    graph = connect_graph(os.getenv("NEO4J_URI"), os.getenv("NEO4J_USERNAME"), os.getenv("NEO4J_PASSWORD"))
+    if args.command == "export":
+        counts = export_graph(graph, args.path, args.batch_size)
+        print(f"📦 Exported {counts['nodes']} nodes, {counts['relationships']} relationships, "
+              f"{counts['documents']} documents to {args.path}")
+    else:
+        counts = import_graph(graph, args.path, args.batch_size)
+        print(f"✅ Imported {counts['nodes']} nodes, {counts['relationships']} relationships, "
+              f"{counts['documents']} documents in {counts['transactions']} transactions")
+
+
+if __name__ == "__main__":
+    main()
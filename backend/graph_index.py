@@ -0,0 +1,164 @@
+"""
+Search indexes for fuzzy entity lookup.
+
+The Cypher prompts used to ask for `toLower(n.id) CONTAINS '...'`, which no
+Neo4j index can serve: every question scanned every node. Instead:
+
+- every entity stores `normalized_id` (casefolded, accents and punctuation
+  stripped, whitespace collapsed), written by the bulk loader at ingestion
+  and backed by a range index, so an exact-but-forgiving match is a seek;
+- a full-text (Lucene) index `entity_fulltext` covers the entity id,
+  normalized id and text properties, and `document_fulltext` the chunk
+  text, so partial and misspelled names are served by
+  `db.index.fulltext.queryNodes`.
+
+`ensure_search_indexes` is idempotent and runs with the bulk loader's
+constraints; `backfill_normalized_ids` fills in graphs loaded before the
+property existed, and `backfill_entity_labels` gives entities written by
+the old add_graph_documents path the __Entity__ label (merging them into
+an existing entity of the same id, so the next load does not duplicate
+them).
+
+    python -m backend.graph_index backfill
+"""
+import argparse
+import os
+import re
+import unicodedata
+
+BASE_ENTITY_LABEL = "__Entity__"
+ENTITY_FULLTEXT_INDEX = "entity_fulltext"
+DOCUMENT_FULLTEXT_INDEX = "document_fulltext"
+
+# Entity properties worth matching on; properties a node lacks are ignored
+ENTITY_TEXT_PROPERTIES = ("id", "normalized_id", "name", "title", "description")
+
+SEARCH_INDEX_QUERIES = [
+    f"CREATE INDEX entity_normalized_id IF NOT EXISTS FOR (n:`{BASE_ENTITY_LABEL}`) ON (n.normalized_id)",
+    f"CREATE FULLTEXT INDEX {ENTITY_FULLTEXT_INDEX} IF NOT EXISTS FOR (n:`{BASE_ENTITY_LABEL}`) "
+    f"ON EACH [{', '.join('n.' + p for p in ENTITY_TEXT_PROPERTIES)}]",
+    f"CREATE FULLTEXT INDEX {DOCUMENT_FULLTEXT_INDEX} IF NOT EXISTS FOR (d:Document) ON EACH [d.text]",
+]
+
+MISSING_NORMALIZED_IDS_QUERY = f"""
+MATCH (n:`{BASE_ENTITY_LABEL}`) WHERE n.normalized_id IS NULL AND n.id IS NOT NULL
+RETURN elementId(n) AS element_id, n.id AS id
+LIMIT $limit
+"""
+
+SET_NORMALIZED_IDS_QUERY = """
+UNWIND $rows AS row
+MATCH (n) WHERE elementId(n) = row.element_id
+SET n.normalized_id = row.normalized_id
+"""
+
+# Legacy nodes are grouped by id and merged (with their relationships) into
+# the __Entity__ node of that id, or into one of them when there is none yet
+BACKFILL_ENTITY_LABEL_QUERY = f"""
+MATCH (n)
+WHERE n.id IS NOT NULL AND NOT n:`{BASE_ENTITY_LABEL}` AND NOT n:Document AND NOT n:`__GraphMeta__`
+WITH n LIMIT $limit
+WITH n.id AS id, collect(n) AS legacy
+OPTIONAL MATCH (e:`{BASE_ENTITY_LABEL}` {{id: id}})
+WITH CASE WHEN e IS NULL THEN legacy ELSE [e] + legacy END AS nodes, size(legacy) AS relabelled
+CALL apoc.refactor.mergeNodes(nodes, {{properties: "discard", mergeRels: true}}) YIELD node
+SET node:`{BASE_ENTITY_LABEL}`
+RETURN sum(relabelled) AS relabelled
+"""
+
+ENTITY_SEARCH_QUERY = f"""
+CALL db.index.fulltext.queryNodes('{ENTITY_FULLTEXT_INDEX}', $search, {{limit: $limit}})
+YIELD node, score
+RETURN node.id AS id, [l IN labels(node) WHERE l <> '{BASE_ENTITY_LABEL}'] AS labels, score
+"""
+
+_NON_WORD_RE = re.compile(r"[\W_]+")
+
+# Too common to narrow a full-text search
+STOP_WORDS = frozenset(
+    "a an and are as at be by can do does for from has have how in is it of on or that the "
+    "their there these this to was what when where which who whom why with".split()
+)
+
+
+def normalize_id(value):
+    """'Type-2  Diabétes' -> 'type 2 diabetes'."""
+    text = unicodedata.normalize("NFKD", str(value))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return _NON_WORD_RE.sub(" ", text.casefold()).strip()
+
+
+def fulltext_query(text, fuzzy=True, min_fuzzy_length=5):
+    """
+    Lucene query string for free text: the non-stop-words OR'ed together,
+    words of `min_fuzzy_length` or more with `~` (edit distance 2). Returns
+    "" when nothing is left to search for.
+    """
+    # normalize_id leaves only letters, digits and spaces, so nothing needs escaping
+    terms = dict.fromkeys(word for word in normalize_id(text).split() if word not in STOP_WORDS)
+    return " OR ".join(
+        word + "~" if fuzzy and len(word) >= min_fuzzy_length else word for word in terms
+    )
+
+
+def ensure_search_indexes(graph):
+    """Create the normalized-id and full-text indexes (idempotent)."""
+    for query in SEARCH_INDEX_QUERIES:
+        graph.query(query)
+
+
+def backfill_normalized_ids(graph, batch_size=5000):
+    """Store normalized_id on entities written before it existed. Returns #updated."""
+    updated = 0
+    while True:
+        rows = graph.query(MISSING_NORMALIZED_IDS_QUERY, {"limit": batch_size})
+        if not rows:
+            return updated
+        graph.query(SET_NORMALIZED_IDS_QUERY, {"rows": [
+            {"element_id": row["element_id"], "normalized_id": normalize_id(row["id"])} for row in rows
+        ]})
+        updated += len(rows)
+        if len(rows) < batch_size:
+            return updated
+
+
+def backfill_entity_labels(graph, batch_size=5000):
+    """Label (or merge) entities that lack __Entity__; needs APOC. Returns #legacy nodes handled."""
+    handled = 0
+    while True:
+        rows = graph.query(BACKFILL_ENTITY_LABEL_QUERY, {"limit": batch_size})
+        relabelled = rows[0]["relabelled"] if rows else 0
+        handled += relabelled or 0
+        if not relabelled or relabelled < batch_size:
+            return handled
+
+
+def search_entities(graph, text, limit=10, fuzzy=True):
+    """[{"id", "labels", "score"}] of the entities best matching free text."""
+    search = fulltext_query(text, fuzzy=fuzzy)
+    if not search:
+        return []
+    return graph.query(ENTITY_SEARCH_QUERY, {"search": search, "limit": limit})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search indexes and one-off backfills for existing graphs")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("backfill", help="label legacy entities __Entity__, fill normalized_id, create the indexes")
+    parser.parse_args(argv)
+
+    from dotenv import load_dotenv
+
+    from backend.bulk_loader import ensure_constraints
+    from backend.schema_cache import connect_graph
+
+    load_dotenv()
+    graph = connect_graph(os.getenv("NEO4J_URI"), os.getenv("NEO4J_USERNAME"), os.getenv("NEO4J_PASSWORD"))
+    ensure_constraints(graph)
+    relabelled = backfill_entity_labels(graph)
+    normalized = backfill_normalized_ids(graph)
+    print(f"✅ {relabelled} legacy entities labelled {BASE_ENTITY_LABEL}, {normalized} normalized ids filled in")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,9 @@ from langchain_anthropic import ChatAnthropic
 from langchain_openai import ChatOpenAI
 from langchain_neo4j import GraphCypherQAChain, Neo4jGraph
 from langchain.prompts import PromptTemplate
-from langchain.callbacks.base import BaseCallbackHandler
+from backend.graph_index import backfill_normalized_ids, ensure_search_indexes
+from backend.qa_cache import CachedGraphQA
+from backend.schema_cache import connect_graph
 
 load_dotenv()
 llm = ChatAnthropic(
@@ -13,32 +15,14 @@ llm = ChatAnthropic(
 )
 
 
-graph = Neo4jGraph(url=os.getenv("NEO4J_URI"), 
-                username=os.getenv("NEO4J_USERNAME"), 
-                password=os.getenv("NEO4J_PASSWORD"),
+# Loads the schema snapshot instead of re-introspecting (backend.schema_cache)
+graph = connect_graph(os.getenv("NEO4J_URI"),
+                os.getenv("NEO4J_USERNAME"),
+                os.getenv("NEO4J_PASSWORD"),
                 enhanced_schema=True)
-
-
-# All-in-one solution tracker for graph nodes and relationships Retriever
-class SimpleGraphTracker(BaseCallbackHandler):
-    def __init__(self):
-        self.nodes_count = 0
-        self.context = ""
-        self.cypher = ""
-        
-    def on_text(self, text: str, **kwargs):
-        if "MATCH" in text or "RETURN" in text:
-            self.cypher = text.strip()
-        if text.startswith("[{") and "}]" in text:
-            self.context = text.strip()
-            try:
-                self.nodes_count = len(eval(text))
-            except:
-                self.nodes_count = 0
-
-
-# Create tracker and chain
-tracker = SimpleGraphTracker()
+# The prompt below looks entities up through these indexes; older graphs may lack them
+ensure_search_indexes(graph)
+backfill_normalized_ids(graph)
 
 
 custom_cypher_prompt = PromptTemplate.from_template("""
@@ -49,7 +33,11 @@ Generate a Cypher query to answer the following question:
 {question}
 
 Guidelines:
-- Use flexible matching with `toLower(n.id)` or `CONTAINS` instead of exact `id` matches.
+- Find entities through the full-text index, never with `toLower(n.id)` or `CONTAINS` scans:
+  `CALL db.index.fulltext.queryNodes('entity_fulltext', 'temperature OR sampling~') YIELD node, score`
+  then match relationships from `node`. Append `~` to a word to tolerate misspellings.
+- For an exact name, match the indexed `normalized_id` (lowercase, punctuation replaced by spaces):
+  `MATCH (n:__Entity__ {{normalized_id: 'top p'}})`.
 - Prefer `MATCH (a)-[r]->(b)` patterns to explore relationships.
 - Use `LIMIT` to avoid overly large result sets.
 - If the question involves multiple concepts (e.g., temperature, top-k, top-p), try to find how they relate via shared concepts or recommendations.
@@ -60,26 +48,29 @@ Only return the Cypher query. Do not include explanations.
 
 
 
-# Create the GraphCypherQAChain with the tracker
+# Create the GraphCypherQAChain (CachedGraphQA records the Cypher, records and timings)
 chain = GraphCypherQAChain.from_llm(
     llm=llm,                             # Use OpenAI LLM for question answering
     graph=graph,                                # Use the Neo4j graph
-    #cypher_prompt=custom_cypher_prompt,
+    cypher_prompt=custom_cypher_prompt,          # Entity lookups through the search indexes
     verbose=True,                               # Enable verbose logging
     top_k=15,                                    # Return top 5 results
     allow_dangerous_requests=True,
-    callbacks=[tracker]                         # Add the tracker to the callbacks
 )
 
 
 # Run query
 # LLM model choice makes a difference in the cypher query results,
 question = "prompting techniues"
-result = chain.invoke({"query": question})
+# Repeat and templated questions reuse validated Cypher (backend.qa_cache)
+qa = CachedGraphQA(chain)
+result = qa.invoke(question)
+trace = result["trace"]
 
 # Print results
 print(f"\n🔍 ANALYSIS:")
-print(f"📊 Retrieved Nodes: {tracker.nodes_count}")
-print(f"📋 Context Data: {tracker.context}")
-print(f"🔧 Cypher Query: {tracker.cypher}")
+print(f"📊 Retrieved Nodes: {trace.record_count}")
+print(f"📋 Context Data: {trace.records}")
+print(f"🔧 Cypher Query: {trace.cypher}")
+print(f"⏱️ Timings: {trace.timing_summary()}")
 print(f"💬 Answer \n: {result['result']}")
\ No newline at end of file
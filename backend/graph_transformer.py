@@ -1,14 +1,24 @@
 from dotenv import load_dotenv
 import os
-import pandas as pd
-from langchain.document_loaders import PyPDFLoader
-from langchain_core.documents import Document
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_anthropic import ChatAnthropic
 from langchain_experimental.graph_transformers import LLMGraphTransformer
 from langchain.graphs import Neo4jGraph
 from langchain_neo4j import GraphCypherQAChain, Neo4jGraph
 
+from backend.chunking import TokenChunker
+from backend.communities import DEFAULT_COMMUNITY_DIR, CommunityStore, build_community_summaries
+from backend.entity_resolution import AliasTable, EntityResolver
+from backend.extraction import iter_graph_documents
+from backend.extraction_cache import CachedGraphTransformer, ExtractionCache
+from backend.graph_export import export_graph
+from backend.incremental import IngestionManifest, apply_ingestion, plan_ingestion, reset_graph
+from backend.jobs import JobStore, format_progress, plan_pdf_job, run_job
+from backend.packing import iter_unpacked, pack_documents
+from backend.pdf_pipeline import estimate_pdf_extraction
+from backend.resources import alias_path, env_scope, manifest_path, scoped_dir
+from backend.schema_cache import connect_graph, load_schema
+from backend.structured import HEALTHCARE_MAPPING, iter_csv_documents, load_csv_with_mapping
+from utils.embeddings import default_embeddings
 from utils.visualizer import visualize_neo4j_graph
 
 load_dotenv()
@@ -36,79 +46,135 @@ graph_transformer = LLMGraphTransformer(
     relationship_properties=False  # Disabled to reduce token usage
 )
 
+# Reuse extractions of unchanged chunks (python -m backend.extraction_cache invalidate after prompt changes)
+extraction_cache = ExtractionCache()
+graph_transformer = CachedGraphTransformer(graph_transformer, extraction_cache,
+                                           model=llm.model, temperature=llm.temperature)
+
 print(f"✓ Claude LLM initialized with max_tokens=8192")
 print(f"✓ Graph transformer created")
 
-# PDF File uploader
-
-uploaded_file = r'/Users/kathisnehith/Downloads/prompt_engineer_sample_book.pdf'
-# Load and split the PDF
-loader = PyPDFLoader(uploaded_file)
-pages = loader.load_and_split()
-
-text_splitter = RecursiveCharacterTextSplitter(chunk_size=2200, chunk_overlap=40)
-docs = text_splitter.split_documents(pages)
-
-lc_docs = []
-for i, doc in enumerate(docs):
-    # Get page number from metadata, default to 0 if not available
-    page_number = doc.metadata.get('page', 0)
-    
-    # Create document with cleaned content and preserved metadata
-    lc_docs.append(Document(
-        page_content=doc.page_content.replace("\n", ""), 
-        metadata={'page': page_number, 'source': uploaded_file}
-    ))
-    
-    # Print progress and chunk info
-    print(f"Chunk {i+1}/{len(docs)} processed - Page {page_number}")
-    print(f"Content: {lc_docs[-1].page_content[:100]}...")
-    print("-" * 50)
-
-# CSV (structured) File uploader
-csv_file = r"/Users/kathisnehith/Downloads/healthcare_dataset.csv"
-df = pd.read_csv(csv_file)
-df = df.head(100)
-
-for idx, row in df.iterrows():
-    # Convert each row to a readable string
-    row_str = ", ".join([f"{col}: {val}" for col, val in row.items()])
-
-    # Create LangChain Document with metadata
-    lc_docs.append(Document(
-        page_content=row_str,
-        metadata={'row': idx, 'source': csv_file}
-    ))
-
-
-# Convert to graph documents
-graph_documents_lc = graph_transformer.convert_to_graph_documents(lc_docs)
-print(lc_docs)
-
-# nodes and relationships extracted from the second document chunk
-print(f"Nodes:{graph_documents_lc[1].nodes}")
-print(f"Relationships:{graph_documents_lc[1].relationships}")
-
-
 # Connect to Neo4j database
-graph = Neo4jGraph(url=os.getenv("NEO4J_URI"), 
-                username=os.getenv("NEO4J_USERNAME"), 
-                password=os.getenv("NEO4J_PASSWORD"),
+graph = connect_graph(os.getenv("NEO4J_URI"),
+                os.getenv("NEO4J_USERNAME"),
+                os.getenv("NEO4J_PASSWORD"),
                 enhanced_schema=True)
 
-# cypher is neo4j query language similar to SQL but for graph databases.
-# Cypher query to clear the graph database
-cypher = """ MATCH (n)
-DETACH DELETE n;
-                """
-graph.query(cypher)
+# Graphs written before the bulk loader (add_graph_documents, no __Entity__
+# label) need a one-off `python -m backend.graph_index backfill` first, or
+# their entities are duplicated instead of merged
+
+# Incremental load: only new/changed chunks are extracted and written.
+# Set FULL_REBUILD = True to wipe the database and start from scratch.
+# The manifest is kept per database, like the alias table below
+FULL_REBUILD = False
+manifest = IngestionManifest(manifest_path(env_scope()))
+# Merge surface forms of the same entity ("Top-K", "top k") into one node;
+# the alias table (one per database) keeps later loads resolving to the
+# same canonical ids
+alias_table = AliasTable(alias_path(env_scope()))
+if FULL_REBUILD:
+    reset_graph(graph, manifest, alias_table)
+resolver = EntityResolver(alias_table)
+
+# PDF File uploader
 
-# add the graph documents to the Neo4j graph
-print("Adding graph documents to Neo4j...")
-graph.add_graph_documents(graph_documents_lc, include_source=True)
+uploaded_file = r'/Users/kathisnehith/Downloads/prompt_engineer_sample_book.pdf'
+# Chunks are sized in tokens so each extraction fits in max_tokens=8192
+chunker = TokenChunker.for_llm(llm)
+estimate = estimate_pdf_extraction(uploaded_file, chunker)
+print(f"🧮 {estimate['pages']} pages -> {estimate['chunks']} LLM calls of <= {estimate['budget']} tokens, "
+      f"~{estimate['input_tokens']} input / ~{estimate['expected_output_tokens']} output tokens "
+      f"({estimate['boilerplate_lines_removed']} header/footer lines dropped)")
+
+# Every chunk is checkpointed (pending -> extracted -> written), so if this
+# run dies, running the script again (or python -m backend.jobs ingest
+# --resume <job>) continues where it stopped instead of starting over
+job_store = JobStore()
+job_id = plan_pdf_job(job_store, uploaded_file, chunker=chunker, manifest=manifest,
+                      config={"provider": "Anthropic", "model": llm.model})
+print(f"📄 Ingestion job {job_id}: {job_store.counts(job_id)}")
+pdf_report = run_job(
+    job_store, job_id, graph_transformer, graph,
+    manifest=manifest,
+    max_concurrency=8,        # parallel LLM calls
+    requests_per_second=2,    # stay under the API rate limit
+    on_progress=lambda progress: print(f"✓ {format_progress(progress)} ({progress['written']} written)"),
+    resolver=resolver,
+)
+print(f"✅ PDF: {pdf_report['chunks']} chunks, added {pdf_report['added']}, "
+      f"{pdf_report['resumed']} already written, removed {pdf_report['removed']} stale, "
+      f"merged {pdf_report.get('entities_merged', 0)} duplicate entities")
 
+# More PDFs / CSVs into the same graph: python -m backend.batch_ingest <dirs or globs>
+# parses and chunks them one source per core and extracts them through one
+# rate-limited queue (not run from here: its worker processes re-import the
+# main module, and this script has no __main__ guard)
 
-# Get the schema of the graph
+# CSV (structured) File uploader
+csv_file = r"/Users/kathisnehith/Downloads/healthcare_dataset.csv"
+# "mapping": columns become nodes/relationships directly (no LLM, full dataset)
+# "llm":     rows become documents for LLM extraction (capped, pays per row)
+CSV_MODE = "mapping"
+
+if CSV_MODE == "mapping":
+    print("🏥 Loading CSV with the deterministic schema mapping...")
+    csv_report = load_csv_with_mapping(graph, csv_file, HEALTHCARE_MAPPING,
+                                       on_progress=lambda totals: print(f"✓ {totals['rows']} rows loaded"))
+    print(f"✅ CSV: {csv_report['rows']} rows -> {csv_report['nodes']} nodes, "
+          f"{csv_report['relationships']} relationships in {csv_report['transactions']} transactions")
+else:
+    # Row documents built column-wise, chunk by chunk
+    lc_docs = list(iter_csv_documents(csv_file, max_rows=100))
+
+    plan = plan_ingestion(lc_docs, manifest)
+    print(f"🧮 {len(plan['to_add'])} new chunks, {len(plan['to_remove'])} stale chunks, {plan['skipped']} unchanged")
+
+    # Pack rows into token-budgeted prompts, extract concurrently, then split
+    # the results back onto their rows so `row` provenance is kept
+    packed_docs = list(pack_documents(plan['to_add'], token_budget=1500))
+    print(f"📦 {len(plan['to_add'])} rows packed into {len(packed_docs)} extraction calls")
+    graph_documents_lc = []
+    for graph_doc in iter_unpacked(iter_graph_documents(graph_transformer, packed_docs,
+                                                        max_concurrency=8,        # parallel LLM calls
+                                                        requests_per_second=2)):  # stay under the API rate limit
+        graph_documents_lc.append(graph_doc)
+        print(f"✓ Extracted {len(graph_documents_lc)}/{len(plan['to_add'])} rows")
+
+    # nodes and relationships extracted from the first new document chunk
+    if graph_documents_lc:
+        print(f"Nodes:{graph_documents_lc[0].nodes}")
+        print(f"Relationships:{graph_documents_lc[0].relationships}")
+
+    # add the new graph documents to Neo4j and drop what came from stale chunks
+    print("Adding graph documents to Neo4j...")
+    report = apply_ingestion(graph, plan, graph_documents_lc, manifest, resolver=resolver)
+    print(f"✅ Added {report['added']} chunks, removed {report['removed']} chunks "
+          f"({report['nodes_removed']} nodes, {report['relationships_removed']} relationships), "
+          f"skipped {report['skipped']} unchanged")
+
+# Snapshot the extracted graph so staging / prod can import it
+# (python -m backend.graph_export import <path>) without re-extracting
+EXPORT_PATH = None  # e.g. "graph_export/" (Parquet) or "graph.jsonl.gz"
+if EXPORT_PATH:
+    export_counts = export_graph(graph, EXPORT_PATH)
+    print(f"📦 Exported {export_counts['nodes']} nodes, {export_counts['relationships']} relationships to {EXPORT_PATH}")
+
+cache_stats = extraction_cache.stats()
+print(f"📦 Extraction cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+
+
+# Offline precomputation for broad questions: communities (Louvain) and
+# high-degree entities get compact summaries the Studio answers from
+# (also: python -m backend.communities build)
+# (stored per database, where the Studio looks for them)
+community_dir = scoped_dir(DEFAULT_COMMUNITY_DIR, env_scope())
+community_report = build_community_summaries(graph, CommunityStore(default_embeddings(), path=community_dir))
+print(f"🧭 {community_report['communities']} communities, {community_report['hubs']} hub entities summarized "
+      f"in {community_report['seconds']:.1f}s")
+
+# Get the schema of the graph (re-introspected only if this run changed it)
+load_schema(graph)
 schema = graph.get_schema
 print("Sucessfully! Added and Graph schema retrieved.........")
 print("Graph schema: \n", schema)
@@ -0,0 +1,31 @@
+"""
+Graph version stamp.
+
+A single `__GraphMeta__` node holds a counter that every ingestion bumps
+once it has written. Caches derived from the graph (generated Cypher, query
+results, schema snapshots, layouts, indexes) key on this version, so they
+invalidate themselves as soon as the graph changes, in any process.
+"""
+META_LABEL = "__GraphMeta__"
+
+GET_VERSION_QUERY = f"""
+OPTIONAL MATCH (m:`{META_LABEL}` {{id: 'graph'}})
+RETURN coalesce(m.version, 0) AS version
+"""
+
+BUMP_VERSION_QUERY = f"""
+MERGE (m:`{META_LABEL}` {{id: 'graph'}})
+SET m.version = coalesce(m.version, 0) + 1, m.updated_at = datetime()
+RETURN m.version AS version
+"""
+
+
+def get_graph_version(graph):
+    rows = graph.query(GET_VERSION_QUERY)
+    return rows[0]["version"] if rows else 0
+
+
+def bump_graph_version(graph):
+    """Call after any write that changes the graph. Returns the new version."""
+    rows = graph.query(BUMP_VERSION_QUERY)
+    return rows[0]["version"] if rows else 0
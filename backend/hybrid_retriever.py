@@ -0,0 +1,305 @@
+"""
+Hybrid retrieval: vector search over chunks, then graph expansion.
+
+Answering through GraphCypherQAChain depends on the LLM writing a correct
+Cypher query, and the prompts push it towards `toLower(n.id) CONTAINS`
+label scans. HybridGraphQA instead:
+
+1. embeds the question and finds the top-k `Document` chunk nodes (written
+   by include_source=True) in a local index - FAISS or hnswlib when
+   installed, NumPy brute force otherwise;
+2. expands the entities those chunks MENTION, plus the entities the
+   question names (found through the `entity_fulltext` index), by `hops`
+   hops with one parameterised Cypher query (apoc.path.subgraphAll);
+3. answers from the chunk texts and the facts found, using the chain's QA
+   prompt.
+
+No Cypher is generated, so retrieval costs one embedding call and one
+query. Questions whose best chunk scores below `min_score` fall back to
+CachedGraphQA (generated Cypher).
+
+The index lives under .graphrag_cache/chunk_index (one directory per
+database, see backend.resources) and is synced with the graph version: only
+chunks added since the last sync are embedded. A sync builds the new index
+aside and swaps it in, so searches running meanwhile see the old one.
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from backend.graph_index import ENTITY_FULLTEXT_INDEX, fulltext_query
+from backend.graph_version import META_LABEL, get_graph_version
+from backend.qa_trace import QueryTrace, StageTimer
+
+DEFAULT_INDEX_DIR = os.path.join(".graphrag_cache", "chunk_index")
+
+ALL_CHUNK_IDS_QUERY = "MATCH (d:Document) RETURN d.id AS id"
+
+CHUNK_TEXT_QUERY = """
+UNWIND $ids AS id
+MATCH (d:Document {id: id})
+RETURN d.id AS id, d.text AS text
+"""
+
+EXPAND_QUERY = f"""
+UNWIND $chunk_ids AS chunk_id
+MATCH (d:Document {{id: chunk_id}})
+OPTIONAL MATCH (d)-[:MENTIONS]->(e)
+WITH collect(DISTINCT {{id: d.id, text: d.text}}) AS chunks, collect(DISTINCT e) AS mentioned
+CALL {{
+    UNWIND CASE WHEN $search = '' THEN [] ELSE [$search] END AS search
+    CALL db.index.fulltext.queryNodes('{ENTITY_FULLTEXT_INDEX}', search, {{limit: $entity_hits}}) YIELD node
+    RETURN collect(node) AS matched
+}}
+WITH chunks, mentioned + [n IN matched WHERE NOT n IN mentioned] AS seeds
+CALL {{
+    WITH seeds
+    WITH seeds WHERE size(seeds) > 0
+    CALL apoc.path.subgraphAll(seeds, {{maxLevel: $hops, labelFilter: '-Document|-{META_LABEL}', limit: $max_entities}})
+    YIELD nodes, relationships
+    RETURN nodes, relationships
+    UNION
+    WITH seeds
+    WITH seeds WHERE size(seeds) = 0
+    RETURN [] AS nodes, [] AS relationships
+}}
+RETURN chunks,
+       [n IN nodes | n.id] AS entities,
+       [r IN relationships[..$max_relationships] | [startNode(r).id, type(r), endNode(r).id]] AS triples
+"""
+
+
+def _available_backend():
+    for name in ("faiss", "hnswlib"):
+        try:
+            __import__(name)
+            return name
+        except ImportError:
+            continue
+    return "numpy"
+
+
+class VectorIndex:
+    """Inner-product search over unit vectors (cosine similarity)."""
+
+    def __init__(self, vectors, backend=None):
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        self.backend = backend or _available_backend()
+        self._index = None
+        if len(self.vectors) == 0 or self.backend == "numpy":
+            return
+        dim = self.vectors.shape[1]
+        if self.backend == "faiss":
+            import faiss
+            self._index = faiss.IndexHNSWFlat(dim, 32, faiss.METRIC_INNER_PRODUCT)
+            self._index.add(self.vectors)
+        elif self.backend == "hnswlib":
+            import hnswlib
+            self._index = hnswlib.Index(space="ip", dim=dim)
+            self._index.init_index(max_elements=len(self.vectors), ef_construction=200, M=16)
+            self._index.add_items(self.vectors, np.arange(len(self.vectors)))
+            self._index.set_ef(64)
+        else:
+            raise ValueError(f"Unknown vector index backend: {self.backend}")
+
+    def search(self, query, k):
+        """[(position, score)] of the k nearest vectors, best first."""
+        k = min(k, len(self.vectors))
+        if k == 0:
+            return []
+        query = np.asarray(query, dtype=np.float32)[None, :]
+        if self.backend == "faiss":
+            scores, positions = self._index.search(query, k)
+            return [(int(p), float(s)) for p, s in zip(positions[0], scores[0]) if p >= 0]
+        if self.backend == "hnswlib":
+            positions, distances = self._index.knn_query(query, k=k)
+            return [(int(p), 1.0 - float(d)) for p, d in zip(positions[0], distances[0])]
+        scores = self.vectors @ query[0]
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [(int(p), float(scores[p])) for p in best]
+
+
+def _unit(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def _model_name(embeddings):
+    return type(embeddings).__name__ + ":" + str(getattr(embeddings, "model", getattr(embeddings, "dim", "")))
+
+
+class ChunkIndex:
+    """Embeddings of every Document chunk node, persisted and synced by graph version."""
+
+    def __init__(self, embeddings, path=DEFAULT_INDEX_DIR, backend=None, batch_size=256):
+        self.embeddings = embeddings
+        self.path = path
+        self.backend = backend
+        self.batch_size = batch_size
+        self.model = _model_name(embeddings)
+        self.version = None
+        self.ids = []
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self._index = VectorIndex(self.vectors, backend)
+        # _lock guards the (ids, vectors, index) swap; _sync_lock runs one sync at a time
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        meta_path = os.path.join(self.path, "meta.json")
+        if not os.path.exists(meta_path):
+            return
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("model") != self.model:
+            return
+        self.version, self.ids = meta["version"], meta["ids"]
+        self.vectors = np.load(os.path.join(self.path, "vectors.npy"))
+        self._index = VectorIndex(self.vectors, self.backend)
+
+    def _save(self):
+        os.makedirs(self.path, exist_ok=True)
+        np.save(os.path.join(self.path, "vectors.npy"), self.vectors)
+        tmp = os.path.join(self.path, "meta.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"model": self.model, "version": self.version, "ids": self.ids}, f)
+        os.replace(tmp, os.path.join(self.path, "meta.json"))
+
+    def sync(self, graph, version=None):
+        """Embed chunks added since the last sync and drop removed ones. Returns #embedded."""
+        with self._sync_lock:
+            version = get_graph_version(graph) if version is None else version
+            if version == self.version:
+                return 0
+            return self._sync(graph, version)
+
+    def _sync(self, graph, version):
+        current = [row["id"] for row in graph.query(ALL_CHUNK_IDS_QUERY)]
+        current_set, known = set(current), set(self.ids)
+        keep = [i for i, chunk_id in enumerate(self.ids) if chunk_id in current_set]
+        ids = [self.ids[i] for i in keep]
+        vectors = [self.vectors[keep]] if keep else []
+
+        new_ids = [chunk_id for chunk_id in current if chunk_id not in known]
+        for start in range(0, len(new_ids), self.batch_size):
+            rows = graph.query(CHUNK_TEXT_QUERY, {"ids": new_ids[start:start + self.batch_size]})
+            rows = [row for row in rows if row["text"]]
+            if rows:
+                vectors.append(_unit(self.embeddings.embed_documents([row["text"] for row in rows])))
+                ids.extend(row["id"] for row in rows)
+
+        vectors = np.concatenate(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+        index = VectorIndex(vectors, self.backend)
+        with self._lock:
+            self.ids, self.vectors, self._index, self.version = ids, vectors, index, version
+        self._save()
+        return len(new_ids)
+
+    def search(self, question, k=5):
+        """[(chunk id, cosine score)], best first."""
+        with self._lock:
+            ids, index = self.ids, self._index
+        if not ids:
+            return []
+        query = _unit([self.embeddings.embed_query(question)])[0]
+        return [(ids[position], score) for position, score in index.search(query, k)]
+
+
+class HybridGraphQA:
+    """
+    Drop-in for CachedGraphQA (same invoke / astream results and events)
+    that retrieves by vector search plus graph expansion.
+    """
+
+    def __init__(self, fallback, index, k=5, hops=1, max_entities=50, max_relationships=100,
+                 entity_hits=5, min_score=0.25, version_ttl=5.0):
+        self.fallback = fallback
+        self.graph = fallback.graph
+        self.qa_chain = fallback.chain.qa_chain
+        self.index = index
+        self.k, self.hops = k, hops
+        self.max_entities, self.max_relationships = max_entities, max_relationships
+        self.entity_hits = entity_hits
+        self.min_score = min_score
+        self.version_ttl = version_ttl
+        self._version_checked = 0.0
+
+    def _sync_index(self):
+        now = time.monotonic()
+        if self.index.version is None or now - self._version_checked >= self.version_ttl:
+            self.index.sync(self.graph)
+            self._version_checked = now
+
+    def _params(self, question, hits):
+        return {"chunk_ids": [chunk_id for chunk_id, _ in hits], "hops": self.hops,
+                "search": fulltext_query(question), "entity_hits": self.entity_hits,
+                "max_entities": self.max_entities, "max_relationships": self.max_relationships}
+
+    def _context(self, hits, rows):
+        if not rows:
+            return []
+        scores = dict(hits)
+        chunks = sorted(rows[0]["chunks"], key=lambda chunk: -scores.get(chunk["id"], 0.0))
+        context = [{"chunk": chunk["text"], "score": round(scores.get(chunk["id"], 0.0), 3)} for chunk in chunks]
+        context += [{"fact": f"{source} {rel_type} {target}"} for source, rel_type, target in rows[0]["triples"]]
+        return context
+
+    def search(self, question):
+        """[(chunk id, score)] of the top-k chunks scoring at least min_score."""
+        self._sync_index()
+        return [(chunk_id, score) for chunk_id, score in self.index.search(question, self.k)
+                if score >= self.min_score]
+
+    def invoke(self, question):
+        """Returns {"result", "cypher", "params", "context", "cached", "trace"}; cached is "hybrid"."""
+        trace = QueryTrace(question=question, cypher=EXPAND_QUERY)
+        timer = StageTimer(trace)
+        with timer("retrieval"):
+            hits = self.search(question)
+        if not hits:
+            return self.fallback.invoke(question)
+        params = self._params(question, hits)
+        with timer("database"):
+            context = self._context(hits, self.graph.query(EXPAND_QUERY, params))
+        with timer("answer"):
+            result = self.qa_chain.invoke({"question": question, "context": context})
+        trace.params, trace.records, trace.cached = params, context, "hybrid"
+        return {"result": result, "cypher": EXPAND_QUERY, "params": params, "context": context,
+                "cached": "hybrid", "trace": timer.finish()}
+
+    async def astream(self, question):
+        """The event stream of CachedGraphQA.astream; the "cypher" event carries the expansion query."""
+        trace = QueryTrace(question=question, cypher=EXPAND_QUERY)
+        timer = StageTimer(trace)
+        with timer("retrieval"):
+            hits = await asyncio.to_thread(self.search, question)
+        if not hits:
+            async for event in self.fallback.astream(question):
+                yield event
+            return
+        params = self._params(question, hits)
+        trace.params, trace.cached = params, "hybrid"
+        yield "cypher", {"cypher": EXPAND_QUERY, "params": params, "cached": "hybrid"}
+
+        with timer("database"):
+            rows = await asyncio.to_thread(self.graph.query, EXPAND_QUERY, params)
+            context = self._context(hits, rows)
+        trace.records = context
+        yield "rows", context
+
+        answer = []
+        with timer("answer"):
+            async for chunk in self.qa_chain.astream({"question": question, "context": context}):
+                if not answer:
+                    trace.timings["first_token"] = time.perf_counter() - timer.started
+                answer.append(chunk)
+                yield "token", chunk
+        yield "done", {"result": "".join(answer), "cypher": EXPAND_QUERY, "params": params,
+                       "context": context, "cached": "hybrid", "trace": timer.finish()}
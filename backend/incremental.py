@@ -0,0 +1,294 @@
+"""
+Incremental graph ingestion.
+
+Instead of `MATCH (n) DETACH DELETE n` followed by a full re-import, a local
+manifest records a fingerprint for every ingested chunk (grouped by source)
+together with the nodes and relationships extracted from it. A new load then
+only extracts and writes new chunks, removes what came from changed or
+deleted chunks, and leaves everything else untouched. Fingerprints only
+describe one graph, so the apps keep a manifest per database
+(backend.resources.manifest_path).
+"""
+import hashlib
+import json
+import os
+from collections import Counter
+
+from backend.bulk_loader import bulk_write_graph_documents
+from backend.graph_index import BASE_ENTITY_LABEL
+from backend.graph_version import META_LABEL, bump_graph_version
+from utils.file_lock import locked
+
+DEFAULT_MANIFEST_PATH = os.getenv("GRAPHRAG_MANIFEST", ".graphrag_cache/manifest.json")
+
+DELETE_DOCUMENTS_QUERY = """
+UNWIND $ids AS doc_id
+MATCH (d:Document {id: doc_id})
+DETACH DELETE d
+"""
+
+DELETE_RELATIONSHIPS_QUERY = f"""
+UNWIND $rows AS row
+MATCH (a:`{BASE_ENTITY_LABEL}` {{id: row.source}})-[r]->(b:`{BASE_ENTITY_LABEL}` {{id: row.target}})
+WHERE type(r) = row.type
+DELETE r
+"""
+
+# Entities are one node per id (the bulk loader MERGEs on __Entity__.id), so a
+# node is only deleted once no chunk references its id under any type
+DELETE_NODES_QUERY = f"""
+UNWIND $ids AS id
+MATCH (n:`{BASE_ENTITY_LABEL}` {{id: id}})
+DETACH DELETE n
+"""
+
+
+def remove_label_query(label):
+    return f"""
+UNWIND $ids AS id
+MATCH (n:`{BASE_ENTITY_LABEL}` {{id: id}})
+REMOVE n:`{label.replace("`", "")}`
+"""
+
+
+def fingerprint(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _relationship_type(rel_type):
+    # Same normalisation Neo4jGraph.add_graph_documents applies before writing
+    return rel_type.replace(" ", "_").upper().replace("`", "")
+
+
+class IngestionManifest:
+    """
+    JSON manifest: {source: {chunk_fingerprint: {"doc_id", "nodes", "relationships"}}}
+
+    With `scope` (source names) save() only writes those sources, merged
+    into the file as it is on disk under a lock, so processes ingesting
+    different sources can share one manifest. Such processes hold lock()
+    around each write to the graph and the save recording it; chunk removal
+    holds it too and counts references against the other sources as they
+    are on disk at that moment, so it never deletes what another process
+    has just written.
+    """
+
+    def __init__(self, path=DEFAULT_MANIFEST_PATH, scope=None):
+        self.path = path
+        self.scope = set(scope) if scope is not None else None
+        self.sources = self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, encoding="utf-8") as f:
+            return json.load(f).get("sources", {})
+
+    def save(self):
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with locked(self.path):
+            sources = self.sources
+            if self.scope is not None:
+                sources = self._load()
+                for source in self.scope:
+                    if source in self.sources:
+                        sources[source] = self.sources[source]
+                    else:
+                        sources.pop(source, None)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"sources": sources}, f)
+            os.replace(tmp_path, self.path)
+
+    def lock(self):
+        return locked(self.path)
+
+    def live_sources(self):
+        """This manifest's sources plus, when scoped, every other source as it is on disk now."""
+        if self.scope is None:
+            return self.sources
+        sources = {source: chunks for source, chunks in self._load().items() if source not in self.scope}
+        sources.update((source, chunks) for source, chunks in self.sources.items() if source in self.scope)
+        return sources
+
+    def chunks(self):
+        for source, chunks in self.sources.items():
+            for chunk_hash, entry in chunks.items():
+                yield source, chunk_hash, entry
+
+    def clear(self):
+        self.sources = {}
+
+
+def plan_ingestion(documents, manifest, prune_missing_sources=False):
+    """
+    Compare prepared chunks against the manifest.
+
+    Returns {"to_add": [Document], "to_remove": [(source, chunk_hash)], "skipped": int}.
+    Sources not present in `documents` are only removed with prune_missing_sources.
+    """
+    current = {}
+    to_add = []
+    skipped = 0
+    for doc in documents:
+        source = str(doc.metadata.get("source", ""))
+        chunk_hash = fingerprint(doc.page_content)
+        seen = current.setdefault(source, set())
+        if chunk_hash in seen:
+            continue
+        seen.add(chunk_hash)
+        if chunk_hash in manifest.sources.get(source, {}):
+            skipped += 1
+        else:
+            to_add.append(doc)
+
+    to_remove = []
+    for source, chunks in manifest.sources.items():
+        if source not in current and not prune_missing_sources:
+            continue
+        for chunk_hash in chunks:
+            if chunk_hash not in current.get(source, set()):
+                to_remove.append((source, chunk_hash))
+
+    return {"to_add": to_add, "to_remove": to_remove, "skipped": skipped}
+
+
+def _remove_chunks(graph, manifest, chunk_keys):
+    """Delete removed chunks and whatever only they contributed to the graph."""
+    if not chunk_keys:
+        return {"nodes_removed": 0, "relationships_removed": 0}
+    with manifest.lock():
+        return _remove_chunks_locked(graph, manifest, chunk_keys)
+
+
+def _remove_chunks_locked(graph, manifest, chunk_keys):
+    removed_entries = [manifest.sources[source].pop(chunk_hash) for source, chunk_hash in chunk_keys]
+    for source in {source for source, _ in chunk_keys}:
+        if not manifest.sources[source]:
+            del manifest.sources[source]
+
+    # Anything still referenced by a surviving chunk stays in the graph
+    doc_refs = set()
+    node_refs = Counter()
+    rel_refs = Counter()
+    for entry in (entry for chunks in manifest.live_sources().values() for entry in chunks.values()):
+        doc_refs.add(entry["doc_id"])
+        node_refs.update(tuple(n) for n in entry["nodes"])
+        rel_refs.update(tuple(r) for r in entry["relationships"])
+
+    doc_ids = sorted({entry["doc_id"] for entry in removed_entries} - doc_refs)
+    stale_rels = sorted({tuple(r) for entry in removed_entries for r in entry["relationships"]} - set(rel_refs), key=str)
+    # A node survives while any chunk still references its id, whatever type
+    # that chunk gave it; only the labels nothing references any more go
+    stale_typed = {tuple(n) for entry in removed_entries for n in entry["nodes"]} - set(node_refs)
+    live_ids = {node_id for node_id, _ in node_refs}
+    stale_nodes = sorted({node_id for node_id, _ in stale_typed} - live_ids, key=str)
+    stale_labels = {}
+    for node_id, label in stale_typed:
+        if node_id in live_ids:
+            stale_labels.setdefault(label, []).append(node_id)
+
+    graph.query(DELETE_DOCUMENTS_QUERY, {"ids": doc_ids})
+    if stale_rels:
+        graph.query(DELETE_RELATIONSHIPS_QUERY, {
+            "rows": [{"source": s, "type": t, "target": o} for s, t, o in stale_rels]
+        })
+    if stale_nodes:
+        graph.query(DELETE_NODES_QUERY, {"ids": stale_nodes})
+    for label, ids in sorted(stale_labels.items()):
+        graph.query(remove_label_query(label), {"ids": sorted(ids, key=str)})
+    return {"nodes_removed": len(stale_nodes), "relationships_removed": len(stale_rels)}
+
+
+def _record_chunk(manifest, graph_document):
+    source_doc = graph_document.source
+    source = str(source_doc.metadata.get("source", ""))
+    doc_id = source_doc.metadata.get("id") or hashlib.md5(source_doc.page_content.encode("utf-8")).hexdigest()
+    manifest.sources.setdefault(source, {})[fingerprint(source_doc.page_content)] = {
+        "doc_id": doc_id,
+        "nodes": sorted({(n.id, n.type.replace("`", "")) for n in graph_document.nodes}, key=str),
+        "relationships": sorted({
+            (r.source.id, _relationship_type(r.type), r.target.id) for r in graph_document.relationships
+        }, key=str),
+    }
+
+
+def apply_ingestion(graph, plan, graph_documents, manifest, write=None, resolver=None):
+    """
+    Remove stale chunks, write the new graph documents and update the manifest.
+
+    `graph_documents` are the extractions of plan["to_add"]. `write` defaults
+    to the batched UNWIND writer in backend.bulk_loader. With a `resolver`
+    (backend.entity_resolution) entity ids are resolved to canonical ids
+    before anything is recorded or written.
+    """
+    graph_documents = list(graph_documents)
+    if resolver is not None:
+        graph_documents, _ = resolver.resolve(graph_documents)
+        resolver.save()
+    with manifest.lock():
+        # Record the new chunks first so nodes they share with stale chunks survive
+        for graph_document in graph_documents:
+            _record_chunk(manifest, graph_document)
+        report = _remove_chunks(graph, manifest, plan["to_remove"])
+        if graph_documents:
+            if write is None:
+                bulk_write_graph_documents(graph, graph_documents, include_source=True)
+            else:
+                write(graph_documents)
+        manifest.save()
+    if graph_documents or plan["to_remove"]:
+        bump_graph_version(graph)
+
+    report.update({
+        "added": len(graph_documents),
+        "removed": len(plan["to_remove"]),
+        "skipped": plan["skipped"],
+    })
+    return report
+
+
+def is_known_chunk(manifest, document):
+    """True when this exact chunk of its source is already in the graph."""
+    source = str(document.metadata.get("source", ""))
+    return fingerprint(document.page_content) in manifest.sources.get(source, {})
+
+
+def record_graph_documents(manifest, graph_documents):
+    """Streaming counterpart of apply_ingestion: remember chunks as they are written."""
+    for graph_document in graph_documents:
+        _record_chunk(manifest, graph_document)
+
+
+def remove_unseen_chunks(graph, manifest, source, seen_fingerprints):
+    """After streaming a source, drop the chunks of it that were not seen again."""
+    chunk_keys = [(source, chunk_hash) for chunk_hash in manifest.sources.get(source, {})
+                  if chunk_hash not in seen_fingerprints]
+    report = _remove_chunks(graph, manifest, chunk_keys)
+    report["removed"] = len(chunk_keys)
+    return report
+
+
+def remove_source(graph, manifest, source):
+    """Drop everything ingested from `source` (e.g. a deleted PDF)."""
+    chunk_keys = [(source, chunk_hash) for chunk_hash in manifest.sources.get(source, {})]
+    report = _remove_chunks(graph, manifest, chunk_keys)
+    manifest.save()
+    if chunk_keys:
+        bump_graph_version(graph)
+    report.update({"added": 0, "removed": len(chunk_keys), "skipped": 0})
+    return report
+
+
+def reset_graph(graph, manifest, alias_table=None):
+    """Full rebuild: wipe the database, forget every fingerprint and (given the graph's table) every alias."""
+    # Keep the version stamp so caches keyed on older versions stay invalid
+    graph.query(f"MATCH (n) WHERE NOT n:`{META_LABEL}` DETACH DELETE n")
+    manifest.clear()
+    manifest.save()
+    if alias_table is not None:
+        # Canonical ids of the wiped graph would otherwise be resolved to again
+        alias_table.clear()
+        alias_table.save(replace=True)
+    bump_graph_version(graph)
@@ -0,0 +1,408 @@
+"""
+Resumable, checkpointed ingestion jobs.
+
+run_pdf_pipeline keeps its progress in memory: if the process dies at chunk
+380 of 400 (rate limit, network error, Streamlit rerun) the next run starts
+again from chunk 1. A job instead records every chunk in a SQLite
+checkpoint log with its state:
+
+    pending -> extracted (GraphDocument stored) -> written (in Neo4j)
+
+The chunk list is fixed when the job is planned, each extraction is
+committed as soon as it returns, and each write batch is marked once Neo4j
+has it. Resuming a job writes what was extracted but not yet written, then
+extracts only the chunks still pending. Job ids are derived from the file
+content and source name, so ingesting the same upload again resumes its
+unfinished job.
+
+    python -m backend.jobs ingest book.pdf
+    python -m backend.jobs ingest --resume 3f2a9c41d0e7
+    python -m backend.jobs list
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from langchain_core.documents import Document
+
+from backend.bulk_loader import bulk_write_graph_documents
+from backend.extraction import iter_graph_documents
+from backend.extraction_cache import deserialize_graph_document, serialize_graph_document
+from backend.graph_version import bump_graph_version
+from backend.incremental import fingerprint, is_known_chunk, record_graph_documents, remove_unseen_chunks
+from backend.pdf_pipeline import iter_pdf_chunks
+
+DEFAULT_JOBS_PATH = os.getenv("GRAPHRAG_JOBS", ".graphrag_cache/jobs.sqlite")
+
+PENDING, EXTRACTED, WRITTEN = "pending", "extracted", "written"
+
+
+def job_id_for(path, source=None, scope=None):
+    """
+    Stable id from the file content, source name and the graph_scope
+    (backend.resources) it is ingested into: the same file ingested into
+    two databases is two jobs.
+    """
+    digest = hashlib.sha256((source or os.path.basename(path)).encode("utf-8"))
+    if scope is not None:
+        digest.update(repr(tuple(scope)).encode("utf-8"))
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+class JobStore:
+    """SQLite checkpoint log of ingestion jobs and the state of each of their chunks."""
+
+    def __init__(self, path=DEFAULT_JOBS_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        # Worker processes share the file; wait for each other's short writes
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                source TEXT NOT NULL,
+                config TEXT NOT NULL,
+                status TEXT NOT NULL,
+                error TEXT,
+                created REAL NOT NULL,
+                updated REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS chunks (
+                job_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                fingerprint TEXT NOT NULL,
+                text TEXT NOT NULL,
+                metadata TEXT NOT NULL,
+                state TEXT NOT NULL,
+                graph_document TEXT,
+                PRIMARY KEY (job_id, seq)
+            );
+            CREATE INDEX IF NOT EXISTS chunks_state ON chunks(job_id, state);
+        """)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "progress" not in columns:
+            # Latest on_progress snapshot, for polling from another process
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN progress TEXT")
+        self._conn.commit()
+
+    def _execute(self, query, params=()):
+        with self._lock:
+            cursor = self._conn.execute(query, params)
+            self._conn.commit()
+            return cursor
+
+    def create(self, job_id, path, source, documents, written=(), config=None):
+        """Record a planned job; chunks whose fingerprint is in `written` start out written."""
+        now = time.time()
+        written = set(written)
+        rows = []
+        for seq, doc in enumerate(documents):
+            chunk_hash = fingerprint(doc.page_content)
+            rows.append((job_id, seq, chunk_hash, doc.page_content, json.dumps(doc.metadata),
+                         WRITTEN if chunk_hash in written else PENDING))
+        with self._lock:
+            self._conn.execute("DELETE FROM chunks WHERE job_id = ?", (job_id,))
+            self._conn.execute("INSERT OR REPLACE INTO jobs (id, path, source, config, status, created, updated) "
+                               "VALUES (?, ?, ?, ?, 'planned', ?, ?)",
+                               (job_id, path, source, json.dumps(config or {}), now, now))
+            self._conn.executemany("INSERT INTO chunks (job_id, seq, fingerprint, text, metadata, state) "
+                                   "VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+
+    def enqueue(self, job_id, path, source, config=None):
+        """
+        Record a job that a worker will plan and run. An unfinished job keeps
+        its chunks (and is resumed); a new or finished one is planned afresh.
+        """
+        now = time.time()
+        with self._lock:
+            updated = self._conn.execute("UPDATE jobs SET status = 'queued', error = NULL, updated = ? "
+                                         "WHERE id = ? AND status != 'done'", (now, job_id)).rowcount
+            if not updated:
+                self._conn.execute("DELETE FROM chunks WHERE job_id = ?", (job_id,))
+                self._conn.execute("INSERT OR REPLACE INTO jobs (id, path, source, config, status, created, updated) "
+                                   "VALUES (?, ?, ?, ?, 'queued', ?, ?)",
+                                   (job_id, path, source, json.dumps(config or {}), now, now))
+            self._conn.commit()
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute("SELECT id, path, source, config, status, error, created, updated, progress "
+                                     "FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        keys = ("id", "path", "source", "config", "status", "error", "created", "updated", "progress")
+        job = dict(zip(keys, row))
+        job["config"] = json.loads(job["config"])
+        job["progress"] = json.loads(job["progress"]) if job["progress"] else None
+        job["counts"] = self.counts(job_id)
+        return job
+
+    def jobs(self):
+        with self._lock:
+            ids = [row[0] for row in self._conn.execute("SELECT id FROM jobs ORDER BY updated DESC")]
+        return [self.get(job_id) for job_id in ids]
+
+    def counts(self, job_id):
+        with self._lock:
+            rows = self._conn.execute("SELECT state, COUNT(*) FROM chunks WHERE job_id = ? GROUP BY state",
+                                      (job_id,)).fetchall()
+        counts = {PENDING: 0, EXTRACTED: 0, WRITTEN: 0}
+        counts.update(dict(rows))
+        return counts
+
+    def fingerprints(self, job_id):
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT fingerprint FROM chunks WHERE job_id = ?", (job_id,))}
+
+    def documents(self, job_id, state):
+        """[(seq, Document, serialized GraphDocument or None)] in chunk order."""
+        with self._lock:
+            rows = self._conn.execute("SELECT seq, text, metadata, graph_document FROM chunks "
+                                      "WHERE job_id = ? AND state = ? ORDER BY seq", (job_id, state)).fetchall()
+        return [(seq, Document(page_content=text, metadata=json.loads(metadata)), payload)
+                for seq, text, metadata, payload in rows]
+
+    def mark_extracted(self, job_id, seq, graph_document):
+        self._execute("UPDATE chunks SET state = ?, graph_document = ? WHERE job_id = ? AND seq = ?",
+                      (EXTRACTED, serialize_graph_document(graph_document), job_id, seq))
+
+    def mark_written(self, job_id, seqs):
+        with self._lock:
+            # The stored extraction is not needed once the chunk is in Neo4j
+            self._conn.executemany("UPDATE chunks SET state = ?, graph_document = NULL WHERE job_id = ? AND seq = ?",
+                                   [(WRITTEN, job_id, seq) for seq in seqs])
+            self._conn.commit()
+
+    def set_progress(self, job_id, progress):
+        self._execute("UPDATE jobs SET progress = ?, updated = ? WHERE id = ?",
+                      (json.dumps(progress), time.time(), job_id))
+
+    def set_status(self, job_id, status, error=None):
+        self._execute("UPDATE jobs SET status = ?, error = ?, updated = ? WHERE id = ?",
+                      (status, error, time.time(), job_id))
+
+    def close(self):
+        self._conn.close()
+
+
+def plan_pdf_job(store, path, source=None, chunker=None, manifest=None, config=None, scope=None):
+    """
+    Returns the job id for ingesting `path` into the graph of `scope`. An
+    unfinished job for the same file is reused as is (resume); otherwise
+    (no job, a finished one, or one only queued) the PDF is chunked now and
+    every chunk recorded, those already in the manifest as written.
+    """
+    source = source or path
+    job_id = job_id_for(path, source, scope)
+    job = store.get(job_id)
+    if job is not None and job["status"] != "done" and sum(job["counts"].values()):
+        return job_id
+    documents = list(iter_pdf_chunks(path, source, chunker=chunker))
+    written = {fingerprint(doc.page_content) for doc in documents
+               if manifest is not None and is_known_chunk(manifest, doc)}
+    store.create(job_id, path, source, documents, written, config)
+    return job_id
+
+
+class JobProgress:
+    """Chunks/sec and ETA over the chunks extracted by this run."""
+
+    def __init__(self, counts):
+        self.total = sum(counts.values())
+        self.written = counts[WRITTEN]
+        self.extracted = counts[WRITTEN] + counts[EXTRACTED]
+        self._start_extracted = self.extracted
+        self._started = time.monotonic()
+
+    @property
+    def rate(self):
+        elapsed = time.monotonic() - self._started
+        done = self.extracted - self._start_extracted
+        return done / elapsed if elapsed > 0 and done else 0.0
+
+    @property
+    def eta(self):
+        """Seconds until every chunk is extracted, None before the first one."""
+        rate = self.rate
+        return (self.total - self.extracted) / rate if rate else None
+
+    def as_dict(self):
+        return {"total": self.total, "extracted": self.extracted, "written": self.written,
+                "chunks_per_sec": self.rate, "eta_seconds": self.eta}
+
+
+def run_job(store, job_id, graph_transformer, graph, manifest=None, resolver=None,
+            max_concurrency=8, requests_per_second=None, write_batch_size=64, on_progress=None):
+    """
+    Run or resume a planned job until every chunk is written.
+
+    `on_progress(progress_dict)` gets total / extracted / written chunk
+    counts, chunks_per_sec and eta_seconds after every extraction and write.
+    Returns {"job_id", "chunks", "added", "resumed", "removed", ...}.
+    """
+    job = store.get(job_id)
+    if job is None:
+        raise KeyError(f"Unknown ingestion job {job_id!r}")
+    progress = JobProgress(job["counts"])
+    report = {"job_id": job_id, "chunks": progress.total, "added": 0, "resumed": progress.written}
+    store.set_status(job_id, "running")
+
+    def _notify():
+        if on_progress:
+            on_progress(progress.as_dict())
+
+    def _flush(batch):
+        seqs, graph_documents = zip(*batch)
+        graph_documents = list(graph_documents)
+        if resolver is not None:
+            graph_documents, resolved = resolver.resolve(graph_documents)
+            report["entities_merged"] = report.get("entities_merged", 0) + resolved["merged"]
+        if manifest is None:
+            bulk_write_graph_documents(graph, graph_documents, include_source=True)
+        else:
+            # Other workers' chunk removals wait until this batch is recorded
+            with manifest.lock():
+                bulk_write_graph_documents(graph, graph_documents, include_source=True)
+                record_graph_documents(manifest, graph_documents)
+                manifest.save()
+        store.mark_written(job_id, seqs)
+        progress.written += len(seqs)
+        report["added"] += len(seqs)
+        _notify()
+
+    try:
+        # Extractions that finished before the last run stopped
+        leftovers = [(seq, deserialize_graph_document(payload, document))
+                     for seq, document, payload in store.documents(job_id, EXTRACTED)]
+        for start in range(0, len(leftovers), write_batch_size):
+            _flush(leftovers[start:start + write_batch_size])
+
+        pending = store.documents(job_id, PENDING)
+        # Chunks with the same text share a fingerprint; each extraction takes the next of their seqs
+        seqs_by_fingerprint = {}
+        for seq, document, _ in pending:
+            seqs_by_fingerprint.setdefault(fingerprint(document.page_content), []).append(seq)
+        batch = []
+        for graph_document in iter_graph_documents(graph_transformer, [document for _, document, _ in pending],
+                                                   max_buffered=write_batch_size,
+                                                   max_concurrency=max_concurrency,
+                                                   requests_per_second=requests_per_second):
+            seq = seqs_by_fingerprint[fingerprint(graph_document.source.page_content)].pop(0)
+            store.mark_extracted(job_id, seq, graph_document)
+            progress.extracted += 1
+            _notify()
+            batch.append((seq, graph_document))
+            if len(batch) >= write_batch_size:
+                _flush(batch)
+                batch = []
+        if batch:
+            _flush(batch)
+
+        if manifest is not None:
+            report.update(remove_unseen_chunks(graph, manifest, job["source"], store.fingerprints(job_id)))
+            manifest.save()
+        if resolver is not None:
+            resolver.save()
+        if report["added"] or report.get("removed"):
+            bump_graph_version(graph)
+    except BaseException as e:
+        store.set_status(job_id, "interrupted" if isinstance(e, KeyboardInterrupt) else "failed", repr(e))
+        if report["added"]:
+            bump_graph_version(graph)
+        raise
+    store.set_status(job_id, "done")
+    return report
+
+
+def format_progress(progress):
+    """'120/400 chunks | 1.8 chunks/s | ETA 2m35s' for progress bars and logs."""
+    text = f"{progress['extracted']}/{progress['total']} chunks | {progress['chunks_per_sec']:.2f} chunks/s"
+    if progress["eta_seconds"] is not None:
+        minutes, seconds = divmod(int(progress["eta_seconds"]), 60)
+        text += f" | ETA {minutes}m{seconds:02d}s"
+    return text
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run and resume checkpointed PDF ingestion jobs")
+    parser.add_argument("--path", default=DEFAULT_JOBS_PATH, help="job database file")
+    commands = parser.add_subparsers(dest="command", required=True)
+    ingest = commands.add_parser("ingest", help="ingest a PDF, resuming its unfinished job if there is one")
+    ingest.add_argument("pdf", nargs="?", help="PDF file to ingest")
+    ingest.add_argument("--resume", metavar="JOB", help="resume this job instead of planning a new one")
+    ingest.add_argument("--source", help="source name stored on the chunks (default: the file path)")
+    ingest.add_argument("--provider", default="Anthropic", choices=("Anthropic", "OpenAI"))
+    ingest.add_argument("--model", help="chat model (default: the provider's default)")
+    ingest.add_argument("--max-concurrency", type=int, default=8, help="parallel LLM calls")
+    ingest.add_argument("--requests-per-second", type=float, help="LLM request rate limit")
+    commands.add_parser("list", help="show jobs and their chunk states")
+    args = parser.parse_args(argv)
+
+    store = JobStore(args.path)
+    if args.command == "list":
+        for job in store.jobs():
+            counts = job["counts"]
+            print(f"{job['id']}  {job['status']:<11} {counts[WRITTEN]}/{sum(counts.values())} written, "
+                  f"{counts[EXTRACTED]} extracted, {counts[PENDING]} pending  {job['source']}")
+        store.close()
+        return
+    if bool(args.pdf) == bool(args.resume):
+        parser.error("ingest needs either a PDF or --resume JOB")
+
+    from dotenv import load_dotenv
+    from langchain_experimental.graph_transformers import LLMGraphTransformer
+
+    from backend.chunking import TokenChunker
+    from backend.entity_resolution import AliasTable, EntityResolver
+    from backend.extraction_cache import CachedGraphTransformer, ExtractionCache
+    from backend.incremental import IngestionManifest
+    from backend.resources import alias_path, env_scope, get_llm, manifest_path
+    from backend.schema_cache import connect_graph
+
+    load_dotenv()
+    if args.resume:
+        job = store.get(args.resume)
+        if job is None:
+            parser.error(f"unknown job {args.resume}")
+        # Keep the LLM the job was started with; jobs planned without one use --provider / --model
+        config = {"provider": job["config"].get("provider") or args.provider,
+                  "model": job["config"].get("model") or args.model}
+        job_id = args.resume
+    else:
+        config = {"provider": args.provider, "model": args.model}
+    api_key = os.getenv("ANTHROPIC_API_KEY" if config["provider"] == "Anthropic" else "OPENAI_API_KEY")
+    llm = get_llm(config["provider"], api_key, config["model"])
+    scope = env_scope()
+    manifest = IngestionManifest(manifest_path(scope))
+    if not args.resume:
+        job_id = plan_pdf_job(store, args.pdf, args.source, TokenChunker.for_llm(llm), manifest, config, scope)
+    print(f"Job {job_id} (resume with: python -m backend.jobs ingest --resume {job_id})")
+
+    graph = connect_graph(os.getenv("NEO4J_URI"), os.getenv("NEO4J_USERNAME"), os.getenv("NEO4J_PASSWORD"))
+    transformer = CachedGraphTransformer(LLMGraphTransformer(llm=llm, node_properties=False,
+                                                             relationship_properties=False),
+                                         ExtractionCache(), model=llm.model_name if config["provider"] == "OpenAI"
+                                         else llm.model, temperature=llm.temperature)
+    resolver = EntityResolver(AliasTable(alias_path(scope), merge_on_save=True))
+    report = run_job(store, job_id, transformer, graph, manifest=manifest, resolver=resolver,
+                     max_concurrency=args.max_concurrency, requests_per_second=args.requests_per_second,
+                     on_progress=lambda progress: print(format_progress(progress), end="\r", flush=True))
+    print(f"\n✅ {report['chunks']} chunks: added {report['added']}, {report['resumed']} already written, "
+          f"removed {report.get('removed', 0)} stale")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Pack many small documents (CSV rows) into one extraction prompt.
+
+Each CSV row is a few dozen tokens, but every LLMGraphTransformer call also
+carries a large fixed prompt. pack_documents bins consecutive documents of
+the same source into token-budgeted batches, and each batch goes to the LLM
+as one Document. unpack_graph_document then splits the extracted nodes and
+relationships back onto the rows they came from, so each row keeps its own
+source Document (and its `row` metadata) when written with include_source.
+"""
+import re
+
+from langchain_community.graphs.graph_document import GraphDocument
+from langchain_core.documents import Document
+
+from utils.tokens import count_tokens
+
+DEFAULT_TOKEN_BUDGET = 1500
+RECORD_MARKER = "### Record {}"
+_RECORD_RE = re.compile(r"^### Record (\d+)$", re.MULTILINE)
+
+
+def _packed_document(batch, source):
+    content = "\n".join(f"{RECORD_MARKER.format(i)}\n{doc.page_content}" for i, doc in enumerate(batch))
+    return Document(page_content=content, metadata={
+        "source": source,
+        "packed": [doc.metadata for doc in batch],
+    })
+
+
+def pack_documents(documents, token_budget=DEFAULT_TOKEN_BUDGET, count=count_tokens):
+    """
+    Yield packed Documents of at most `token_budget` content tokens.
+    Documents are packed in order and never mixed across sources; a document
+    larger than the budget travels alone.
+    """
+    batch, batch_tokens, batch_source = [], 0, None
+    for doc in documents:
+        source = doc.metadata.get("source")
+        tokens = count(doc.page_content) + 4  # marker line
+        if batch and (source != batch_source or batch_tokens + tokens > token_budget):
+            yield _packed_document(batch, batch_source)
+            batch, batch_tokens = [], 0
+        batch.append(doc)
+        batch_tokens += tokens
+        batch_source = source
+    if batch:
+        yield _packed_document(batch, batch_source)
+
+
+def _members(packed_doc):
+    """[(metadata, text)] for each record in a packed Document."""
+    content = packed_doc.page_content
+    markers = list(_RECORD_RE.finditer(content))
+    members = []
+    for marker, following in zip(markers, markers[1:] + [None]):
+        end = following.start() if following else len(content)
+        members.append((int(marker.group(1)), content[marker.end():end].strip()))
+    metadata = packed_doc.metadata["packed"]
+    return [(metadata[i], text) for i, text in members]
+
+
+def unpack_graph_document(graph_document):
+    """
+    Split a GraphDocument extracted from a packed Document into one
+    GraphDocument per original record.
+
+    A node belongs to every record whose text mentions its id. A relationship
+    goes to the record mentioning both endpoints, else the one mentioning its
+    source. Nodes matching no record follow their relationships, or fall back
+    to the first record, so nothing extracted is dropped.
+    """
+    source = graph_document.source
+    if source is None or "packed" not in source.metadata:
+        return [graph_document]
+
+    members = _members(source)
+    lowered = [text.lower() for _, text in members]
+
+    def _homes(node_id):
+        # Whole-word match, so "Doctor3" does not land in a row about "Doctor35"
+        pattern = re.compile(r"(?<!\w)" + re.escape(str(node_id).lower()) + r"(?!\w)")
+        return {i for i, text in enumerate(lowered) if pattern.search(text)}
+
+    node_homes = {}
+    for node in graph_document.nodes:
+        node_homes[node.id] = _homes(node.id)
+
+    nodes = [dict() for _ in members]
+    relationships = [[] for _ in members]
+    for rel in graph_document.relationships:
+        source_homes = node_homes.get(rel.source.id) or _homes(rel.source.id)
+        target_homes = node_homes.get(rel.target.id) or _homes(rel.target.id)
+        shared = source_homes & target_homes
+        home = min(shared or source_homes or target_homes or {0})
+        relationships[home].append(rel)
+        for node in (rel.source, rel.target):
+            node_homes.setdefault(node.id, set())
+            if not node_homes[node.id]:
+                node_homes[node.id] = {home}
+            nodes[home].setdefault(node.id, node)
+
+    for node in graph_document.nodes:
+        for home in node_homes[node.id] or {0}:
+            nodes[home][node.id] = node
+
+    return [
+        GraphDocument(
+            nodes=list(nodes[i].values()),
+            relationships=relationships[i],
+            source=Document(page_content=text, metadata=dict(metadata)),
+        )
+        for i, (metadata, text) in enumerate(members)
+    ]
+
+
+def iter_unpacked(graph_documents):
+    for graph_document in graph_documents:
+        yield from unpack_graph_document(graph_document)
@@ -0,0 +1,166 @@
+"""
+Streaming PDF ingestion: lazy page load -> split -> clean -> extract -> write.
+
+`PyPDFLoader(...).load_and_split()` materialises every page, the splitter
+makes a second full copy and the cleaning loop a third, and the first LLM
+call waits until the whole file is parsed. Here every stage is a generator:
+pages are parsed on a background thread into a bounded read-ahead queue,
+extraction of the first chunks starts while later pages are still being
+parsed, and results are written to Neo4j in small batches. Each bounded
+queue blocks its producer when full, so peak memory depends on the queue
+sizes and not on the size of the PDF.
+"""
+import queue
+import threading
+
+from langchain_community.document_loaders import PyPDFLoader
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from backend import telemetry
+from backend.bulk_loader import bulk_write_graph_documents
+from backend.extraction import iter_graph_documents
+from backend.graph_version import bump_graph_version
+from backend.incremental import fingerprint, is_known_chunk, record_graph_documents, remove_unseen_chunks
+
+_END = object()
+
+
+def iter_pdf_pages(path):
+    """Yield one Document per page without loading the whole file."""
+    yield from PyPDFLoader(path).lazy_load()
+
+
+def split_pages(pages, text_splitter):
+    """Split page by page so only one page's chunks are alive at a time."""
+    for page in pages:
+        yield from text_splitter.split_documents([page])
+
+
+def clean_chunks(chunks, source):
+    for chunk in chunks:
+        yield Document(
+            page_content=chunk.page_content.replace("\n", ""),
+            metadata={'page': chunk.metadata.get('page', 0), 'source': source},
+        )
+
+
+def prefetch(iterable, maxsize=32):
+    """
+    Run `iterable` on a background thread, buffering at most `maxsize` items.
+    The producer blocks when the buffer is full (backpressure).
+    """
+    buffer = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def _put(item):
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def _produce():
+        try:
+            for item in iterable:
+                if stop.is_set():
+                    return
+                _put(item)
+        except BaseException as e:
+            _put(e)
+        finally:
+            _put(_END)
+
+    threading.Thread(target=_produce, name="pdf-prefetch", daemon=True).start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _END:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+def iter_pdf_chunks(path, source=None, text_splitter=None, chunk_size=1200, chunk_overlap=40, chunker=None):
+    """
+    Lazily parsed, split and cleaned chunks of one PDF. A `chunker`
+    (backend.chunking.TokenChunker) sizes chunks by tokens instead of the
+    character splitter. Pages and chunks are timed as `load` / `split`
+    telemetry spans.
+    """
+    pages = telemetry.timed_iter(iter_pdf_pages(path), "load")
+    if chunker is not None:
+        return telemetry.timed_iter(chunker.iter_chunks(pages, source or path), "split")
+    text_splitter = text_splitter or RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    return telemetry.timed_iter(clean_chunks(split_pages(pages, text_splitter), source or path), "split")
+
+
+def estimate_pdf_extraction(path, chunker, source=None):
+    """Chunk a PDF without calling the LLM; see TokenChunker.estimate."""
+    return chunker.estimate(iter_pdf_pages(path), source or path)
+
+
+def run_pdf_pipeline(path, graph_transformer, graph, source=None, manifest=None,
+                     text_splitter=None, chunk_size=1200, chunk_overlap=40, chunker=None,
+                     max_concurrency=8, requests_per_second=None,
+                     prefetch_chunks=32, write_batch_size=64, on_progress=None, resolver=None):
+    """
+    Stream one PDF into Neo4j.
+
+    With a `manifest` (backend.incremental) chunks already in the graph are
+    skipped and chunks of this source that disappeared are removed at the end.
+    `on_progress(chunks_seen, chunks_written)` is called after every write.
+    With a `resolver` (backend.entity_resolution) every batch is resolved to
+    canonical entity ids before it is written.
+    Returns {"chunks", "added", "skipped", "removed", ...}.
+    """
+    source = source or path
+    chunks = prefetch(iter_pdf_chunks(path, source, text_splitter, chunk_size, chunk_overlap, chunker),
+                      prefetch_chunks)
+    report = {"chunks": 0, "added": 0, "skipped": 0}
+    seen = set()
+
+    def _new_chunks():
+        for chunk in chunks:
+            report["chunks"] += 1
+            seen.add(fingerprint(chunk.page_content))
+            if manifest is not None and is_known_chunk(manifest, chunk):
+                report["skipped"] += 1
+                continue
+            yield chunk
+
+    def _flush(batch):
+        if resolver is not None:
+            batch, resolved = resolver.resolve(batch)
+            report["entities_merged"] = report.get("entities_merged", 0) + resolved["merged"]
+        bulk_write_graph_documents(graph, batch, include_source=True)
+        if manifest is not None:
+            record_graph_documents(manifest, batch)
+        report["added"] += len(batch)
+        if on_progress:
+            on_progress(report["chunks"], report["added"])
+
+    batch = []
+    for graph_document in iter_graph_documents(graph_transformer, _new_chunks(),
+                                               max_buffered=write_batch_size,
+                                               max_concurrency=max_concurrency,
+                                               requests_per_second=requests_per_second):
+        batch.append(graph_document)
+        if len(batch) >= write_batch_size:
+            _flush(batch)
+            batch = []
+    if batch:
+        _flush(batch)
+
+    if manifest is not None:
+        report.update(remove_unseen_chunks(graph, manifest, source, seen))
+        manifest.save()
+    if resolver is not None:
+        resolver.save()
+    if report["added"] or report.get("removed"):
+        bump_graph_version(graph)
+    return report
@@ -0,0 +1,372 @@
+"""
+Two-level cache in front of GraphCypherQAChain.
+
+`GraphCypherQAChain.invoke` makes one LLM call to write Cypher and another to
+answer, even for a question asked a minute ago. CachedGraphQA runs the same
+steps (it reuses the chain's prompts, LLMs and graph) with two caches:
+
+1. question -> Cypher. Lookups try, in order: the normalized question text;
+   a parameterised template learned from an earlier question (string literals
+   of the Cypher that appear in the question become `$p0, $p1, ...`, so
+   "who treats Asthma" reuses the Cypher written for "who treats Diabetes");
+   and, when an embeddings model is given, the nearest cached question above
+   `similarity_threshold`. A Cypher is only cached after it ran without error.
+   A template parameter spans as many words as the literal it replaced and
+   must name a known entity (a `normalized_id` seek), and a template or
+   similar hit that returns no rows counts as a miss: the Cypher is
+   generated after all.
+2. (Cypher, parameters, graph version) -> query result.
+
+Both levels are stamped with the graph version (backend.graph_version), which
+every ingestion bumps, so they empty themselves when the graph changes.
+"""
+import asyncio
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from backend.graph_index import BASE_ENTITY_LABEL, normalize_id
+from backend.graph_version import get_graph_version
+from backend.qa_trace import QueryTrace, StageTimer
+
+DEFAULT_SIMILARITY_THRESHOLD = 0.92
+_PUNCTUATION_RE = re.compile(r"[^\w\s]")
+_STRING_LITERAL_RE = re.compile(r"'((?:[^'\\]|\\.)*)'|\"((?:[^\"\\]|\\.)*)\"")
+
+ENTITY_IDS_QUERY = f"""
+UNWIND $values AS value
+OPTIONAL MATCH (n:`{BASE_ENTITY_LABEL}` {{normalized_id: value}})
+WITH value, head(collect(n.id)) AS id
+RETURN value, id
+"""
+
+
+def _words(question):
+    return " ".join(_PUNCTUATION_RE.sub(" ", question).split())
+
+
+def normalize_question(question):
+    """Lowercase, drop punctuation and collapse whitespace."""
+    return _words(question).lower()
+
+
+def _match_case(sample, value):
+    if sample.islower():
+        return value.lower()
+    if sample.isupper():
+        return value.upper()
+    if sample.istitle():
+        return value.title()
+    return value
+
+
+def parameterise(question, cypher):
+    """
+    Turn a (question, Cypher) pair into a reusable template.
+
+    Every plain-word string literal of the Cypher that also occurs as whole
+    words in the question becomes a parameter. Returns (question_pattern,
+    cypher_template, literals) or None when nothing could be lifted out.
+    """
+    words = _words(question)
+    lowered = words.lower()
+    literals, template_parts, last = [], [], 0
+    for match in _STRING_LITERAL_RE.finditer(cypher):
+        value = match.group(1) if match.group(1) is not None else match.group(2)
+        key = value.lower().strip()
+        if not key or normalize_question(value) != key:
+            continue
+        if not re.search(rf"(?<!\w){re.escape(key)}(?!\w)", lowered):
+            continue
+        if key not in [k for k, _ in literals]:
+            literals.append((key, value))
+        template_parts.append(cypher[last:match.start()])
+        template_parts.append(f"$p{[k for k, _ in literals].index(key)}")
+        last = match.end()
+    if not literals:
+        return None
+    template_parts.append(cypher[last:])
+
+    # Claim question spans longest literal first ("type 2 diabetes" before "diabetes")
+    spans = []
+    for i in sorted(range(len(literals)), key=lambda i: -len(literals[i][0])):
+        for found in re.finditer(rf"(?<!\w){re.escape(literals[i][0])}(?!\w)", lowered):
+            if all(found.end() <= s or found.start() >= e for s, e, _ in spans):
+                spans.append((found.start(), found.end(), i))
+                break
+    pattern, last = [], 0
+    for start, end, i in sorted(spans):
+        pattern.append(re.escape(lowered[last:start]))
+        # Same token structure: as many words as the literal had
+        pattern.append(f"(?P<p{i}>" + r" ".join([r"\w+"] * len(literals[i][0].split())) + ")")
+        last = end
+    pattern.append(re.escape(lowered[last:]))
+    samples = [value for _, value in literals]
+    return re.compile("^" + "".join(pattern) + "$", re.IGNORECASE), "".join(template_parts), samples
+
+
+class QueryCache:
+    """
+    question -> Cypher and (Cypher, params) -> rows, both LRU-bounded and
+    valid for a single graph version. Thread-safe, so one instance can be
+    shared by every session of a Streamlit app.
+    """
+
+    def __init__(self, embeddings=None, similarity_threshold=DEFAULT_SIMILARITY_THRESHOLD,
+                 max_entries=1024, max_results=256):
+        self.embeddings = embeddings
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.max_results = max_results
+        self.version = None
+        self.hits = {"exact": 0, "template": 0, "similar": 0, "result": 0}
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._clear()
+
+    def _clear(self):
+        self._cypher = OrderedDict()     # normalized question -> Cypher
+        self._templates = OrderedDict()  # question pattern -> Cypher template
+        self._vectors = OrderedDict()    # normalized question -> unit vector
+        self._results = OrderedDict()    # (Cypher, params) -> rows
+
+    def sync(self, version):
+        """Drop everything cached for an older graph version."""
+        with self._lock:
+            if version != self.version:
+                self._clear()
+                self.version = version
+
+    def invalidate(self):
+        with self._lock:
+            self._clear()
+            self.version = None
+
+    def _embed(self, text):
+        vector = np.asarray(self.embeddings.embed_query(text), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, question, resolve=None):
+        """
+        (Cypher, params, how) for a cached match, else (None, None, None).
+        `resolve(values)` maps template parameter values to the ids of the
+        entities they name (None when unknown); a template only matches when
+        every value resolves, and is then filled with those ids.
+        """
+        key = normalize_question(question)
+        with self._lock:
+            if key in self._cypher:
+                self._cypher.move_to_end(key)
+                self.hits["exact"] += 1
+                return self._cypher[key], {}, "exact"
+            matches = [(pattern, template, samples, match.groupdict())
+                       for pattern, (template, samples) in reversed(self._templates.items())
+                       for match in [pattern.match(_words(question))] if match]
+            candidates = list(self._vectors.items())
+
+        for pattern, template, samples, values in matches:
+            if resolve is not None:
+                ids = resolve(list(values.values()))
+                if any(ids.get(value) is None for value in values.values()):
+                    continue
+                values = {name: ids[value] for name, value in values.items()}
+            params = {name: _match_case(samples[int(name[1:])], value) for name, value in values.items()}
+            with self._lock:
+                if pattern in self._templates:
+                    self._templates.move_to_end(pattern)
+                self.hits["template"] += 1
+            return template, params, "template"
+
+        if self.embeddings is not None and candidates:
+            query = self._embed(key)
+            keys, vectors = zip(*candidates)
+            scores = np.stack(vectors) @ query
+            best = int(np.argmax(scores))
+            if scores[best] >= self.similarity_threshold:
+                with self._lock:
+                    cypher = self._cypher.get(keys[best])
+                    if cypher is not None:
+                        self.hits["similar"] += 1
+                        return cypher, {}, "similar"
+
+        with self._lock:
+            self.misses += 1
+        return None, None, None
+
+    def store(self, question, cypher):
+        """Remember a Cypher that executed successfully for `question`."""
+        key = normalize_question(question)
+        template = parameterise(question, cypher)
+        vector = self._embed(key) if self.embeddings is not None else None
+        with self._lock:
+            self._cypher[key] = cypher
+            self._cypher.move_to_end(key)
+            if template is not None:
+                pattern, cypher_template, samples = template
+                self._templates[pattern] = (cypher_template, samples)
+                self._templates.move_to_end(pattern)
+            if vector is not None:
+                self._vectors[key] = vector
+            for entries in (self._cypher, self._templates):
+                while len(entries) > self.max_entries:
+                    evicted, _ = entries.popitem(last=False)
+                    self._vectors.pop(evicted, None)
+
+    def count_miss(self, how):
+        """Turn a hit whose Cypher returned nothing into a miss."""
+        with self._lock:
+            self.hits[how] -= 1
+            self.misses += 1
+
+    def get_result(self, cypher, params):
+        key = (cypher, tuple(sorted(params.items())))
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                self.hits["result"] += 1
+                return self._results[key]
+        return None
+
+    def put_result(self, cypher, params, rows):
+        key = (cypher, tuple(sorted(params.items())))
+        with self._lock:
+            self._results[key] = rows
+            while len(self._results) > self.max_results:
+                self._results.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {"version": self.version, "questions": len(self._cypher),
+                    "templates": len(self._templates), "results": len(self._results),
+                    "hits": dict(self.hits), "misses": self.misses}
+
+
+class CachedGraphQA:
+    """
+    Answer questions with a GraphCypherQAChain's components, skipping the
+    Cypher LLM call and the database round trip whenever the cache allows.
+
+    The graph version is read at most every `version_ttl` seconds, which
+    bounds how long another process' ingestion can go unnoticed.
+    """
+
+    def __init__(self, chain, cache=None, version_ttl=5.0):
+        self.chain = chain
+        self.graph = chain.graph
+        self.cache = cache or QueryCache()
+        self.version_ttl = version_ttl
+        self._version_checked = 0.0
+
+    def resolve_entities(self, values):
+        """{value: id of the entity whose normalized_id matches it, or None}."""
+        normalized = {value: normalize_id(value) for value in values}
+        rows = self.graph.query(ENTITY_IDS_QUERY, {"values": sorted(set(normalized.values()))})
+        ids = {row["value"]: row["id"] for row in rows}
+        return {value: ids.get(key) for value, key in normalized.items()}
+
+    def _sync_version(self):
+        now = time.monotonic()
+        if self.cache.version is None or now - self._version_checked >= self.version_ttl:
+            self.cache.sync(get_graph_version(self.graph))
+            self._version_checked = now
+
+    def _cypher_inputs(self, question):
+        return {"question": question, "query": question, "examples": None, "schema": self.chain.graph_schema}
+
+    def _clean_cypher(self, generated):
+        from langchain_neo4j.chains.graph_qa.cypher import extract_cypher
+
+        cypher = extract_cypher(generated)
+        if self.chain.cypher_query_corrector:
+            cypher = self.chain.cypher_query_corrector(cypher)
+        return cypher
+
+    def generate_cypher(self, question):
+        return self._clean_cypher(self.chain.cypher_generation_chain.invoke(self._cypher_inputs(question)))
+
+    def run_cypher(self, cypher, params):
+        rows = self.cache.get_result(cypher, params)
+        if rows is None:
+            rows = self.graph.query(cypher, params)[: self.chain.top_k]
+            self.cache.put_result(cypher, params, rows)
+        return rows
+
+    def invoke(self, question):
+        """Returns {"result", "cypher", "params", "context", "cached", "trace"}."""
+        trace = QueryTrace(question=question)
+        timer = StageTimer(trace)
+        with timer("cache_lookup"):
+            self._sync_version()
+            cypher, params, cached = self.cache.lookup(question, self.resolve_entities)
+        if cypher is not None and cached in ("template", "similar"):
+            with timer("database"):
+                context = self.run_cypher(cypher, params)
+            if not context:
+                # A reused Cypher that finds nothing is more likely wrong than right
+                self.cache.count_miss(cached)
+                cypher = None
+        if cypher is None:
+            cached, params = None, {}
+            with timer("cypher_generation"):
+                cypher = self.generate_cypher(question)
+        if cached not in ("template", "similar"):
+            with timer("database"):
+                context = self.run_cypher(cypher, params) if cypher else []
+        if cypher and cached is None:
+            self.cache.store(question, cypher)
+        with timer("answer"):
+            result = self.chain.qa_chain.invoke({"question": question, "context": context})
+        trace.cypher, trace.params, trace.records, trace.cached = cypher, params, context, cached
+        return {"result": result, "cypher": cypher, "params": params, "context": context,
+                "cached": cached, "trace": timer.finish()}
+
+    async def astream(self, question):
+        """
+        Same steps as invoke, as a stream of (event, payload) pairs:
+        ("cypher", {"cypher", "params", "cached"}) as soon as the Cypher is
+        known, ("rows", context) once the query returned, ("token", text)
+        for every answer chunk and finally ("done", result-dict). The trace
+        also records "first_token", the time until the first answer chunk.
+        The blocking Neo4j calls run on worker threads.
+        """
+        trace = QueryTrace(question=question)
+        timer = StageTimer(trace)
+        with timer("cache_lookup"):
+            await asyncio.to_thread(self._sync_version)
+            cypher, params, cached = await asyncio.to_thread(self.cache.lookup, question, self.resolve_entities)
+        context = None
+        if cypher is not None and cached in ("template", "similar"):
+            with timer("database"):
+                context = await asyncio.to_thread(self.run_cypher, cypher, params)
+            if not context:
+                self.cache.count_miss(cached)
+                cypher, context = None, None
+        if cypher is None:
+            cached, params = None, {}
+            with timer("cypher_generation"):
+                generated = await self.chain.cypher_generation_chain.ainvoke(self._cypher_inputs(question))
+                cypher = self._clean_cypher(generated)
+        trace.cypher, trace.params, trace.cached = cypher, params, cached
+        yield "cypher", {"cypher": cypher, "params": params, "cached": cached}
+
+        if context is None:
+            with timer("database"):
+                context = await asyncio.to_thread(self.run_cypher, cypher, params) if cypher else []
+        if cypher and cached is None:
+            await asyncio.to_thread(self.cache.store, question, cypher)
+        trace.records = context
+        yield "rows", context
+
+        answer = []
+        with timer("answer"):
+            async for chunk in self.chain.qa_chain.astream({"question": question, "context": context}):
+                if not answer:
+                    trace.timings["first_token"] = time.perf_counter() - timer.started
+                answer.append(chunk)
+                yield "token", chunk
+        yield "done", {"result": "".join(answer), "cypher": cypher, "params": params,
+                       "context": context, "cached": cached, "trace": timer.finish()}
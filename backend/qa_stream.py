@@ -0,0 +1,72 @@
+"""
+Run streaming QA (CachedGraphQA.astream) from synchronous code such as a
+Streamlit script.
+
+Queries run as tasks on one background event loop shared by the process.
+Each QueryStream (one per Streamlit session) has at most one query in
+flight: submitting a new question cancels the previous task, which stops
+its LLM calls at once. A Neo4j query already sent keeps running on its
+worker thread until it finishes or hits NEO4J_QUERY_TIMEOUT
+(backend.resources), but its rows are discarded.
+"""
+import asyncio
+import queue
+import threading
+from functools import lru_cache
+
+_END_EVENTS = ("done", "error", "cancelled")
+
+
+@lru_cache(maxsize=None)
+def _background_loop():
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="qa-stream-loop", daemon=True).start()
+    return loop
+
+
+class QueryStream:
+    def __init__(self):
+        self._future = None
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        with self._lock:
+            if self._future is not None and not self._future.done():
+                self._future.cancel()
+            self._future = None
+
+    def submit(self, qa, question):
+        """
+        Start answering `question` (cancelling any query still running) and
+        return an iterator over its (event, payload) pairs, ending with
+        "done", "error" (payload: the exception) or "cancelled".
+        """
+        events = queue.Queue()
+
+        async def _pump():
+            try:
+                async for event in qa.astream(question):
+                    events.put(event)
+            except Exception as e:
+                events.put(("error", e))
+
+        self.cancel()
+        future = asyncio.run_coroutine_threadsafe(_pump(), _background_loop())
+        # Also fires when the task is cancelled before it started
+        future.add_done_callback(lambda f: f.cancelled() and events.put(("cancelled", None)))
+        with self._lock:
+            self._future = future
+
+        def _events():
+            try:
+                while True:
+                    event, payload = events.get()
+                    yield event, payload
+                    if event in _END_EVENTS:
+                        return
+            finally:
+                # The consumer went away (e.g. Streamlit stopped the run) - stop the query too
+                if not future.done():
+                    future.cancel()
+
+        return _events()
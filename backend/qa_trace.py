@@ -0,0 +1,167 @@
+"""
+Structured capture of what a graph QA run did.
+
+The old SimpleGraphTracker scraped `on_text` output: Cypher was "any text
+containing MATCH", and the context was recovered by `eval()` of the
+printed result list. QueryTrace holds the same information as typed data:
+the Cypher and its parameters, the raw records, and per-stage timings.
+CachedGraphQA fills one in for every question; GraphQATracer builds them
+from a plain GraphCypherQAChain's callbacks and intermediate steps.
+
+Both keep per-run state only (keyed by run id), so a single tracer can be
+shared by concurrent sessions. Finished traces are also recorded as
+backend.telemetry spans: one `query` span with a child per stage.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from backend import telemetry
+
+# Stage labels GraphCypherQAChain reports through on_text once a stage is done.
+# The child chains do not receive the callbacks, so these are the only markers.
+_STAGE_MARKERS = {"Generated Cypher:": "cypher_generation", "Full Context:": "database"}
+
+
+@dataclass
+class QueryTrace:
+    question: str
+    cypher: str = ""
+    params: dict = field(default_factory=dict)
+    records: list = field(default_factory=list)
+    cached: str = None
+    timings: dict = field(default_factory=dict)
+    error: str = None
+
+    @property
+    def record_count(self):
+        return len(self.records)
+
+    def timing_summary(self):
+        return ", ".join(f"{stage} {seconds * 1000:.0f} ms" for stage, seconds in self.timings.items())
+
+    def stage_timings_ms(self):
+        """{stage: ms} for the stages that make up the total, in execution order."""
+        return {stage: seconds * 1000 for stage, seconds in self.timings.items()
+                if stage not in ("total", "first_token")}
+
+
+def record_trace(trace, trace_id=None, span_id=None, started_at=None):
+    """Record a finished trace as a `query` telemetry span with one child span per stage."""
+    trace_id, span_id = trace_id or uuid.uuid4().hex, span_id or telemetry.new_span_id()
+    total = trace.timings.get("total", 0.0)
+    started_at = started_at or time.time() - total
+    offset = started_at
+    for stage, seconds in trace.stage_timings_ms().items():
+        telemetry.record_span(stage, offset, seconds / 1000, trace_id=trace_id, parent_id=span_id)
+        offset += seconds / 1000
+    telemetry.record_span("query", started_at, total, {
+        "cached": trace.cached, "records": trace.record_count, "error": trace.error,
+    }, trace_id=trace_id, span_id=span_id)
+    telemetry.REGISTRY.inc("graphrag_queries_total", cached=trace.cached or "none")
+    if trace.error:
+        telemetry.REGISTRY.inc("graphrag_errors_total", stage="query")
+
+
+class StageTimer:
+    """`with timer("database"): ...` adds the block's duration to trace.timings."""
+
+    def __init__(self, trace):
+        self.trace = trace
+        self.started = time.perf_counter()
+
+    def __call__(self, stage):
+        return _Stage(self.trace, stage)
+
+    def finish(self):
+        self.trace.timings["total"] = time.perf_counter() - self.started
+        record_trace(self.trace)
+        return self.trace
+
+
+class _Stage:
+    def __init__(self, trace, stage):
+        self.trace, self.stage = trace, stage
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.trace.timings[self.stage] = self.trace.timings.get(self.stage, 0.0) + time.perf_counter() - self._start
+
+
+class GraphQATracer(BaseCallbackHandler):
+    """
+    Callback for GraphCypherQAChain (built with return_intermediate_steps=True).
+
+        tracer = GraphQATracer()
+        chain.invoke({"query": q}, config={"callbacks": [tracer], "run_id": run_id})
+        trace = tracer.pop(run_id)
+
+    Cypher and records are taken from the chain's intermediate steps. Stage
+    timings come from the chain's stage labels: cypher_generation ends at
+    "Generated Cypher:", database at "Full Context:", answer at chain end.
+    """
+
+    def __init__(self, max_traces=256):
+        self.max_traces = max_traces
+        self._lock = threading.Lock()
+        self._running = {}  # run id -> (trace, start, end of the previous stage)
+        self._done = OrderedDict()
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, **kwargs):
+        if parent_run_id is not None:
+            return
+        question = (inputs.get("query") or inputs.get("question") or "") if isinstance(inputs, dict) else ""
+        now = time.perf_counter()
+        with self._lock:
+            self._running[run_id] = (QueryTrace(question=question), now, now)
+
+    def on_text(self, text, *, run_id, parent_run_id=None, **kwargs):
+        stage = _STAGE_MARKERS.get(text)
+        if stage is None:
+            return
+        now = time.perf_counter()
+        with self._lock:
+            if run_id in self._running:
+                trace, start, previous = self._running[run_id]
+                trace.timings[stage] = now - previous
+                self._running[run_id] = (trace, start, now)
+
+    def on_chain_end(self, outputs, *, run_id, parent_run_id=None, **kwargs):
+        now = time.perf_counter()
+        with self._lock:
+            if run_id not in self._running:
+                return
+            trace, start, previous = self._running.pop(run_id)
+            if "database" in trace.timings:
+                trace.timings["answer"] = now - previous
+            trace.timings["total"] = now - start
+            for step in (outputs or {}).get("intermediate_steps", []):
+                if "query" in step:
+                    trace.cypher = step["query"]
+                if "context" in step:
+                    trace.records = step["context"]
+            self._finish(run_id, trace)
+
+    def on_chain_error(self, error, *, run_id, parent_run_id=None, **kwargs):
+        with self._lock:
+            if run_id in self._running:
+                trace, start, _ = self._running.pop(run_id)
+                trace.timings["total"] = time.perf_counter() - start
+                trace.error = str(error)
+                self._finish(run_id, trace)
+
+    def _finish(self, run_id, trace):
+        record_trace(trace)
+        self._done[run_id] = trace
+        while len(self._done) > self.max_traces:
+            self._done.popitem(last=False)
+
+    def pop(self, run_id):
+        with self._lock:
+            return self._done.pop(run_id, None)
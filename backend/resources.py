@@ -0,0 +1,333 @@
+"""
+Process-wide pool of Neo4j drivers, LLM clients and QA chains.
+
+Streamlit reruns the whole script on every widget change, and each rerun
+used to open a new Neo4j driver, new HTTP clients and a new
+GraphCypherQAChain. Here they are created once per credential set and
+shared by every rerun and every session of the process; the apps only keep
+credentials in `st.session_state`. Neo4j drivers hold a connection pool
+and the LLM clients an HTTP pool, and both are safe to share between the
+threads Streamlit runs sessions on.
+
+Pool sizes and timeouts come from `PoolSettings`, by default read from the
+environment (NEO4J_MAX_POOL_SIZE, NEO4J_CONNECTION_TIMEOUT,
+NEO4J_ACQUISITION_TIMEOUT, NEO4J_QUERY_TIMEOUT, LLM_TIMEOUT, LLM_MAX_RETRIES).
+
+Objects are created outside the registry lock (one creator per key, other
+callers wait for its result), so a slow Neo4j connect does not stall every
+other session. The registry keeps the GRAPHRAG_MAX_POOLED (default 64)
+most recently used objects: an evicted driver is closed, and whatever was
+built on top of an evicted object (chains keyed by its id) goes with it.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+
+from backend.communities import DEFAULT_COMMUNITY_DIR, CommunityGraphQA, CommunityStore
+from backend.entity_resolution import DEFAULT_ALIAS_PATH
+from backend.graph_index import backfill_normalized_ids, ensure_search_indexes
+from backend.hybrid_retriever import DEFAULT_INDEX_DIR, ChunkIndex, HybridGraphQA
+from backend.incremental import DEFAULT_MANIFEST_PATH
+from backend.qa_cache import CachedGraphQA, QueryCache
+from backend.schema_cache import connect_graph, load_schema
+from backend.telemetry import start_metrics_server
+from backend.worker import IngestionWorker
+
+
+def _env_number(name, default, cast=float):
+    value = os.getenv(name)
+    return cast(value) if value else default
+
+
+@dataclass(frozen=True)
+class PoolSettings:
+    neo4j_max_pool_size: int = field(default_factory=lambda: _env_number("NEO4J_MAX_POOL_SIZE", 50, int))
+    neo4j_connection_timeout: float = field(default_factory=lambda: _env_number("NEO4J_CONNECTION_TIMEOUT", 15.0))
+    neo4j_acquisition_timeout: float = field(default_factory=lambda: _env_number("NEO4J_ACQUISITION_TIMEOUT", 30.0))
+    neo4j_query_timeout: float = field(default_factory=lambda: _env_number("NEO4J_QUERY_TIMEOUT", None))
+    llm_timeout: float = field(default_factory=lambda: _env_number("LLM_TIMEOUT", 60.0))
+    llm_max_retries: int = field(default_factory=lambda: _env_number("LLM_MAX_RETRIES", 2, int))
+
+    def driver_config(self):
+        return {
+            "max_connection_pool_size": self.neo4j_max_pool_size,
+            "connection_timeout": self.neo4j_connection_timeout,
+            "connection_acquisition_timeout": self.neo4j_acquisition_timeout,
+        }
+
+
+MAX_POOLED = _env_number("GRAPHRAG_MAX_POOLED", 64, int)
+# One per process, never evicted
+PINNED_KINDS = ("metrics_server", "ingestion_worker")
+
+_registry = OrderedDict()
+# key -> Future of an object being created
+_creating = {}
+_lock = threading.Lock()
+# id(pooled graph) -> (url, database, username) it was connected with
+_scopes = {}
+
+
+def _secret(value):
+    # Pool keys never hold raw passwords or API keys
+    return hashlib.sha256((value or "").encode("utf-8")).hexdigest()
+
+
+def _pooled(key, factory):
+    with _lock:
+        if key in _registry:
+            _registry.move_to_end(key)
+            return _registry[key]
+        future = _creating.get(key)
+        creator = future is None
+        if creator:
+            future = _creating[key] = Future()
+    if not creator:
+        return future.result()
+    try:
+        resource = factory()
+    except BaseException as e:
+        with _lock:
+            del _creating[key]
+        future.set_exception(e)
+        raise
+    _store(key, resource)
+    with _lock:
+        del _creating[key]
+    future.set_result(resource)
+    return resource
+
+
+def _identities(resource):
+    # Dependent keys hold id(resource); registry values may be (..., resource) tuples
+    return {id(resource)} | ({id(item) for item in resource} if isinstance(resource, tuple) else set())
+
+
+def _store(key, resource):
+    """Register (or replace) `key`, then evict the least recently used entries beyond MAX_POOLED."""
+    with _lock:
+        _registry[key] = resource
+        _registry.move_to_end(key)
+        evicted = []
+        for old_key in list(_registry):
+            if len(_registry) <= MAX_POOLED:
+                break
+            if old_key[0] not in PINNED_KINDS and old_key != key:
+                evicted.append((old_key, _registry.pop(old_key)))
+        # Anything keyed by an evicted object's id would outlive it (and could match a new object's id)
+        gone = set().union(*(_identities(resource) for _, resource in evicted)) if evicted else set()
+        while gone:
+            dependents = [k for k in _registry if gone & set(k)]
+            gone = set()
+            for dependent in dependents:
+                resource = _registry.pop(dependent)
+                evicted.append((dependent, resource))
+                gone |= _identities(resource)
+        for _, resource in evicted:
+            _scopes.pop(id(resource), None)
+    for old_key, resource in evicted:
+        _close(old_key, resource)
+
+
+def _close(key, resource):
+    if key[0] == "neo4j":
+        resource.close()
+    elif key[0] in PINNED_KINDS:
+        resource.shutdown()
+
+
+def get_graph(url, username, password, database=None, enhanced_schema=True, settings=None):
+    """Shared Neo4jGraph (and driver pool) for one set of credentials."""
+    settings = settings or PoolSettings()
+    key = ("neo4j", url, username, _secret(password), database, enhanced_schema, settings)
+    graph = _pooled(key, lambda: connect_graph(
+        url, username, password, enhanced_schema=enhanced_schema, database=database,
+        timeout=settings.neo4j_query_timeout, driver_config=settings.driver_config(),
+    ))
+    with _lock:
+        _scopes[id(graph)] = credentials_scope(url, username, database)
+    return graph
+
+
+def credentials_scope(url, username, database=None):
+    """graph_scope of the graph get_graph returns for these credentials, without connecting."""
+    return url, database, username
+
+
+def graph_scope(graph):
+    """
+    (url, database, username) of a graph from get_graph; per-graph state
+    (query cache, graph version) is keyed by it, so two databases, or two
+    users with different access, never share cached answers.
+    """
+    with _lock:
+        return _scopes.get(id(graph), (None, None, id(graph)))
+
+
+def get_llm(provider, api_key, model=None, temperature=0.4, settings=None):
+    """Shared chat model (and HTTP client pool) for one provider, key and model."""
+    settings = settings or PoolSettings()
+    key = ("llm", provider, _secret(api_key), model, temperature, settings)
+
+    def _create():
+        if provider == "OpenAI":
+            from langchain_openai import ChatOpenAI
+            return ChatOpenAI(openai_api_key=api_key, model=model or "gpt-4.1", temperature=temperature,
+                              timeout=settings.llm_timeout, max_retries=settings.llm_max_retries)
+        if provider == "Anthropic":
+            from langchain_anthropic import ChatAnthropic
+            return ChatAnthropic(anthropic_api_key=api_key, model=model or "claude-3-5-sonnet-20241022",
+                                 temperature=temperature, timeout=settings.llm_timeout,
+                                 max_retries=settings.llm_max_retries)
+        raise ValueError(f"Unknown LLM provider: {provider}")
+
+    return _pooled(key, _create)
+
+
+def env_scope():
+    """graph_scope of the database the scripts and CLIs connect to (NEO4J_URI, NEO4J_USERNAME)."""
+    return credentials_scope(os.getenv("NEO4J_URI"), os.getenv("NEO4J_USERNAME"))
+
+
+def scoped_dir(base, scope):
+    """A directory under `base` for state kept per graph_scope (chunk index, summaries)."""
+    return os.path.join(base, _secret(repr(tuple(scope)))[:12])
+
+
+def _scoped_path(path, scope):
+    root, ext = os.path.splitext(path)
+    return f"{root}.{_secret(repr(tuple(scope)))[:12]}{ext}"
+
+
+def alias_path(scope):
+    """The entity alias table file (backend.entity_resolution) of one graph_scope."""
+    return _scoped_path(DEFAULT_ALIAS_PATH, scope)
+
+
+def manifest_path(scope):
+    """The ingestion manifest file (backend.incremental) of one graph_scope."""
+    return _scoped_path(DEFAULT_MANIFEST_PATH, scope)
+
+
+def get_query_cache(scope=None):
+    """The question/result cache (and graph version) of one graph_scope."""
+    return _pooled(("query_cache", scope), QueryCache)
+
+
+def _ensure_search_indexes(graph):
+    # The Cypher prompts and the hybrid expansion look entities up through
+    # these indexes; graphs loaded before they existed may lack them
+    from neo4j.exceptions import Forbidden, ForbiddenOnReadOnlyDatabase
+
+    try:
+        ensure_search_indexes(graph)
+        backfill_normalized_ids(graph)
+    except (Forbidden, ForbiddenOnReadOnlyDatabase):
+        # Read-only users query whatever indexes a writer created
+        return False
+    return True
+
+
+def _prompt_key(prompt):
+    # Streamlit rebuilds module-level prompts on every rerun: equal prompts share a chain
+    if prompt is None:
+        return None
+    return (type(prompt).__name__, getattr(prompt, "template", None) or repr(prompt),
+            tuple(sorted(prompt.input_variables)))
+
+
+def get_qa_chain(llm, graph, top_k=15, cypher_prompt=None):
+    """
+    Shared CachedGraphQA for a pooled LLM and graph. The chain bakes the
+    schema into its prompt, so once the query cache has seen a new graph
+    version the schema snapshot is reloaded and, if it changed, the chain
+    is rebuilt. The first chain for a graph creates its search indexes
+    (backend.graph_index) and backfills normalized ids.
+    """
+    from langchain_neo4j import GraphCypherQAChain
+
+    key = ("qa", id(llm), id(graph), top_k, _prompt_key(cypher_prompt))
+    query_cache = get_query_cache(graph_scope(graph))
+    _pooled(("search_indexes", id(graph)), lambda: _ensure_search_indexes(graph))
+    with _lock:
+        entry = _registry.get(key)
+        if entry is not None:
+            _registry.move_to_end(key)
+    if entry is not None:
+        schema, version, qa = entry
+        if version == query_cache.version:
+            return qa
+        load_schema(graph)
+        if schema == graph.schema:
+            _store(key, (schema, query_cache.version, qa))
+            return qa
+
+    kwargs = {"cypher_prompt": cypher_prompt} if cypher_prompt is not None else {}
+    chain = GraphCypherQAChain.from_llm(llm=llm, graph=graph, top_k=top_k,
+                                        allow_dangerous_requests=True, **kwargs)
+    qa = CachedGraphQA(chain, query_cache)
+    _store(key, (graph.schema, query_cache.version, qa))
+    return qa
+
+
+def get_hybrid_qa(llm, graph, top_k=15, cypher_prompt=None, index_dir=DEFAULT_INDEX_DIR):
+    """
+    Shared HybridGraphQA: vector search over the graph's chunk nodes plus
+    graph expansion, falling back to get_qa_chain's Cypher generation.
+    """
+    from utils.embeddings import default_embeddings
+
+    fallback = get_qa_chain(llm, graph, top_k=top_k, cypher_prompt=cypher_prompt)
+    # One index per database: chunk ids and graph versions of two databases must not mix
+    index_dir = scoped_dir(index_dir, graph_scope(graph))
+    index = _pooled(("chunk_index", index_dir), lambda: ChunkIndex(default_embeddings(), path=index_dir))
+    return _pooled(("hybrid", id(fallback), id(index)), lambda: HybridGraphQA(fallback, index))
+
+
+def get_community_store(graph, path=DEFAULT_COMMUNITY_DIR):
+    """The precomputed community / hub summaries (backend.communities) of one database, loaded once per process."""
+    from utils.embeddings import default_embeddings
+
+    path = scoped_dir(path, graph_scope(graph))
+    return _pooled(("community_store", path), lambda: CommunityStore(default_embeddings(), path=path))
+
+
+def get_community_qa(fallback, path=DEFAULT_COMMUNITY_DIR):
+    """
+    Shared CommunityGraphQA: broad questions are answered from the
+    precomputed summaries, the rest by `fallback` (a pooled hybrid or
+    Cypher chain).
+    """
+    store = get_community_store(fallback.graph, path)
+    return _pooled(("community_qa", id(fallback), id(store)), lambda: CommunityGraphQA(fallback, store))
+
+
+def get_metrics_server(port=None, host=None):
+    """
+    One Prometheus /metrics endpoint per process, on `port` or
+    GRAPHRAG_METRICS_PORT; None when neither is set. It listens on `host`
+    or GRAPHRAG_METRICS_HOST, by default 127.0.0.1 (local scrapers only).
+    """
+    port = port or _env_number("GRAPHRAG_METRICS_PORT", None, int)
+    if not port:
+        return None
+    host = host or os.getenv("GRAPHRAG_METRICS_HOST") or "127.0.0.1"
+    return _pooled(("metrics_server", host, port), lambda: start_metrics_server(port, host=host))
+
+
+def get_ingestion_worker():
+    """The background ingestion pool of the process (backend.worker)."""
+    return _pooled(("ingestion_worker",), IngestionWorker)
+
+
+def close_all():
+    """Close every pooled driver and forget all pooled objects."""
+    with _lock:
+        entries = list(_registry.items())
+        _registry.clear()
+        _scopes.clear()
+    for key, resource in entries:
+        _close(key, resource)
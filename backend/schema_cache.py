@@ -0,0 +1,91 @@
+"""
+Schema snapshot stored next to the graph version stamp.
+
+`Neo4jGraph(..., enhanced_schema=True)` introspects the whole database on
+every construction, sampling property values of every label through APOC.
+connect_graph opens the driver with `refresh_schema=False` and loads the
+schema from the `__GraphMeta__` node in one query instead. The snapshot is
+recomputed only when its stamp differs from the current graph version (or
+was taken with a different `enhanced_schema` setting), and is then written
+back, so every process and Streamlit rerun after that starts instantly. A
+user without write access still connects: the fresh schema is used and the
+snapshot is left for a user who can write it.
+
+GraphCypherQAChain builds its prompt schema from `graph.structured_schema`,
+so a chain created after connect_graph uses the snapshot directly.
+"""
+import json
+import logging
+
+from backend.graph_version import META_LABEL
+
+logger = logging.getLogger(__name__)
+
+GET_SNAPSHOT_QUERY = f"""
+OPTIONAL MATCH (m:`{META_LABEL}` {{id: 'graph'}})
+RETURN coalesce(m.version, 0) AS version, m.schema_version AS schema_version,
+       m.schema_enhanced AS enhanced, m.structured_schema AS structured_schema
+"""
+
+SAVE_SNAPSHOT_QUERY = f"""
+MERGE (m:`{META_LABEL}` {{id: 'graph'}})
+ON CREATE SET m.version = 0
+SET m.schema_version = $version, m.schema_enhanced = $enhanced,
+    m.structured_schema = $structured_schema
+"""
+
+
+def strip_internal_labels(structured_schema):
+    """Remove bookkeeping labels (`__GraphMeta__`) from a structured schema."""
+    return {
+        **structured_schema,
+        "node_props": {label: props for label, props in structured_schema.get("node_props", {}).items()
+                       if label != META_LABEL},
+        "relationships": [rel for rel in structured_schema.get("relationships", [])
+                          if META_LABEL not in (rel.get("start"), rel.get("end"))],
+    }
+
+
+def _apply(graph, structured_schema):
+    from langchain_neo4j.graphs.neo4j_graph import format_schema
+
+    graph.structured_schema = structured_schema
+    graph.schema = format_schema(structured_schema, graph._enhanced_schema)
+
+
+def load_schema(graph, force=False):
+    """
+    Set `graph.schema` / `graph.structured_schema` from the stored snapshot,
+    refreshing it first if the graph changed since it was taken.
+    Returns True when the snapshot was reused.
+    """
+    rows = graph.query(GET_SNAPSHOT_QUERY)
+    snapshot = rows[0] if rows else {}
+    version = snapshot.get("version", 0)
+    enhanced = bool(graph._enhanced_schema)
+    if (not force and snapshot.get("structured_schema")
+            and snapshot.get("schema_version") == version and snapshot.get("enhanced") == enhanced):
+        _apply(graph, json.loads(snapshot["structured_schema"]))
+        return True
+
+    graph.refresh_schema()
+    structured_schema = strip_internal_labels(graph.structured_schema)
+    _apply(graph, structured_schema)
+    from neo4j.exceptions import Forbidden, ForbiddenOnReadOnlyDatabase
+
+    try:
+        graph.query(SAVE_SNAPSHOT_QUERY, {"version": version, "enhanced": enhanced,
+                                          "structured_schema": json.dumps(structured_schema, default=str)})
+    except (Forbidden, ForbiddenOnReadOnlyDatabase) as e:
+        logger.info("Schema snapshot not saved (no write access): %s", e)
+    return False
+
+
+def connect_graph(url, username, password, enhanced_schema=True, **kwargs):
+    """Neo4jGraph whose schema comes from the snapshot when it is current."""
+    from langchain_neo4j import Neo4jGraph
+
+    graph = Neo4jGraph(url=url, username=username, password=password,
+                       enhanced_schema=enhanced_schema, refresh_schema=False, **kwargs)
+    load_schema(graph)
+    return graph
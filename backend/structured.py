@@ -0,0 +1,169 @@
+"""
+Structured (CSV) sources: chunked reading, vectorized row documents and a
+deterministic schema-mapping mode.
+
+The old path walked `df.iterrows()` and joined every cell with an f-string,
+and was capped at `df.head(100)` because each row then cost an LLM call.
+`iter_csv_documents` builds the same "col: value, col: value" documents
+column-wise per chunk of rows. `load_csv_with_mapping` skips the LLM
+entirely: columns are mapped straight to nodes and relationships and written
+with the bulk loader, so the full healthcare dataset loads in seconds.
+"""
+from hashlib import md5
+
+import pandas as pd
+from langchain_core.documents import Document
+
+from backend import telemetry
+from backend.bulk_loader import DEFAULT_BATCH_SIZE, ensure_constraints, write_grouped_rows
+from backend.graph_version import bump_graph_version
+
+DEFAULT_CHUNKSIZE = 10_000
+
+# Columns of the Kaggle healthcare_dataset.csv. Every entity shares one
+# __Entity__ id space, and patient names repeat (and match doctor names), so
+# a patient's id also carries age, gender and blood type:
+# "Bobby Jackson (30, Male, B-)", with the plain name in `name`
+HEALTHCARE_MAPPING = {
+    "nodes": {
+        "Patient": {"id": "Name", "key": ["Age", "Gender", "Blood Type"],
+                    "properties": ["Age", "Gender", "Blood Type"], "title_case": True},
+        "Doctor": {"id": "Doctor"},
+        "Hospital": {"id": "Hospital"},
+        "MedicalCondition": {"id": "Medical Condition"},
+        "Medication": {"id": "Medication"},
+        "InsuranceProvider": {"id": "Insurance Provider"},
+    },
+    "relationships": [
+        {"source": "Patient", "type": "HAS_CONDITION", "target": "MedicalCondition"},
+        {"source": "Patient", "type": "TREATED_BY", "target": "Doctor"},
+        {"source": "Patient", "type": "ADMITTED_TO", "target": "Hospital",
+         "properties": ["Date of Admission", "Discharge Date", "Admission Type",
+                        "Room Number", "Billing Amount", "Test Results"]},
+        {"source": "Patient", "type": "TAKES", "target": "Medication"},
+        {"source": "Patient", "type": "INSURED_BY", "target": "InsuranceProvider"},
+        {"source": "Doctor", "type": "WORKS_AT", "target": "Hospital"},
+    ],
+}
+
+
+def row_texts(df):
+    """Vectorized "col: value, col: value" strings, one per row."""
+    text = None
+    for col in df.columns:
+        # Missing cells render as "nan", like the f-string join did
+        part = f"{col}: " + df[col].astype(str).fillna("nan")
+        text = part if text is None else text + ", " + part
+    return text
+
+
+def iter_csv_documents(path, source=None, chunksize=DEFAULT_CHUNKSIZE, max_rows=None):
+    """Yield one Document per CSV row, reading `chunksize` rows at a time."""
+    source = source or path
+    emitted = 0
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        if max_rows is not None:
+            chunk = chunk.head(max_rows - emitted)
+        for idx, content in zip(chunk.index, row_texts(chunk).tolist()):
+            yield Document(page_content=content, metadata={'row': int(idx), 'source': source})
+        emitted += len(chunk)
+        if max_rows is not None and emitted >= max_rows:
+            return
+
+
+def _records(frame):
+    # Neo4j properties cannot hold NaN or numpy scalars
+    frame = frame.astype(object).where(frame.notna(), None)
+    return frame.to_dict("records")
+
+
+def _names(chunk, spec):
+    names = chunk[spec["id"]].astype("string").str.strip()
+    if spec.get("title_case"):
+        names = names.str.title()
+    return names
+
+
+def _node_ids(chunk, spec):
+    """The `id` column, or with `key` columns "name (key1, key2)" so same-named rows stay apart."""
+    ids = _names(chunk, spec)
+    if spec.get("key"):
+        key = None
+        for col in spec["key"]:
+            part = chunk[col].astype("string").str.strip().fillna("?")
+            key = part if key is None else key + ", " + part
+        ids = ids + " (" + key + ")"
+    return ids
+
+
+def mapped_rows(chunk, mapping, source=None, include_source=True):
+    """
+    Turn one DataFrame chunk into bulk-loader rows using `mapping`:
+    {"nodes": {label: {"id": col, "key": [cols], "properties": [cols]}},
+     "relationships": [{"source": label, "type": TYPE, "target": label, "properties": [cols]}]}
+    where the optional `key` columns are added to the id (see _node_ids).
+    """
+    ids = {label: _node_ids(chunk, spec) for label, spec in mapping["nodes"].items()}
+
+    nodes = {}
+    for label, spec in mapping["nodes"].items():
+        columns = spec.get("properties", [])
+        frame = chunk[columns].copy()
+        if spec.get("key"):
+            frame.insert(0, "name", _names(chunk, spec))
+        frame.insert(0, "__id", ids[label])
+        frame = frame.dropna(subset=["__id"]).drop_duplicates("__id")
+        nodes[label] = [
+            {"id": record.pop("__id"), "properties": record} for record in _records(frame)
+        ]
+
+    relationships = {}
+    for rel in mapping["relationships"]:
+        columns = rel.get("properties", [])
+        frame = chunk[columns].copy()
+        frame.insert(0, "__source", ids[rel["source"]])
+        frame.insert(1, "__target", ids[rel["target"]])
+        frame = frame.dropna(subset=["__source", "__target"]).drop_duplicates(["__source", "__target"])
+        relationships.setdefault(rel["type"], []).extend(
+            {"source": record.pop("__source"), "target": record.pop("__target"), "properties": record}
+            for record in _records(frame)
+        )
+
+    grouped = {"nodes": nodes, "relationships": relationships, "documents": [], "mentions": []}
+    if include_source:
+        texts = row_texts(chunk).tolist()
+        doc_ids = [md5(text.encode("utf-8")).hexdigest() for text in texts]
+        grouped["documents"] = [
+            {"id": doc_id, "text": text, "metadata": {"row": int(idx), "source": source, "id": doc_id}}
+            for doc_id, text, idx in zip(doc_ids, texts, chunk.index)
+        ]
+        for label in mapping["nodes"]:
+            grouped["mentions"].extend(
+                {"doc_id": doc_id, "id": node_id}
+                for doc_id, node_id in zip(doc_ids, ids[label].tolist())
+                if node_id is not pd.NA
+            )
+    return grouped
+
+
+def load_csv_with_mapping(graph, path, mapping=HEALTHCARE_MAPPING, source=None,
+                          chunksize=DEFAULT_CHUNKSIZE, batch_size=DEFAULT_BATCH_SIZE,
+                          include_source=True, on_progress=None):
+    """
+    Load a whole CSV into Neo4j without any LLM call. Returns write counts.
+    `on_progress(totals)` is called after every chunk of rows is written.
+    """
+    source = source or path
+    ensure_constraints(graph, mapping["nodes"].keys())
+    totals = {"rows": 0, "nodes": 0, "relationships": 0, "documents": 0, "transactions": 0}
+    for chunk in telemetry.timed_iter(pd.read_csv(path, chunksize=chunksize), "load", source=source):
+        with telemetry.span("split", rows=len(chunk)):
+            grouped = mapped_rows(chunk, mapping, source, include_source)
+        stats = write_grouped_rows(graph, grouped, batch_size, create_constraints=False)
+        totals["rows"] += len(chunk)
+        for key, value in stats.items():
+            totals[key] += value
+        if on_progress:
+            on_progress(totals)
+    bump_graph_version(graph)
+    return totals
@@ -0,0 +1,280 @@
+"""
+Spans and metrics for ingestion and QA.
+
+Every stage reports a span (name, start, duration, attributes, parent):
+
+- ingestion: `load` (one PDF page parsed), `split` (one chunk built, page
+  parsing excluded), `extract` (one LLM extraction call, with its input /
+  output tokens), `write` (one bulk write of grouped rows)
+- QA: `retrieval`, `cypher_generation`, `database` and `answer`, children
+  of one `query` span per question (recorded by qa_trace.StageTimer)
+
+Spans feed the in-process MetricsRegistry: a `graphrag_stage_seconds`
+histogram per stage plus token, row and query counters. It renders the
+Prometheus text format (`render_prometheus`, or `start_metrics_server` for
+a /metrics endpoint, on 127.0.0.1 unless another host is given). Span exporters receive every finished span;
+FileSpanExporter appends them as JSON lines, and setting GRAPHRAG_TRACE_FILE
+installs one for the whole process. No dependency is needed; the span
+records carry OpenTelemetry-style trace / span / parent ids, so a collector
+can ingest the file.
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+STAGE_METRIC = "graphrag_stage_seconds"
+
+_current = contextvars.ContextVar("graphrag_span", default=None)  # (trace_id, span_id)
+_nested = threading.local()  # timed_iter: time spent in inner timed iterators
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels_text(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels) + "}"
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                return
+        self.counts[-1] += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (Prometheus style, no interpolation)."""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, n in zip(self.buckets + (float("inf"),), self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class MetricsRegistry:
+    """Counters and histograms keyed by name and label set; thread-safe."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def counter(self, name, **labels):
+        with self._lock:
+            return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def stage_summary(self):
+        """{stage: {"count", "seconds", "mean_ms", "p95_ms"}} from the stage histogram."""
+        summary = {}
+        with self._lock:
+            for (name, labels), histogram in self._histograms.items():
+                if name != STAGE_METRIC or not histogram.count:
+                    continue
+                p95 = histogram.quantile(0.95)
+                summary[dict(labels)["stage"]] = {
+                    "count": histogram.count, "seconds": histogram.sum,
+                    "mean_ms": histogram.sum / histogram.count * 1000,
+                    "p95_ms": p95 * 1000 if p95 != float("inf") else None,
+                }
+        return summary
+
+    def render_prometheus(self):
+        lines = []
+        with self._lock:
+            typed = set()
+            for (name, labels), value in sorted(self._counters.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {name} counter")
+                    typed.add(name)
+                lines.append(f"{name}{_labels_text(labels)} {value}")
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {name} histogram")
+                    typed.add(name)
+                cumulative = 0
+                for bound, n in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                    cumulative += n
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{name}_bucket{_labels_text(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{_labels_text(labels)} {histogram.sum}")
+                lines.append(f"{name}_count{_labels_text(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+REGISTRY = MetricsRegistry()
+_exporters = []
+
+
+class FileSpanExporter:
+    """Appends finished spans to a JSON-lines file."""
+
+    def __init__(self, path):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+
+    def export(self, record):
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+def add_exporter(exporter):
+    _exporters.append(exporter)
+    return exporter
+
+
+def remove_exporter(exporter):
+    if exporter in _exporters:
+        _exporters.remove(exporter)
+
+
+def new_span_id():
+    return uuid.uuid4().hex[:16]
+
+
+def record_span(name, start, seconds, attributes=None, trace_id=None, span_id=None, parent_id=None):
+    """
+    Record an already-measured span: observe it in the stage histogram and
+    hand it to the exporters. `start` is a time.time() timestamp. Without
+    ids the span is a child of the current span() context, if any.
+    """
+    if trace_id is None:
+        current = _current.get()
+        trace_id, parent_id = current if current else (uuid.uuid4().hex, parent_id)
+    REGISTRY.observe(STAGE_METRIC, seconds, stage=name)
+    if _exporters:
+        record = {"name": name, "trace_id": trace_id, "span_id": span_id or new_span_id(), "parent_id": parent_id,
+                  "start": start, "duration_ms": seconds * 1000, "attributes": attributes or {}}
+        for exporter in list(_exporters):
+            exporter.export(record)
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Time a block as a span. Yields its attribute dict, so the block can add
+    results (`attributes["output_tokens"] = ...`); an exception is recorded
+    as `error` and re-raised.
+    """
+    parent = _current.get()
+    trace_id = parent[0] if parent else uuid.uuid4().hex
+    span_id = new_span_id()
+    token = _current.set((trace_id, span_id))
+    start, started = time.time(), time.perf_counter()
+    try:
+        yield attributes
+    except BaseException as e:
+        attributes["error"] = repr(e)
+        REGISTRY.inc("graphrag_errors_total", stage=name)
+        raise
+    finally:
+        _current.reset(token)
+        record_span(name, start, time.perf_counter() - started, attributes, trace_id, span_id,
+                    parent[1] if parent else None)
+
+
+def timed_iter(iterable, name, **attributes):
+    """
+    Yield from `iterable`, recording one `name` span per item for the time
+    spent producing it. Time spent in timed iterators it pulls from (pages
+    under chunks) is left to their own spans.
+    """
+    if not hasattr(_nested, "stack"):
+        _nested.stack = []
+    stack = _nested.stack
+    iterator = iter(iterable)
+    while True:
+        stack.append(0.0)
+        start, started = time.time(), time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            stack.pop()
+            return
+        except BaseException:
+            stack.pop()
+            raise
+        elapsed = time.perf_counter() - started
+        inner = stack.pop()
+        if stack:
+            stack[-1] += elapsed
+        record_span(name, start, elapsed - inner, dict(attributes))
+        yield item
+
+
+def record_tokens(input_tokens=None, output_tokens=None, **labels):
+    if input_tokens:
+        REGISTRY.inc("graphrag_llm_tokens_total", input_tokens, direction="input", **labels)
+    if output_tokens:
+        REGISTRY.inc("graphrag_llm_tokens_total", output_tokens, direction="output", **labels)
+
+
+def start_metrics_server(port, registry=REGISTRY, host="127.0.0.1"):
+    """
+    Serve the registry at http://host:port/metrics from a daemon thread.
+    Only local scrapers can reach the default host; pass "0.0.0.0" (or an
+    interface address) to expose it.
+    """
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") not in ("", "/metrics"):
+                self.send_error(404)
+                return
+            body = registry.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), _Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
+
+
+if os.getenv("GRAPHRAG_TRACE_FILE"):
+    add_exporter(FileSpanExporter(os.environ["GRAPHRAG_TRACE_FILE"]))
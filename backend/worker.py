@@ -0,0 +1,156 @@
+"""
+Background ingestion worker.
+
+"Create & Store Graph Documents" used to run the whole PDF job inside the
+Streamlit script thread: the page froze until it finished, and a rerun
+killed it. IngestionWorker runs jobs in a pool of worker processes instead.
+The UI submits an upload and gets a job id back at once, then polls the job
+store (backend.jobs) for status and progress while the page, and querying,
+keep working. Several uploads queue up and run `max_workers` at a time.
+
+Each worker process keeps its own pooled LLM client and Neo4j driver
+(backend.resources) across jobs. Jobs share the job store (SQLite), the
+extraction cache (SQLite), and the manifest and alias table (JSON files).
+Each job saves only its own source to the manifest, merged into the file
+under a lock, and alias tables are merged on save. Credentials go to the
+worker with the job and are never written to the job store.
+"""
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from backend.jobs import DEFAULT_JOBS_PATH, JobStore, job_id_for, plan_pdf_job, run_job
+
+DEFAULT_UPLOAD_DIR = os.getenv("GRAPHRAG_UPLOADS", ".graphrag_cache/uploads")
+DEFAULT_MAX_WORKERS = int(os.getenv("GRAPHRAG_INGEST_WORKERS", "2"))
+# Seconds between progress snapshots written to the job store
+PROGRESS_INTERVAL = 1.0
+
+
+def save_upload(data, name, upload_dir=DEFAULT_UPLOAD_DIR):
+    """
+    Store uploaded bytes under a content-addressed name. The file outlives
+    the Streamlit rerun that received it, and the same upload always maps to
+    the same path (and job).
+    """
+    os.makedirs(upload_dir, exist_ok=True)
+    digest = hashlib.sha256(data).hexdigest()[:16]
+    path = os.path.join(upload_dir, f"{digest}{os.path.splitext(name)[1] or '.pdf'}")
+    if not os.path.exists(path):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    return path
+
+
+def _graph_transformer(llm, provider):
+    from langchain_experimental.graph_transformers import LLMGraphTransformer
+
+    from backend.extraction_cache import CachedGraphTransformer, ExtractionCache
+
+    transformer = LLMGraphTransformer(llm=llm, node_properties=False, relationship_properties=False)
+    return CachedGraphTransformer(transformer, ExtractionCache(),
+                                  model=provider + ":" + (getattr(llm, "model_name", None) or llm.model),
+                                  temperature=llm.temperature)
+
+
+def ingest_pdf_job(job_id, path, source, settings, jobs_path=DEFAULT_JOBS_PATH):
+    """
+    Plan (or resume) and run one PDF job; runs in a worker process.
+
+    `settings`: provider, api_key, model (optional), neo4j (url, username,
+    password), max_concurrency and requests_per_second (optional).
+    """
+    from backend.chunking import TokenChunker
+    from backend.entity_resolution import AliasTable, EntityResolver
+    from backend.incremental import IngestionManifest
+    from backend.resources import alias_path, get_graph, get_llm, graph_scope, manifest_path
+
+    store = JobStore(jobs_path)
+    try:
+        llm = get_llm(settings["provider"], settings["api_key"], settings.get("model"), temperature=0.4)
+        graph = get_graph(*settings["neo4j"], enhanced_schema=True)
+        scope = graph_scope(graph)
+        manifest = IngestionManifest(manifest_path(scope), scope={source})
+        config = {"provider": settings["provider"], "model": settings.get("model")}
+        plan_pdf_job(store, path, source, TokenChunker.for_llm(llm), manifest, config, scope)
+        last_saved = 0.0
+
+        def _save_progress(progress):
+            nonlocal last_saved
+            if time.monotonic() - last_saved >= PROGRESS_INTERVAL or progress["written"] == progress["total"]:
+                store.set_progress(job_id, progress)
+                last_saved = time.monotonic()
+
+        return run_job(store, job_id, _graph_transformer(llm, settings["provider"]), graph,
+                       manifest=manifest, resolver=EntityResolver(AliasTable(alias_path(scope), merge_on_save=True)),
+                       max_concurrency=settings.get("max_concurrency", 8),
+                       requests_per_second=settings.get("requests_per_second"),
+                       on_progress=_save_progress)
+    except Exception as e:
+        # run_job records its own failures; this catches setup errors (credentials, planning)
+        job = store.get(job_id)
+        if job is None or job["status"] not in ("failed", "interrupted"):
+            store.set_status(job_id, "failed", repr(e))
+        raise
+    finally:
+        store.close()
+
+
+class IngestionWorker:
+    """
+    Process pool that runs submitted PDF jobs. Worker processes are spawned,
+    not forked, so they do not inherit the threads of a Streamlit server.
+
+        worker = IngestionWorker()
+        job_id = worker.submit(path, "book.pdf", settings)
+        worker.status(job_id)  # {"status", "counts", "progress", "error", ...}
+    """
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, jobs_path=DEFAULT_JOBS_PATH):
+        self.jobs_path = jobs_path
+        self.store = JobStore(jobs_path)
+        self._pool = ProcessPoolExecutor(max_workers, mp_context=multiprocessing.get_context("spawn"))
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def submit(self, path, source, settings):
+        """Queue a PDF for ingestion and return its job id; a job already queued or running is not duplicated."""
+        from backend.resources import credentials_scope
+
+        # Same id as ingest_pdf_job plans under, without connecting here
+        job_id = job_id_for(path, source, credentials_scope(*settings["neo4j"][:2]))
+        with self._lock:
+            future = self._futures.get(job_id)
+            if future is not None and not future.done():
+                return job_id
+            self.store.enqueue(job_id, path, source,
+                               {"provider": settings["provider"], "model": settings.get("model")})
+            self._futures[job_id] = self._pool.submit(ingest_pdf_job, job_id, path, source, settings,
+                                                      self.jobs_path)
+        return job_id
+
+    def status(self, job_id):
+        """The job as recorded in the job store, or None for an unknown id."""
+        job = self.store.get(job_id)
+        with self._lock:
+            future = self._futures.get(job_id)
+        if job is not None and future is not None and future.done() and future.exception() is not None:
+            # The worker process died before it could record the failure
+            if job["status"] in ("queued", "planned", "running"):
+                self.store.set_status(job_id, "failed", repr(future.exception()))
+                job = self.store.get(job_id)
+        return job
+
+    def active(self):
+        """Ids of the jobs this worker has queued or is running."""
+        with self._lock:
+            return [job_id for job_id, future in self._futures.items() if not future.done()]
+
+    def shutdown(self, wait=False):
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+        self.store.close()
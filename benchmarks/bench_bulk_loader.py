@@ -0,0 +1,102 @@
+"""
+Write throughput: Neo4jGraph.add_graph_documents vs backend.bulk_loader.
+
+    python -m benchmarks.bench_bulk_loader --neo4j-uri bolt://localhost:7687
+    python -m benchmarks.bench_bulk_loader                     # in-process stand-in
+
+Only the first form measures anything. It needs a scratch database (it is
+wiped between runs), e.g.
+    docker run -p 7687:7687 -e NEO4J_AUTH=neo4j/password \\
+        -e NEO4J_PLUGINS='["apoc"]' neo4j:5
+
+Without --neo4j-uri the writes go to benchmarks.stand_in.SimulatedGraph,
+which executes no Cypher. Its seconds are mostly charged by an assumed cost
+model (--rtt per query, --index-cost per indexed row, --scan-cost per node
+scanned by an unconstrained merge), so the speedup it reports follows from
+those constants. It is useful for counting round trips and for seeing how
+each path scales with them, not as a throughput figure.
+"""
+import argparse
+import os
+import random
+import time
+
+from langchain_community.graphs.graph_document import GraphDocument, Node, Relationship
+from langchain_core.documents import Document
+
+from backend.bulk_loader import bulk_write_graph_documents
+from benchmarks.stand_in import SimulatedGraph
+
+
+def synthetic_graph_documents(n_docs, nodes_per_doc=8, vocabulary=None, seed=7):
+    """Documents mentioning entities from a shared vocabulary, chained by relationships."""
+    rng = random.Random(seed)
+    vocabulary = vocabulary or n_docs * 4
+    labels = ["Concept", "Technique", "Parameter", "Model"]
+    graph_documents = []
+    for i in range(n_docs):
+        ids = rng.sample(range(vocabulary), nodes_per_doc)
+        nodes = [Node(id=f"entity-{j}", type=labels[j % len(labels)]) for j in ids]
+        relationships = [Relationship(source=a, target=b, type=rng.choice(["RELATED_TO", "USES", "PART_OF"]))
+                         for a, b in zip(nodes, nodes[1:])]
+        graph_documents.append(GraphDocument(
+            nodes=nodes, relationships=relationships,
+            source=Document(page_content=f"synthetic chunk {i}", metadata={"source": "bench"}),
+        ))
+    return graph_documents
+
+
+def _run(graph, write):
+    """(wall seconds, simulated seconds charged by the stand-in)."""
+    start = time.perf_counter()
+    write()
+    return time.perf_counter() - start, getattr(graph, "simulated_seconds", 0.0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100,1000,5000", help="comma-separated document counts")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--neo4j-uri", help="benchmark against a real (scratch!) Neo4j instead of the stand-in")
+    defaults = SimulatedGraph()
+    parser.add_argument("--rtt", type=float, default=defaults.rtt,
+                        help="stand-in: assumed seconds per query (round trip + commit)")
+    parser.add_argument("--index-cost", type=float, default=defaults.index_cost,
+                        help="stand-in: assumed seconds per row merged through an index")
+    parser.add_argument("--scan-cost", type=float, default=defaults.scan_cost,
+                        help="stand-in: assumed seconds per node scanned by an unconstrained merge")
+    args = parser.parse_args(argv)
+
+    def make_graph():
+        if not args.neo4j_uri:
+            return SimulatedGraph(rtt=args.rtt, index_cost=args.index_cost, scan_cost=args.scan_cost)
+        from langchain_neo4j import Neo4jGraph
+        graph = Neo4jGraph(url=args.neo4j_uri, username=os.getenv("NEO4J_USERNAME", "neo4j"),
+                           password=os.getenv("NEO4J_PASSWORD", "password"), refresh_schema=False)
+        graph.query("MATCH (n) DETACH DELETE n")
+        return graph
+
+    if args.neo4j_uri:
+        print(f"Neo4j at {args.neo4j_uri}: measured write time")
+    else:
+        print(f"SIMULATED, not Neo4j: seconds = Python wall time + an assumed cost model "
+              f"(rtt={args.rtt:g}s/query, index_cost={args.index_cost:g}s/row, scan_cost={args.scan_cost:g}s/node); "
+              f"the speedup follows from these constants. Pass --neo4j-uri for measured numbers")
+    print(f"{'docs':>6} {'path':<22} {'seconds':>9} {'simulated':>10} {'docs/s':>9} {'queries':>8}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        for name in ("add_graph_documents", "bulk_loader"):
+            graph = make_graph()
+            graph_documents = synthetic_graph_documents(size)
+            if name == "add_graph_documents":
+                wall, simulated = _run(graph, lambda: graph.add_graph_documents(graph_documents,
+                                                                                include_source=True))
+            else:
+                wall, simulated = _run(graph, lambda: bulk_write_graph_documents(
+                    graph, graph_documents, batch_size=args.batch_size))
+            seconds = wall + simulated
+            queries = getattr(graph, "queries", float("nan"))
+            print(f"{size:>6} {name:<22} {seconds:>9.2f} {simulated:>10.2f} {size / seconds:>9.0f} {queries:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Entity lookup latency vs node count: `toLower(n.id) CONTAINS` scan vs the
+full-text and normalized-id indexes of backend.graph_index.
+
+    python -m benchmarks.bench_entity_lookup --neo4j-uri bolt://localhost:7687
+    python -m benchmarks.bench_entity_lookup                     # in-process model
+
+Only the first form measures Neo4j. Without --neo4j-uri the access paths
+are modelled in-process: the scan lowercases and substring-tests every id
+of a Python list (what Neo4j does per node for a CONTAINS predicate no
+index can serve), the index looks terms up in a dict of postings (what
+Lucene does), and the seek is a dict lookup on normalized_id. That shows
+how each path grows with the node count, not what Neo4j takes; the output
+says which mode ran. The Neo4j form needs a scratch database (it is wiped
+between runs), e.g.
+    docker run -p 7687:7687 -e NEO4J_AUTH=neo4j/password \\
+        -e NEO4J_PLUGINS='["apoc"]' neo4j:5
+"""
+import argparse
+import heapq
+import os
+import random
+import statistics
+import time
+from collections import defaultdict
+from itertools import islice
+
+from langchain_community.graphs.graph_document import GraphDocument, Node
+from langchain_core.documents import Document
+
+from backend.bulk_loader import BASE_ENTITY_LABEL, bulk_write_graph_documents
+from backend.graph_index import ENTITY_SEARCH_QUERY, fulltext_query, normalize_id
+
+SYLLABLES = ("ka", "lo", "mi", "ne", "ru", "ta", "vo", "zen", "pri", "qua", "sel", "dor", "fin", "gra")
+
+SCAN_QUERY = f"""
+MATCH (n:`{BASE_ENTITY_LABEL}`) WHERE toLower(n.id) CONTAINS $term
+RETURN n.id AS id LIMIT 10
+"""
+
+SEEK_QUERY = f"""
+MATCH (n:`{BASE_ENTITY_LABEL}` {{normalized_id: $normalized_id}})
+RETURN n.id AS id LIMIT 10
+"""
+
+
+def synthetic_entity_ids(n, seed=7):
+    """Two-word names from a vocabulary that grows with n, so most words are rare like real names."""
+    rng = random.Random(seed)
+    vocabulary = ["".join(rng.choices(SYLLABLES, k=4)) for _ in range(max(1000, n // 2))]
+    return [f"{rng.choice(vocabulary).title()} {rng.choice(vocabulary).title()} {i}" for i in range(n)]
+
+
+class InProcessModel:
+    """Scan, inverted index and normalized-id dict over the same ids."""
+
+    def __init__(self, ids):
+        self.ids = ids
+        self.postings = defaultdict(list)
+        self.normalized = defaultdict(list)
+        for position, node_id in enumerate(ids):
+            normalized = normalize_id(node_id)
+            self.normalized[normalized].append(position)
+            for term in set(normalized.split()):
+                self.postings[term].append(position)
+
+    def scan(self, term):
+        term = term.lower()
+        return list(islice((node_id for node_id in self.ids if term in node_id.lower()), 10))
+
+    def fulltext(self, text):
+        hits = defaultdict(int)
+        for term in fulltext_query(text, fuzzy=False).split(" OR "):
+            for position in self.postings.get(term, ()):
+                hits[position] += 1
+        best = heapq.nlargest(10, hits, key=hits.get)
+        return [self.ids[position] for position in best]
+
+    def seek(self, normalized_id):
+        return [self.ids[position] for position in self.normalized.get(normalized_id, ())[:10]]
+
+
+def _median_ms(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000", help="comma-separated entity counts")
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--neo4j-uri", help="benchmark against a real (scratch!) Neo4j instead of the model")
+    args = parser.parse_args(argv)
+
+    if args.neo4j_uri:
+        print(f"Neo4j at {args.neo4j_uri}: query latency, median of {args.repeats}")
+    else:
+        print("IN-PROCESS MODEL, not Neo4j: Python list scan vs dict lookups, to compare growth only; "
+              "pass --neo4j-uri for database timings")
+    print(f"{'nodes':>9} {'CONTAINS scan ms':>17} {'full-text ms':>13} {'normalized seek ms':>19}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        ids = synthetic_entity_ids(size)
+        target = ids[size // 2]
+        term, text, normalized = target.split()[1].lower(), " ".join(target.split()[:2]), normalize_id(target)
+        if args.neo4j_uri:
+            from langchain_neo4j import Neo4jGraph
+            graph = Neo4jGraph(url=args.neo4j_uri, username=os.getenv("NEO4J_USERNAME", "neo4j"),
+                               password=os.getenv("NEO4J_PASSWORD", "password"), refresh_schema=False)
+            graph.query("MATCH (n) DETACH DELETE n")
+            bulk_write_graph_documents(graph, [GraphDocument(
+                nodes=[Node(id=node_id, type="Concept") for node_id in ids], relationships=[], source=Document(page_content="bench"),
+            )], include_source=False)
+            graph.query("CALL db.awaitIndexes(300)")
+            scan = lambda: graph.query(SCAN_QUERY, {"term": term})
+            fulltext = lambda: graph.query(ENTITY_SEARCH_QUERY, {"search": fulltext_query(text), "limit": 10})
+            seek = lambda: graph.query(SEEK_QUERY, {"normalized_id": normalized})
+        else:
+            model = InProcessModel(ids)
+            scan = lambda: model.scan(term)
+            fulltext = lambda: model.fulltext(text)
+            seek = lambda: model.seek(normalized)
+        print(f"{size:>9} {_median_ms(scan, args.repeats):>17.3f} {_median_ms(fulltext, args.repeats):>13.3f} "
+              f"{_median_ms(seek, args.repeats):>19.3f}")
+
+
+if __name__ == "__main__":
+    main()
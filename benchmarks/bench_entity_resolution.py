@@ -0,0 +1,62 @@
+"""
+Entity resolution time vs number of distinct entities.
+
+    python -m benchmarks.bench_entity_resolution
+    python -m benchmarks.bench_entity_resolution --sizes 10000,100000,300000
+
+Every synthetic entity appears under a few surface forms (case, hyphen,
+spacing, plural), spread over documents of `nodes_per_doc` mentions.
+Blocking and MinHash LSH keep the cost per entity flat; an all-pairs
+comparison would grow with the square of the entity count.
+"""
+import argparse
+import random
+import time
+
+from langchain_community.graphs.graph_document import GraphDocument, Node, Relationship
+from langchain_core.documents import Document
+
+from backend.entity_resolution import EntityResolver
+
+SYLLABLES = ("ka", "lo", "mi", "ne", "ru", "ta", "vo", "zen", "pri", "qua", "sel", "dor", "fin", "gra")
+
+
+def surface_forms(name, rng):
+    first, second = name.split()
+    return rng.sample([name, name.lower(), f"{first}-{second}", f"{first}{second}", name + "s"], 3)
+
+
+def synthetic_documents(n_entities, nodes_per_doc=8, seed=7):
+    rng = random.Random(seed)
+    words = ["".join(rng.choices(SYLLABLES, k=4)) for _ in range(max(1000, n_entities // 4))]
+    names = {f"{rng.choice(words).title()} {rng.choice(words).title()}" for _ in range(n_entities)}
+    mentions = [form for name in names for form in surface_forms(name, rng)]
+    rng.shuffle(mentions)
+    documents = []
+    for start in range(0, len(mentions), nodes_per_doc):
+        nodes = [Node(id=form, type="Concept") for form in mentions[start:start + nodes_per_doc]]
+        documents.append(GraphDocument(
+            nodes=nodes, relationships=[Relationship(source=a, target=b, type="RELATED_TO")
+                                        for a, b in zip(nodes, nodes[1:])],
+            source=Document(page_content=f"synthetic chunk {start}"),
+        ))
+    return len(names), len(set(mentions)), documents
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,30000,100000,300000", help="comma-separated entity counts")
+    args = parser.parse_args(argv)
+
+    print(f"{'entities':>9} {'surface ids':>12} {'canonical':>10} {'pairs':>9} {'seconds':>8} {'us/id':>7}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        entities, surfaces, documents = synthetic_documents(size)
+        start = time.perf_counter()
+        _, report = EntityResolver().resolve(documents)
+        seconds = time.perf_counter() - start
+        print(f"{entities:>9} {surfaces:>12} {report['canonical']:>10} {report['compared_pairs']:>9} "
+              f"{seconds:>8.2f} {seconds / surfaces * 1e6:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Large-graph export: layout time, cache hit and payload size.
+
+    python -m benchmarks.bench_layout [--sizes 5000 50000]
+
+Synthetic knowledge graph: labelled nodes with mostly local edges (two per
+node), written through utils.large_graph with a stand-in graph.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from utils.large_graph import export_large_graph
+
+LABELS = ["Concept", "Person", "Technology", "Organization", "Method", "Publication", "Framework", "Document"]
+
+
+class SyntheticGraph:
+    def __init__(self, n, seed=5):
+        rng = np.random.default_rng(seed)
+        labels = rng.integers(0, len(LABELS), n)
+        order = np.argsort(labels, kind="stable")
+        a = rng.integers(0, n, 2 * n)
+        b = np.clip(a + rng.integers(-30, 30, 2 * n), 0, n - 1)
+        self.rows = [{"kind": "node", "id": f"n{i}", "labels": [LABELS[labels[i]], "__Entity__"],
+                      "properties": {"id": f"{LABELS[labels[i]]}{i}"}, "source": None, "target": None, "type": None}
+                     for i in range(n)]
+        self.rows += [{"kind": "relationship", "id": f"r{j}", "labels": None, "properties": {},
+                       "source": f"n{order[s]}", "target": f"n{order[t]}", "type": "RELATED_TO"}
+                      for j, (s, t) in enumerate(zip(a, b)) if s != t]
+
+    def query(self, cypher, params=None):
+        if "__GraphMeta__" in cypher:
+            return [{"version": 1}]
+        return self.rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5000, 50000])
+    args = parser.parse_args(argv)
+
+    print(f"{'nodes':>7} {'edges':>7} {'first s':>8} {'cached s':>9} {'html MB':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.sizes:
+            graph = SyntheticGraph(n)
+            output = os.path.join(tmp, f"graph-{n}.html")
+            timings = []
+            for _ in range(2):
+                start = time.perf_counter()
+                report = export_large_graph(graph, max_nodes=n, max_relationships=4 * n,
+                                            output_file=output, layout_dir=os.path.join(tmp, "layouts"))
+                timings.append(time.perf_counter() - start)
+            print(f"{report['nodes_kept']:>7} {report['relationships_kept']:>7} {timings[0]:>8.2f} "
+                  f"{timings[1]:>9.2f} {os.path.getsize(output) / 1e6:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
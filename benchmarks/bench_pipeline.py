@@ -0,0 +1,199 @@
+"""
+End-to-end pipeline benchmark: PDF/CSV load, chunk, extract, write, query
+and visualize over synthetic corpora of increasing size.
+
+    python -m benchmarks.bench_pipeline                          # stand-in graph
+    python -m benchmarks.bench_pipeline --pages 20,100,400 --json bench.json
+    python -m benchmarks.bench_pipeline --neo4j-uri bolt://localhost:7687
+
+Extraction and QA use the deterministic fake chat models of utils.fake_llm,
+with a simulated fixed + per-output-token latency (--llm-latency,
+--llm-latency-per-token). The default graph is benchmarks.stand_in
+.StoredGraph: writes are charged a simulated round-trip and per-row cost,
+which is added to the write stages' wall time. --neo4j-uri runs against a
+scratch Neo4j instead (it is wiped), e.g.
+    docker run -p 7687:7687 -e NEO4J_AUTH=neo4j/password \\
+        -e NEO4J_PLUGINS='["apoc"]' neo4j:5
+
+Each corpus runs in a fresh process so its peak RSS is its own. Per stage
+the report shows items, seconds, items/s and p50/p95 latency per item
+(per chunk for extraction, per question for QA, per render for
+visualization). --json writes the same numbers for regression tracking.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+class TimedTransformer:
+    """Records the latency of every extraction call (rate-limit waits excluded)."""
+
+    def __init__(self, transformer):
+        self.transformer = transformer
+        self.latencies = []
+
+    async def aprocess_response(self, document):
+        start = time.perf_counter()
+        result = await self.transformer.aprocess_response(document)
+        self.latencies.append(time.perf_counter() - start)
+        return result
+
+
+def _simulated(graph):
+    return getattr(graph, "simulated_seconds", 0.0)
+
+
+def _stage(name, items, seconds, latencies=()):
+    latencies = np.asarray(latencies, dtype=float) * 1000
+    return {
+        "stage": name, "items": items, "seconds": seconds,
+        "per_second": items / seconds if seconds else float("nan"),
+        "p50_ms": float(np.percentile(latencies, 50)) if latencies.size else float("nan"),
+        "p95_ms": float(np.percentile(latencies, 95)) if latencies.size else float("nan"),
+    }
+
+
+def _ms(value):
+    return "-" if np.isnan(value) else f"{value:.1f}"
+
+
+def make_graph(neo4j_uri=None):
+    if not neo4j_uri:
+        from benchmarks.stand_in import StoredGraph
+        return StoredGraph()
+    from langchain_neo4j import Neo4jGraph
+    graph = Neo4jGraph(url=neo4j_uri, username=os.getenv("NEO4J_USERNAME", "neo4j"),
+                       password=os.getenv("NEO4J_PASSWORD", "password"), refresh_schema=False)
+    graph.query("MATCH (n) DETACH DELETE n")
+    return graph
+
+
+def run_corpus(pages, options):
+    """All stages over one corpus; runs in its own process."""
+    from langchain_neo4j import GraphCypherQAChain
+
+    from backend.bulk_loader import bulk_write_graph_documents
+    from backend.chunking import TokenChunker
+    from backend.extraction import aiter_graph_documents
+    from backend.pdf_pipeline import iter_pdf_chunks
+    from backend.structured import load_csv_with_mapping
+    from benchmarks.corpora import write_synthetic_csv, write_synthetic_pdf
+    from utils.fake_llm import FakeQAChatModel, make_fake_graph_transformer
+    from utils.visualizer import visualize_neo4j_graph
+
+    results = []
+    graph = make_graph(options["neo4j_uri"])
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = write_synthetic_pdf(os.path.join(tmp, "corpus.pdf"), pages)
+        csv_path = write_synthetic_csv(os.path.join(tmp, "corpus.csv"), pages * options["csv_rows_per_page"])
+
+        start = time.perf_counter()
+        chunks = list(iter_pdf_chunks(pdf_path, "corpus.pdf",
+                                      chunker=TokenChunker(max_output_tokens=options["max_output_tokens"])))
+        results.append(_stage("pdf parse+chunk", pages, time.perf_counter() - start))
+
+        transformer, llm = make_fake_graph_transformer(latency=options["llm_latency"],
+                                                       latency_per_token=options["llm_latency_per_token"],
+                                                       relations_per_call=options["relations_per_chunk"])
+        timed = TimedTransformer(transformer)
+
+        async def _extract():
+            return [gd async for gd in aiter_graph_documents(timed, chunks,
+                                                             max_concurrency=options["concurrency"])]
+
+        start = time.perf_counter()
+        graph_documents = asyncio.run(_extract())
+        results.append(_stage("extract", len(chunks), time.perf_counter() - start, timed.latencies))
+
+        start, simulated = time.perf_counter(), _simulated(graph)
+        bulk_write_graph_documents(graph, graph_documents)
+        results.append(_stage("write", len(graph_documents),
+                              time.perf_counter() - start + _simulated(graph) - simulated))
+
+        start, simulated = time.perf_counter(), _simulated(graph)
+        with contextlib.redirect_stdout(io.StringIO()):
+            csv_report = load_csv_with_mapping(graph, csv_path)
+        results.append(_stage("csv load", csv_report["rows"],
+                              time.perf_counter() - start + _simulated(graph) - simulated))
+
+        qa_llm = FakeQAChatModel(latency=options["llm_latency"], latency_per_token=options["llm_latency_per_token"])
+        chain = GraphCypherQAChain.from_llm(llm=qa_llm, graph=graph, top_k=15, allow_dangerous_requests=True)
+        entities = list(dict.fromkeys(node.id for gd in graph_documents for node in gd.nodes))
+        questions = [f'What is "{entity}" related to?' for entity in entities[:options["questions"]]]
+        latencies, answered = [], 0
+        for question in questions:
+            start = time.perf_counter()
+            answer = chain.invoke({"query": question})["result"]
+            latencies.append(time.perf_counter() - start)
+            answered += " 0 entities" not in answer
+        results.append(_stage("query", len(questions), sum(latencies), latencies))
+
+        cwd = os.getcwd()
+        os.chdir(tmp)  # the PyVis renderer writes its HTML to the working directory
+        try:
+            latencies = []
+            for _ in range(options["renders"]):
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    visualize_neo4j_graph(graph, max_nodes=options["max_nodes"],
+                                          max_relationships=2 * options["max_nodes"])
+                latencies.append(time.perf_counter() - start)
+        finally:
+            os.chdir(cwd)
+        results.append(_stage("visualize", len(latencies), sum(latencies), latencies))
+
+    return {
+        "pages": pages, "chunks": len(chunks), "csv_rows": csv_report["rows"], "questions_answered": answered,
+        "llm_calls": llm.calls + qa_llm.calls, "completion_tokens": llm.completion_tokens + qa_llm.completion_tokens,
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "stages": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", default="10,50,200", help="comma-separated PDF page counts")
+    parser.add_argument("--csv-rows-per-page", type=int, default=50, help="CSV rows per PDF page of a corpus")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="fake LLM seconds per call")
+    parser.add_argument("--llm-latency-per-token", type=float, default=0.0002, help="fake LLM seconds per output token")
+    parser.add_argument("--relations-per-chunk", type=int, default=40, help="fake LLM output size")
+    parser.add_argument("--max-output-tokens", type=int, default=4096, help="sizes the token chunker")
+    parser.add_argument("--concurrency", type=int, default=8, help="parallel extraction calls")
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--renders", type=int, default=3)
+    parser.add_argument("--max-nodes", type=int, default=500, help="visualization sample size")
+    parser.add_argument("--neo4j-uri", help="benchmark against a real (scratch!) Neo4j instead of the stand-in")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+    options = {key: value for key, value in vars(args).items() if key not in ("pages", "json")}
+
+    reports = []
+    for pages in [int(p) for p in args.pages.split(",")]:
+        with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            report = pool.submit(run_corpus, pages, options).result()
+        reports.append(report)
+        print(f"\n{report['pages']} pages, {report['chunks']} chunks, {report['csv_rows']} CSV rows | "
+              f"{report['llm_calls']} LLM calls | {report['questions_answered']} questions answered from the graph | "
+              f"peak RSS {report['peak_rss_mb']:.0f} MB")
+        print(f"  {'stage':<16} {'items':>7} {'seconds':>8} {'items/s':>9} {'p50 ms':>8} {'p95 ms':>8}")
+        for stage in report["stages"]:
+            print(f"  {stage['stage']:<16} {stage['items']:>7} {stage['seconds']:>8.2f} {stage['per_second']:>9.1f} "
+                  f"{_ms(stage['p50_ms']):>8} {_ms(stage['p95_ms']):>8}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"options": options, "corpora": reports}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Synthetic PDF and CSV corpora for the pipeline benchmarks.
+
+The PDF writer emits plain uncompressed text pages (Helvetica, one Tj per
+line) that pypdf extracts like any text PDF, with a running header and a
+page-number footer for the boilerplate filter to find. Entity-like
+capitalised terms recur across pages so extraction yields a connected graph.
+The CSV has the columns of the Kaggle healthcare dataset, so it loads with
+backend.structured.HEALTHCARE_MAPPING.
+"""
+import csv
+import random
+
+SYLLABLES = ("ka", "lo", "mi", "ne", "ru", "ta", "vo", "zen", "pri", "qua", "sel", "dor", "fin", "gra")
+VERBS = ("improves", "depends on", "is evaluated with", "extends", "is compared to", "is used by")
+FILLER = ("in most settings", "for long documents", "when the prompt is short", "at low temperature",
+          "on reasoning benchmarks", "with few examples")
+
+LINES_PER_PAGE = 50
+WORDS_PER_LINE = 12
+
+
+def entity_names(n, seed=11):
+    rng = random.Random(seed)
+    names = set()
+    while len(names) < n:
+        names.add(" ".join("".join(rng.choices(SYLLABLES, k=3)).title() for _ in range(2)))
+    return sorted(names)
+
+
+def _wrap(text, width=WORDS_PER_LINE):
+    words = text.split()
+    return [" ".join(words[i:i + width]) for i in range(0, len(words), width)]
+
+
+def synthetic_page_lines(pages, entities_per_page=6, seed=11):
+    """Lines of text per page: a header, paragraphs of entity sentences, a footer."""
+    rng = random.Random(seed)
+    entities = entity_names(max(20, pages * entities_per_page // 2), seed)
+    for page in range(pages):
+        lines = ["Synthetic Prompt Engineering Handbook", ""]
+        if page % 5 == 0:
+            lines += [f"{page // 5 + 1} {rng.choice(entities)} and related methods", ""]
+        while len(lines) < LINES_PER_PAGE - 2:
+            sentences = [f"{rng.choice(entities)} {rng.choice(VERBS)} {rng.choice(entities)} {rng.choice(FILLER)}."
+                         for _ in range(rng.randint(3, 6))]
+            lines += _wrap(" ".join(sentences)) + [""]
+        lines = lines[:LINES_PER_PAGE - 2] + ["", f"Page {page + 1}"]
+        yield lines
+
+
+def _escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_synthetic_pdf(path, pages, seed=11):
+    """Write a `pages`-page text PDF; returns its path."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for lines in synthetic_page_lines(pages, seed=seed):
+        body = ["BT", "/F1 10 Tf", "13 TL", "50 790 Td"]
+        body += [f"({_escape(line)}) Tj T*" for line in lines]
+        body.append("ET")
+        stream = "\n".join(body).encode("latin-1")
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n".encode("latin-1") + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>")
+        page_ids.append(len(objects))
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{i} 0 R' for i in page_ids)}] /Count {len(page_ids)} >>"
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, obj in enumerate(objects, start=1):
+            offsets.append(f.tell())
+            data = obj if isinstance(obj, bytes) else obj.encode("latin-1")
+            f.write(f"{number} 0 obj\n".encode("latin-1") + data + b"\nendobj\n")
+        xref = f.tell()
+        f.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1"))
+        for offset in offsets:
+            f.write(f"{offset:010d} 00000 n \n".encode("latin-1"))
+        f.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n"
+                .encode("latin-1"))
+    return path
+
+
+HEALTHCARE_COLUMNS = ["Name", "Age", "Gender", "Blood Type", "Medical Condition", "Date of Admission", "Doctor",
+                      "Hospital", "Insurance Provider", "Billing Amount", "Room Number", "Admission Type",
+                      "Discharge Date", "Medication", "Test Results"]
+
+
+def write_synthetic_csv(path, rows, seed=3):
+    """Write `rows` healthcare-dataset rows; returns its path."""
+    rng = random.Random(seed)
+    doctors = [f"Doctor {name}" for name in entity_names(max(10, rows // 20), seed)]
+    hospitals = [f"{name} Hospital" for name in entity_names(max(5, rows // 100), seed + 1)]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEALTHCARE_COLUMNS)
+        for i in range(rows):
+            day = rng.randint(1, 27)
+            writer.writerow([
+                f"patient {i}", rng.randint(18, 90), rng.choice(["Male", "Female"]), rng.choice(["A+", "O-", "B+"]),
+                rng.choice(["Cancer", "Obesity", "Diabetes", "Asthma", "Hypertension", "Arthritis"]),
+                f"2023-03-{day:02d}", rng.choice(doctors), rng.choice(hospitals),
+                rng.choice(["Aetna", "Cigna", "Medicare", "UnitedHealthcare"]), round(rng.uniform(1e3, 5e4), 2),
+                rng.randint(100, 500), rng.choice(["Urgent", "Elective", "Emergency"]), f"2023-04-{day:02d}",
+                rng.choice(["Paracetamol", "Ibuprofen", "Aspirin", "Penicillin", "Lipitor"]),
+                rng.choice(["Normal", "Abnormal", "Inconclusive"]),
+            ])
+    return path
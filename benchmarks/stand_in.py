@@ -0,0 +1,138 @@
+"""
+In-process stand-in for Neo4jGraph used by the benchmarks.
+
+It does not execute Cypher. It records every round trip and charges a
+simulated cost instead of sleeping, so a benchmark over tens of thousands
+of rows finishes in seconds:
+
+- `rtt` seconds per query (network round trip + transaction commit)
+- `index_cost` seconds per row merged through an index/constraint
+- `scan_cost` seconds per existing node of the label for rows merged
+  through apoc.merge.node without a constraint (a label scan)
+
+The default costs are assumptions, not measurements of a Neo4j server; any
+timing derived from them shows the effect of round trips and scans under
+those assumptions only.
+
+StoredGraph also keeps what the bulk loader writes, so the read side of the
+pipeline (graph version, visualization sample, QA lookups) has data.
+"""
+import json
+import re
+from collections import defaultdict
+
+from backend.graph_version import META_LABEL
+
+
+class SimulatedGraph:
+    def __init__(self, rtt=0.002, index_cost=2e-6, scan_cost=5e-8):
+        self.rtt = rtt
+        self.index_cost = index_cost
+        self.scan_cost = scan_cost
+        self.structured_schema = {}
+        self.schema = ""
+        self.queries = 0
+        self.rows = 0
+        self.simulated_seconds = 0.0
+        self.labels = defaultdict(set)
+
+    # Neo4jGraph.add_graph_documents calls this before writing
+    def _check_driver_state(self):
+        pass
+
+    def _touch(self, label, node_id, indexed):
+        nodes = self.labels[label]
+        self.simulated_seconds += self.index_cost if indexed else self.scan_cost * len(nodes)
+        nodes.add(node_id)
+
+    def query(self, query, params=None):
+        params = params or {}
+        self.queries += 1
+        self.simulated_seconds += self.rtt
+        rows = params.get("rows") or params.get("data") or []
+        self.rows += len(rows)
+        indexed = "apoc.merge.node" not in query
+        for row in rows:
+            if "type" in row and "id" in row:            # add_graph_documents node rows
+                self._touch(row["type"], row["id"], indexed)
+            elif "source_label" in row:                  # add_graph_documents relationship rows
+                self._touch(row["source_label"], row["source"], indexed)
+                self._touch(row["target_label"], row["target"], indexed)
+            else:                                        # bulk loader rows (constraint-backed)
+                self.simulated_seconds += self.index_cost
+        return []
+
+    def add_graph_documents(self, graph_documents, include_source=False, baseEntityLabel=False):
+        # Run the real LangChain write path against this stand-in
+        from langchain_neo4j import Neo4jGraph
+        Neo4jGraph.add_graph_documents(self, graph_documents, include_source, baseEntityLabel)
+
+
+_NODE_LABEL_RE = re.compile(r"SET n:`([^`]+)`")
+_REL_TYPE_RE = re.compile(r"MERGE \(s\)-\[r:`([^`]+)`\]->\(t\)")
+# FakeQAChatModel's generated Cypher
+_LOOKUP_RE = re.compile(r'\{id: ("(?:[^"\\]|\\.)*")\}\)-\[r\]-\(m\)')
+
+
+class StoredGraph(SimulatedGraph):
+    """
+    SimulatedGraph that stores bulk-loader rows and answers the reads the
+    pipeline makes: the graph version, the "degree" sample of
+    utils.graph_sampling and FakeQAChatModel's neighbourhood lookup. Other
+    reads return no rows.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.nodes = {}                    # id -> (labels, properties)
+        self.edges = {}                    # (source, type, target) -> properties
+        self.neighbours = defaultdict(set)
+        self.version = 0
+
+    @property
+    def get_schema(self):
+        return self.schema
+
+    @property
+    def get_structured_schema(self):
+        return self.structured_schema
+
+    def refresh_schema(self):
+        pass
+
+    def query(self, query, params=None):
+        super().query(query, params)
+        params = params or {}
+        if META_LABEL in query:
+            if "SET m.version" in query:
+                self.version += 1
+            return [{"version": self.version}]
+        rows = params.get("rows") or []
+        label, rel_type = _NODE_LABEL_RE.search(query), _REL_TYPE_RE.search(query)
+        if label:
+            for row in rows:
+                self.nodes[row["id"]] = (["__Entity__", label.group(1)], {"id": row["id"], **row["properties"]})
+        elif rel_type:
+            for row in rows:
+                self.edges[(row["source"], rel_type.group(1), row["target"])] = row["properties"]
+                self.neighbours[row["source"]].add((rel_type.group(1), row["target"]))
+                self.neighbours[row["target"]].add((rel_type.group(1), row["source"]))
+        elif "ORDER BY degree DESC" in query:
+            return self._degree_sample(params["max_nodes"], params["max_relationships"])
+        else:
+            lookup = _LOOKUP_RE.search(query)
+            if lookup:
+                entity = json.loads(lookup.group(1))
+                return [{"entity": entity, "relationship": rel, "neighbour": other}
+                        for rel, other in sorted(self.neighbours.get(entity, ()))]
+        return []
+
+    def _degree_sample(self, max_nodes, max_relationships):
+        sample = sorted(self.nodes, key=lambda i: len(self.neighbours.get(i, ())), reverse=True)[:max_nodes]
+        kept = set(sample)
+        rows = [{"kind": "node", "id": i, "labels": self.nodes[i][0], "properties": self.nodes[i][1],
+                 "source": None, "target": None, "type": None} for i in sample]
+        edges = [key for key in self.edges if key[0] in kept and key[2] in kept][:max_relationships]
+        rows += [{"kind": "relationship", "id": f"{s}|{t}|{o}", "labels": None, "properties": self.edges[(s, t, o)],
+                  "source": s, "target": o, "type": t} for s, t, o in edges]
+        return rows
@@ -1,14 +1,21 @@
 import sys
-import tempfile
+import pandas as pd
 import streamlit as st
-from langchain.document_loaders import PyPDFLoader
-from langchain_core.documents import Document
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_anthropic import ChatAnthropic
-from langchain_openai import ChatOpenAI
 from langchain_experimental.graph_transformers import LLMGraphTransformer
-from langchain_neo4j import GraphCypherQAChain, Neo4jGraph
-from langchain_community.graphs import Neo4jGraph
+from backend.chunking import TokenChunker
+from backend.communities import build_community_summaries
+from backend.entity_resolution import AliasTable
+from backend.extraction_cache import CachedGraphTransformer, ExtractionCache
+from backend.incremental import IngestionManifest, reset_graph
+from backend.jobs import format_progress
+from backend.pdf_pipeline import estimate_pdf_extraction
+from backend.qa_stream import QueryStream
+from backend.resources import (alias_path, get_community_qa, get_community_store, get_graph, get_hybrid_qa,
+                               get_ingestion_worker, get_llm, get_metrics_server, get_qa_chain, graph_scope,
+                               manifest_path)
+from backend.schema_cache import load_schema
+from backend.telemetry import REGISTRY
+from backend.worker import save_upload
 
 llm = None
 graph_transformer = None
@@ -23,6 +30,9 @@ st.set_page_config(
     )
 
 st.title("Knowledge-Graph RAG")
+# Prometheus /metrics endpoint when GRAPHRAG_METRICS_PORT is set (once per process,
+# on 127.0.0.1 unless GRAPHRAG_METRICS_HOST says otherwise)
+get_metrics_server()
 
 # =========================
 # LLM & Graph Transformer Initialization
@@ -34,20 +44,9 @@ with st.sidebar:
 api_key = st.sidebar.text_input("Enter your API Key:", type='password')
 graph_transformer_button = st.sidebar.button("Check & Connect ")
 
-if llm_provider == "OpenAI":
-    if api_key:
-        llm = ChatOpenAI(
-            openai_api_key=api_key,
-            model="gpt-4.1",
-            temperature=0.4
-        )
-elif llm_provider == "Anthropic":
-    if api_key:
-        llm = ChatAnthropic(
-            model="claude-3-5-sonnet-20241022",
-            temperature=0.4,
-            anthropic_api_key=api_key
-        )
+# Clients are pooled per provider and key (backend.resources), not rebuilt on every rerun
+if api_key:
+    llm = get_llm(llm_provider, api_key, temperature=0.4)
 if graph_transformer_button:
     if llm:
         graph_transformer = LLMGraphTransformer(
@@ -55,6 +54,10 @@ if graph_transformer_button:
             node_properties=False,  # Disabled to reduce token usage
             relationship_properties=False  # Disabled to reduce token usage
         )
+        # Skip the LLM for chunks already extracted with the same model and settings
+        graph_transformer = CachedGraphTransformer(graph_transformer, ExtractionCache(),
+                                                   model=llm_provider + ":" + (getattr(llm, "model_name", None) or llm.model),
+                                                   temperature=llm.temperature)
         st.sidebar.success("Graph Transformer initialized successfully!")
     else:
         st.sidebar.error("Please enter a valid API key for the selected LLM provider.")    
@@ -66,92 +69,166 @@ st.sidebar.subheader("Connect to Neo4j Database")
 neo4j_url = st.sidebar.text_input("Neo4j URL:", value="neo4j+s://<your-neo4j-url>")
 neo4j_username = st.sidebar.text_input("Neo4j Username:", value="neo4j")
 neo4j_password = st.sidebar.text_input("Neo4j Password:", type='password')
+rebuild_graph = st.sidebar.checkbox("Rebuild graph from scratch (wipes the database)", value=False)
 connect_button = st.sidebar.button("Connect")
 
 if connect_button:
     try:
-        graph = Neo4jGraph(
-            url=neo4j_url,
-            username=neo4j_username,
-            password=neo4j_password,
-            enhanced_schema=True
-        )
-        # Clear the graph database
-        cypher = """
-            MATCH (n)
-            DETACH DELETE n;
-            """
-        graph.query(cypher)
+        # One pooled driver per credential set; the schema comes from the stored snapshot
+        graph = get_graph(neo4j_url, neo4j_username, neo4j_password, enhanced_schema=True)
+        st.session_state["neo4j_credentials"] = (neo4j_url, neo4j_username, neo4j_password)
+        # Only clear the graph database when a full rebuild is requested;
+        # otherwise uploads are ingested incrementally
+        if rebuild_graph:
+            scope = graph_scope(graph)
+            reset_graph(graph, IngestionManifest(manifest_path(scope)), AliasTable(alias_path(scope)))
+            load_schema(graph)
 
         st.sidebar.success("Connected to Neo4j database successfully!")
     except Exception as e:
         st.sidebar.error(f"Failed to connect to Neo4j: {e}")
 
+elif "neo4j_credentials" in st.session_state:
+    graph = get_graph(*st.session_state["neo4j_credentials"], enhanced_schema=True)
+
 # ==================================================
 # Document Preparation || Graph Creation ||DB-Storage
 # ===================================================
 uploaded_file = st.file_uploader("Please select a PDF file.", type="pdf")
+tmp_file_path = None
 if uploaded_file is not None:
     st.success("PDF file uploaded successfully!")
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-        tmp_file.write(uploaded_file.read())
-        tmp_file_path = tmp_file.name
-        with st.spinner("Processing the PDF..."):
-            # Load and split the PDF
-            loader = PyPDFLoader(tmp_file_path)
-            pages = loader.load_and_split()
-
-            text_splitter = RecursiveCharacterTextSplitter(chunk_size=1200, chunk_overlap=40)
-            docs = text_splitter.split_documents(pages)
-        with st.spinner("Preparing documents..."):
-            lc_docs = []
-            for doc in docs:
-                lc_docs.append(Document(page_content=doc.page_content.replace("\n", ""), metadata={'source': uploaded_file.name}))
-            st.success("Documents prepared successfully!")
-        st.write(f"Total chunks created: {len(lc_docs)}")
+    # Only save the upload here (content-addressed, so it outlives this rerun
+    # for the worker); pages are parsed lazily while the graph is built
+    tmp_file_path = save_upload(uploaded_file.getvalue(), uploaded_file.name)
+    if llm:
+        # Chunks are sized in tokens to fit the model's max_tokens; show the
+        # cost before any LLM call (computed once per file and budget)
+        chunker = TokenChunker.for_llm(llm)
+        estimates = st.session_state.setdefault("extraction_estimates", {})
+        estimate_key = (uploaded_file.name, uploaded_file.size, chunker.budget)
+        if estimate_key not in estimates:
+            estimates[estimate_key] = estimate_pdf_extraction(tmp_file_path, chunker, source=uploaded_file.name)
+        estimate = estimates[estimate_key]
+        st.info(f"Estimated extraction: {estimate['chunks']} LLM calls (chunks of up to {estimate['budget']} tokens) | "
+                f"~{estimate['input_tokens']:,} input / ~{estimate['expected_output_tokens']:,} output tokens | "
+                f"{estimate['boilerplate_lines_removed']} header/footer lines dropped from {estimate['pages']} pages")
 else:
     st.warning("Please upload a PDF file to continue.")
 
 graph_create_button = st.button("Create & Store Graph Documents")
-if graph_create_button and graph_transformer and lc_docs:
-    with st.spinner("Converting documents to graph format..."):
-        graph_documents_lc = graph_transformer.convert_to_graph_documents(lc_docs)
-        st.success("Graph documents created successfully!")
-        st.write(f"Total graph documents created: {len(graph_documents_lc)}")
-        # Display first nodes and relationships for the first document
-        if graph_documents_lc:
-            st.write(f"Nodes in first document: {graph_documents_lc[0].nodes}")
-            st.write(f"Relationships in first document: {graph_documents_lc[0].relationships}")
-            # add the graph documents to the Neo4j graph
-            if graph:
-                with st.spinner("Adding graph documents to Neo4j..."):
-                    graph.add_graph_documents(graph_documents_lc, include_source=True)
-
+if graph_create_button and llm and tmp_file_path:
+    if not graph:
+        st.error("Please connect to the Neo4j database first.")
+    else:
+        # Ingestion runs in the background worker pool (backend.worker); the
+        # page, and querying, stay responsive while it runs. Every chunk is
+        # checkpointed (backend.jobs): submitting the same file again after a
+        # failure resumes where the last run stopped
+        job_id = get_ingestion_worker().submit(tmp_file_path, uploaded_file.name, {
+            "provider": llm_provider, "api_key": api_key,
+            "neo4j": st.session_state["neo4j_credentials"],
+            "max_concurrency": 8, "requests_per_second": 2,
+        })
+        submitted = st.session_state.setdefault("ingestion_jobs", [])
+        if job_id not in submitted:
+            submitted.append(job_id)
+        st.info(f"Queued {uploaded_file.name} as job {job_id}")
+
+
+@st.fragment(run_every=2)
+def show_ingestion_jobs():
+    # Polls the job store; only this fragment reruns, not the whole page
+    worker = get_ingestion_worker()
+    finished = st.session_state.setdefault("finished_ingestion_jobs", set())
+    for job_id in st.session_state.get("ingestion_jobs", []):
+        job = worker.status(job_id)
+        if job is None:
+            continue
+        counts = job["counts"]
+        total = sum(counts.values())
+        if job["status"] == "done":
+            st.success(f"{job['source']}: {total} chunks written")
+            if job_id not in finished and graph:
+                # New labels and relationship types from this document
+                load_schema(graph)
+                finished.add(job_id)
+        elif job["status"] in ("failed", "interrupted"):
+            st.error(f"{job['source']}: {job['status']} ({job['error']}); submit it again to resume")
+        elif job["progress"]:
+            progress = job["progress"]
+            st.progress(progress["extracted"] / max(progress["total"], 1),
+                        text=f"{job['source']}: {format_progress(progress)}")
+        else:
+            st.progress(counts["written"] / max(total, 1), text=f"{job['source']}: {job['status']}")
+
+
+if st.session_state.get("ingestion_jobs"):
+    show_ingestion_jobs()
+
+# Time per stage (load, split, extract, write, Cypher, answer) since the server started
+with st.sidebar.expander("Pipeline metrics"):
+    stage_summary = REGISTRY.stage_summary()
+    if stage_summary:
+        st.dataframe(pd.DataFrame.from_dict(stage_summary, orient="index").round(1))
+    st.download_button("Prometheus metrics", REGISTRY.render_prometheus(), file_name="graphrag_metrics.prom")
 
 # =========================
 # QA Chain: Querying the Knowledge Graph
 # =========================
 if llm and graph:
     st.success("LLM and Neo4j graph are ready for querying!")
-# Create the GraphCypherQAChain with the tracker
-    chain = GraphCypherQAChain.from_llm(
-    llm=llm,                             # Use OpenAI LLM for question answering
-    graph=graph,                                # Use the Neo4j graph
-    #cypher_prompt=custom_cypher_prompt,
-    verbose=True,                               # Enable verbose logging
-    top_k=15,                                    # Return top 5 results
-    allow_dangerous_requests=True,
-    #callbacks=[tracker]                         # Add the tracker to the callbacks
-)
+# Reuse the chain built for this LLM and graph; it is rebuilt only when the schema changes
+    hybrid = st.checkbox("Vector + graph retrieval", value=True,
+                         help="Find the closest text chunks and expand their entities instead of generating Cypher")
+    qa_cached = (get_hybrid_qa if hybrid else get_qa_chain)(llm, graph, top_k=15)
+    # Broad questions are answered from summaries precomputed after ingestion
+    # (backend.communities) instead of multi-hop traversals at query time
+    community_store = get_community_store(graph)
+    if st.checkbox("Answer broad questions from community summaries", value=True):
+        qa_cached = get_community_qa(qa_cached)
+    if st.button("Rebuild community summaries"):
+        with st.spinner("Detecting communities..."):
+            community_report = build_community_summaries(graph, community_store)
+        st.info(f"{community_report['communities']} communities and {community_report['hubs']} hub entities "
+                f"summarized in {community_report['seconds']:.1f}s")
+    elif community_store.version is not None and community_store.stale(graph):
+        st.caption("The graph changed since the community summaries were built; rebuild them to include new documents.")
     qa=st.text_input("Enter your question about the knowledge graph:", key="qa_input")
     if qa:
-        with st.spinner("Running query..."):
-            result = chain.invoke({"query": qa})
-            st.success("Query executed successfully!")
-            with st.container(border=True):
-                st.subheader("Query Results")
-                st.write(f"🔍 Question: {qa}")
-                st.write(f"💡 Answer: {result['result']}")
+        # Stream Cypher, row count and answer tokens as they arrive; a new
+        # question cancels the query still running in this session
+        stream = st.session_state.setdefault("qa_stream", QueryStream())
+        with st.container(border=True):
+            st.subheader("Query Results")
+            st.write(f"🔍 Question: {qa}")
+            cypher_box, rows_box, answer_box = st.empty(), st.empty(), st.empty()
+            cypher_box.caption("Generating Cypher...")
+            answer = ""
+            for event, payload in stream.submit(qa_cached, qa):
+                if event == "cypher":
+                    if payload["cached"] == "community":
+                        cypher_box.caption(f"Answered from summaries: {', '.join(payload['params']['summaries'])}")
+                        continue
+                    if payload["cached"] == "hybrid":
+                        cached = " (vector retrieval + graph expansion)"
+                    else:
+                        cached = f" (from cache: {payload['cached']} match)" if payload["cached"] else ""
+                    cypher_box.caption(f"Cypher Query{cached}: {payload['cypher']}")
+                    rows_box.caption("Running query...")
+                elif event == "rows":
+                    rows_box.caption(f"Retrieved rows: {len(payload)}")
+                elif event == "token":
+                    answer += payload
+                    answer_box.write(f"💡 Answer: {answer}▌")
+                elif event == "done":
+                    answer_box.write(f"💡 Answer: {answer}")
+                    st.caption(f"Timings: {payload['trace'].timing_summary()}")
+                    # Per-stage breakdown (ms) of this question
+                    st.bar_chart(pd.Series(payload['trace'].stage_timings_ms(), name="ms"), horizontal=True)
+                    st.success("Query executed successfully!")
+                elif event == "error":
+                    st.error(f"Query failed: {payload}")
 
 
 
@@ -0,0 +1,66 @@
+from backend.batch_ingest import expand_sources, ingest_batch
+from backend.incremental import IngestionManifest
+from benchmarks.corpora import write_synthetic_csv, write_synthetic_pdf
+from utils.fake_llm import make_fake_graph_transformer
+#python -m pytest tests/test_batch_ingest.py
+
+
+class RecordingGraph:
+    def __init__(self):
+        self.queries = []
+
+    def query(self, cypher, params=None):
+        self.queries.append((cypher, params))
+        return []
+
+    def document_sources(self):
+        return {row["metadata"]["source"] for cypher, params in self.queries
+                if params and "rows" in params and "MERGE (d:Document" in cypher
+                for row in params["rows"]}
+
+
+def test_batch_parses_in_workers_and_keeps_per_source_provenance(tmp_path):
+    corpus = tmp_path / "corpus"
+    (corpus / "csv").mkdir(parents=True)
+    pdfs = [write_synthetic_pdf(str(corpus / f"book{i}.pdf"), pages=2, seed=i) for i in range(3)]
+    csv_path = write_synthetic_csv(str(corpus / "csv" / "patients.csv"), rows=20)
+    (corpus / "notes.txt").write_text("not a source")
+    paths = expand_sources([str(corpus)])
+    assert paths == sorted(pdfs + [csv_path])
+
+    manifest = IngestionManifest(str(tmp_path / "manifest.json"))
+    graph = RecordingGraph()
+    transformer, llm = make_fake_graph_transformer()
+    report = ingest_batch(paths, transformer, graph, manifest=manifest, max_workers=2, write_batch_size=4)
+
+    assert report["sources"] == 4
+    assert report["added"] == report["chunks"] > 0
+    assert report["per_source"][csv_path]["added"] == 20
+    # CSV rows were packed, so there are fewer LLM calls than chunks
+    assert llm.calls < report["chunks"]
+    assert graph.document_sources() == set(paths)
+    assert set(IngestionManifest(manifest.path).sources) == set(paths)
+
+    # Unchanged sources are skipped in the workers, before any LLM call
+    transformer, llm = make_fake_graph_transformer()
+    again = ingest_batch(expand_sources([str(corpus / "*.pdf")]), transformer, RecordingGraph(),
+                         manifest=IngestionManifest(manifest.path), max_workers=2)
+    assert (again["sources"], again["added"], llm.calls) == (3, 0, 0)
+    assert again["skipped"] == sum(report["per_source"][pdf]["chunks"] for pdf in pdfs)
+
+
+def test_a_corrupt_source_is_reported_and_the_rest_ingested(tmp_path, monkeypatch):
+    write_synthetic_pdf(str(tmp_path / "good.pdf"), pages=1, seed=1)
+    (tmp_path / "broken.pdf").write_bytes(b"not a pdf at all")
+    # Relative patterns name sources by their absolute path
+    monkeypatch.chdir(tmp_path)
+    paths = expand_sources(["*.pdf"])
+    assert paths == [str(tmp_path / "broken.pdf"), str(tmp_path / "good.pdf")]
+
+    manifest = IngestionManifest(str(tmp_path / "manifest.json"), scope=paths)
+    transformer, _ = make_fake_graph_transformer()
+    report = ingest_batch(paths, transformer, RecordingGraph(), manifest=manifest, max_workers=2)
+    assert (report["sources"], report["failed"]) == (1, 1)
+    assert "error" in report["per_source"][paths[0]]
+    assert report["per_source"][paths[1]]["added"] > 0
+    assert set(IngestionManifest(manifest.path).sources) == {paths[1]}
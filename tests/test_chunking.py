@@ -0,0 +1,50 @@
+from types import SimpleNamespace
+
+from langchain_core.documents import Document
+
+from backend.chunking import TokenChunker, is_heading, token_budget
+#python -m pytest tests/test_chunking.py
+
+BODY = [
+    "Temperature rescales the logits before sampling. Low values make the output nearly deterministic.",
+    "Top-k keeps the k most likely tokens. Top-p keeps the smallest set whose probability exceeds p.",
+    "Few-shot prompts show worked examples. The model imitates their format and level of detail.",
+    "Chain of thought asks for intermediate reasoning. It helps on arithmetic and multi-step ques-\ntions.",
+]
+
+
+def _pages():
+    pages = []
+    for i, text in enumerate(BODY):
+        heading = "2 Prompting techniques\n" if i == 2 else ""
+        pages.append(Document(page_content=f"Prompt Engineering Handbook\n{heading}{text}\n\nPage {i + 1}",
+                              metadata={"page": i}))
+    return pages
+
+
+def test_chunks_fit_budget_skip_boilerplate_and_respect_sections():
+    chunker = TokenChunker(budget=60)
+    chunks = list(chunker.iter_chunks(_pages(), "handbook.pdf"))
+    text = "\n".join(chunk.page_content for chunk in chunks)
+    assert "Handbook" not in text and "Page 3" not in text
+    assert "multi-step questions." in text
+    assert all(chunk.metadata["tokens"] <= 60 for chunk in chunks)
+    # Pages 0-1 share a chunk; the heading on page 2 starts a new one
+    assert [(c.metadata["page"], c.metadata["page_end"]) for c in chunks] == [(0, 1), (2, 3)]
+    assert chunks[1].page_content.startswith("2 Prompting techniques")
+
+
+def test_oversized_paragraphs_split_and_estimate_counts_calls():
+    long_page = Document(page_content=" ".join(BODY * 6), metadata={"page": 0})
+    chunker = TokenChunker(budget=80, boilerplate=False)
+    estimate = chunker.estimate([long_page], prompt_tokens=500)
+    assert estimate["chunks"] > 1 and estimate["largest_chunk"] <= 80
+    assert estimate["input_tokens"] == estimate["chunk_tokens"] + 500 * estimate["chunks"]
+
+
+def test_budget_follows_llm_output_limit():
+    assert token_budget(1024) == 819
+    assert token_budget(8192) == 4000
+    assert TokenChunker.for_llm(SimpleNamespace(max_tokens=2048)).budget == 1638
+    assert is_heading("3.1 Sampling parameters") and is_heading("CHAPTER 4 Evaluation")
+    assert not is_heading("The model samples tokens")
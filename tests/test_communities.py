@@ -0,0 +1,71 @@
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.runnables import RunnableLambda
+
+from backend.communities import (CommunityGraphQA, CommunityStore, build_adjacency, build_community_summaries,
+                                 detect_communities)
+from utils.embeddings import HashingEmbeddings
+#python -m pytest tests/test_communities.py
+
+PROMPTING = ["Chain of thought", "Few shot prompting", "Self consistency", "Zero shot prompting", "Prompt template"]
+RETRIEVAL = ["Vector index", "Embedding model", "Reranker", "Chunking", "Hybrid search"]
+
+
+def _clique(names, rel_type):
+    return [(a, rel_type, b) for i, a in enumerate(names) for b in names[i + 1:]]
+
+
+TRIPLES = _clique(PROMPTING, "RELATED_TO") + _clique(RETRIEVAL, "USED_WITH") + [("Prompt template", "FEEDS", "Reranker")]
+LABELS = {**{name: "Technique" for name in PROMPTING}, **{name: "Component" for name in RETRIEVAL}}
+
+
+class EntityGraph:
+    def __init__(self, labels, triples, version=3):
+        self.labels, self.triples, self.version = labels, triples, version
+
+    def query(self, cypher, params=None):
+        if "__GraphMeta__" in cypher:
+            return [{"version": self.version}]
+        ids = sorted(i for i in self.labels if i > params["after"])[:params["limit"]]
+        return [{"id": i, "label": self.labels[i],
+                 "out": [[rel_type, target] for source, rel_type, target in self.triples if source == i]}
+                for i in ids]
+
+
+@pytest.mark.parametrize("method", ["louvain", "label_propagation"])
+def test_detects_the_two_clusters(method):
+    communities = detect_communities(build_adjacency(LABELS, TRIPLES), method)
+    assert sorted(sorted(c) for c in communities) == [sorted(PROMPTING), sorted(RETRIEVAL)]
+
+
+def test_broad_questions_are_answered_from_summaries(tmp_path):
+    graph = EntityGraph(LABELS, TRIPLES)
+    store = CommunityStore(HashingEmbeddings(), path=str(tmp_path), backend="numpy")
+    report = build_community_summaries(graph, store, hubs=2, min_hub_degree=4)
+    assert (report["entities"], report["communities"], report["hubs"]) == (10, 2, 2)
+    hub = [s for s in store.summaries if s["kind"] == "entity"][0]
+    assert hub["entity"] in ("Prompt template", "Reranker") and hub["degree"] == 5
+
+    reloaded = CommunityStore(HashingEmbeddings(), path=str(tmp_path), backend="numpy")
+    assert reloaded.version == 3 and not reloaded.stale(graph)
+    graph.version += 1
+    assert reloaded.stale(graph)
+
+    fallback = SimpleNamespace(
+        graph=graph, qa_chain=RunnableLambda(lambda args: f"{len(args['context'])} summaries"),
+        invoke=lambda question: {"result": "generated", "cached": None},
+    )
+    graph.version -= 1
+    qa = CommunityGraphQA(fallback, reloaded, k=2, min_score=0.35, reload_ttl=0)
+    result = qa.invoke("Which prompting techniques are like chain of thought and few shot prompting?")
+    assert result["cached"] == "community"
+    assert "Chain of thought" in result["context"][0]["summary"]
+    # Nothing in the summaries matches: the wrapped chain answers
+    assert qa.invoke("What is the billing amount of patient 12?")["result"] == "generated"
+    # Summary wording ("is connected to") does not route a question to an unrelated hub
+    assert qa.invoke("Who is connected to Prompt template?")["result"] == "generated"
+
+    graph.version += 1
+    assert qa.invoke("Which prompting techniques are like chain of thought and few shot prompting?")["result"] \
+        == "generated"
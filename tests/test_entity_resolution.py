@@ -0,0 +1,59 @@
+from langchain_community.graphs.graph_document import GraphDocument, Node, Relationship
+from langchain_core.documents import Document
+
+from backend.entity_resolution import AliasTable, EntityResolver
+from backend.incremental import IngestionManifest, reset_graph
+from backend.resources import alias_path
+#python -m pytest tests/test_entity_resolution.py
+
+
+def _document(*ids, rel_type="RELATED_TO"):
+    nodes = [Node(id=i, type="Concept") for i in ids]
+    return GraphDocument(nodes=nodes,
+                         relationships=[Relationship(source=a, target=b, type=rel_type) for a, b in zip(nodes, nodes[1:])],
+                         source=Document(page_content=" ".join(ids)))
+
+
+def test_surface_forms_merge_into_canonical_nodes():
+    resolver = EntityResolver()
+    documents, report = resolver.resolve([
+        _document("Top-K", "top k"),
+        _document("top k", "Large Language Models"),
+        _document("Large Language Model", "GPT-3"),
+        _document("GPT-4", "Top-P"),
+    ])
+    assert [n.id for n in documents[0].nodes] == ["top k"]
+    # The merge turned Top-K -> top k into a self-loop, which is dropped
+    assert documents[0].relationships == []
+    assert [(r.source.id, r.target.id) for r in documents[1].relationships] == [("top k", "Large Language Model")]
+    assert documents[2].nodes[0].id == "Large Language Model"
+    assert {n.id for n in documents[3].nodes} == {"GPT-4", "Top-P"}
+    assert report["merged"] == 2 and report["canonical"] == 5
+
+
+def test_alias_table_resolves_later_batches_to_existing_nodes(tmp_path):
+    path = str(tmp_path / "aliases.json")
+    resolver = EntityResolver(AliasTable(path))
+    resolver.resolve([_document("Chain of Thought", "Prompting"), _document("chain-of-thought")])
+    resolver.save()
+
+    later = EntityResolver(AliasTable(path))
+    documents, report = later.resolve([_document("Chain of thoughts", "CHAIN OF THOUGHT")])
+    assert [n.id for n in documents[0].nodes] == ["Chain of Thought"]
+    assert later.canonical_id("chain of thought") == "Chain of Thought"
+    assert report["merged"] == 2
+
+
+def test_each_database_has_its_own_alias_table_and_a_reset_clears_it(tmp_path):
+    assert alias_path(("bolt://db", "movies", "neo4j")) != alias_path(("bolt://db", "clinic", "neo4j"))
+    path = str(tmp_path / "aliases.json")
+    table = AliasTable(path, merge_on_save=True)
+    table.aliases["gpt4"] = "GPT-4"
+    table.save()
+
+    class Graph:
+        def query(self, cypher, params=None):
+            return []
+
+    reset_graph(Graph(), IngestionManifest(str(tmp_path / "manifest.json")), AliasTable(path, merge_on_save=True))
+    assert AliasTable(path).aliases == {}
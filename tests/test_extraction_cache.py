@@ -0,0 +1,46 @@
+from langchain_core.documents import Document
+
+from backend.extraction import extract_graph_documents
+from backend.extraction_cache import CachedGraphTransformer, ExtractionCache
+from utils.fake_llm import make_fake_graph_transformer
+#python -m pytest tests/test_extraction_cache.py
+
+
+def _docs(n):
+    return [Document(page_content=f"Chunk{i} covers Prompting and Temperature") for i in range(n)]
+
+
+def test_cache_hits_skip_the_llm(tmp_path):
+    transformer, llm = make_fake_graph_transformer()
+    cache = ExtractionCache(str(tmp_path / "cache.sqlite"))
+    cached = CachedGraphTransformer(transformer, cache, model="fake", temperature=0.4)
+
+    first = extract_graph_documents(cached, _docs(5))
+    second = extract_graph_documents(cached, _docs(5))
+
+    assert llm.calls == 5
+    assert cache.stats()["hits"] == 5 and cache.stats()["misses"] == 5
+    assert [gd.nodes for gd in first] == [gd.nodes for gd in second]
+    assert second[0].source.page_content.startswith("Chunk0")
+
+
+def test_model_change_and_invalidate_miss(tmp_path):
+    transformer, llm = make_fake_graph_transformer()
+    cache = ExtractionCache(str(tmp_path / "cache.sqlite"))
+    CachedGraphTransformer(transformer, cache, model="a").convert_to_graph_documents(_docs(2))
+    CachedGraphTransformer(transformer, cache, model="b").convert_to_graph_documents(_docs(2))
+    assert llm.calls == 4
+
+    assert cache.invalidate(model="a") == 2
+    CachedGraphTransformer(transformer, cache, model="a").convert_to_graph_documents(_docs(2))
+    assert llm.calls == 6
+
+
+def test_lru_eviction_keeps_cache_under_max_bytes(tmp_path):
+    transformer, _ = make_fake_graph_transformer()
+    cache = ExtractionCache(str(tmp_path / "cache.sqlite"), max_bytes=1000)
+    cached = CachedGraphTransformer(transformer, cache, model="fake")
+    cached.convert_to_graph_documents(_docs(20))
+    stats = cache.stats()
+    assert 0 < stats["entries"] < 20
+    assert stats["bytes"] <= 1000
@@ -0,0 +1,99 @@
+import pytest
+from langchain_community.graphs.graph_document import GraphDocument, Node, Relationship
+from langchain_core.documents import Document
+
+from backend.bulk_loader import bulk_write_graph_documents, group_graph_documents
+from backend.graph_export import (NODES_PAGE_QUERY, RELATIONSHIPS_QUERY, UNLABELED_NODES_QUERY, export_graph,
+                                  export_graph_documents, import_graph)
+#python -m pytest tests/test_graph_export.py
+
+
+class RecordingGraph:
+    def __init__(self):
+        self.queries = []
+
+    def query(self, cypher, params=None):
+        self.queries.append((cypher, params))
+        return []
+
+    def rows(self):
+        """Written rows per query, ignoring batching and order."""
+        written = {}
+        for cypher, params in self.queries:
+            if params and "rows" in params:
+                written.setdefault(cypher, []).extend(params["rows"])
+        return {cypher: sorted(rows, key=repr) for cypher, rows in written.items()}
+
+
+def _graph_documents():
+    documents = []
+    for i in range(3):
+        model = Node(id=f"Model {i}", type="Model", properties={"year": 2020 + i})
+        technique = Node(id="Few-shot prompting", type="Technique")
+        documents.append(GraphDocument(
+            nodes=[model, technique],
+            relationships=[Relationship(source=model, target=technique, type="supports", properties={"page": i})],
+            source=Document(page_content=f"Model {i} supports few-shot prompting.",
+                            metadata={"source": "book.pdf", "page": i}),
+        ))
+    return documents
+
+
+@pytest.mark.parametrize("name", ["graph_export", "graph.jsonl.gz"])
+def test_import_writes_the_same_rows_as_direct_ingestion(tmp_path, name):
+    direct = RecordingGraph()
+    bulk_write_graph_documents(direct, _graph_documents())
+
+    path = str(tmp_path / name)
+    counts = export_graph_documents(_graph_documents(), path)
+    assert counts == {"nodes": 4, "documents": 3, "mentions": 6, "relationships": 3}
+
+    imported = RecordingGraph()
+    totals = import_graph(imported, path, batch_size=2)
+    assert (totals["nodes"], totals["relationships"], totals["documents"]) == (4, 3, 3)
+    rows = imported.rows()
+    assert rows == direct.rows()
+    # Rows are written in batches of two; relationships come after their nodes
+    written = [cypher for cypher, params in imported.queries if params and "rows" in params]
+    assert "MERGE (s)-[r:`SUPPORTS`]->(t)" in written[-1]
+
+
+class StoredGraph:
+    """Answers the export's paged reads from in-memory nodes, relationships and documents."""
+
+    def __init__(self, graph_documents, unlabeled=0):
+        grouped = group_graph_documents(graph_documents, include_source=True)
+        self.nodes = {row["id"]: (label, row["properties"]) for label, rows in grouped["nodes"].items() for row in rows}
+        self.relationships = [(row["source"], rel_type, row["target"], row["properties"])
+                              for rel_type, rows in grouped["relationships"].items() for row in rows]
+        self.documents = {row["id"]: row for row in grouped["documents"]}
+        self.mentions = grouped["mentions"]
+        self.unlabeled = unlabeled
+
+    def query(self, cypher, params=None):
+        if cypher == UNLABELED_NODES_QUERY:
+            return [{"count": self.unlabeled}]
+        if cypher == NODES_PAGE_QUERY:
+            ids = sorted(i for i in self.nodes if i > params["after"])[:params["limit"]]
+            return [{"id": i, "label": self.nodes[i][0], "properties": {"id": i, **self.nodes[i][1]}} for i in ids]
+        if cypher == RELATIONSHIPS_QUERY:
+            return [{"source": s, "type": t, "target": o, "properties": p}
+                    for s, t, o, p in self.relationships if s in params["ids"]]
+        ids = sorted(i for i in self.documents if i > params["after"])[:params["limit"]]
+        return [{"id": i, "text": self.documents[i]["text"],
+                 "properties": {"text": self.documents[i]["text"], **self.documents[i]["metadata"]},
+                 "mentions": [m["id"] for m in self.mentions if m["doc_id"] == i]} for i in ids]
+
+
+@pytest.mark.parametrize("name", ["graph_export", "graph.jsonl.gz"])
+def test_a_graph_read_from_neo4j_page_by_page_imports_as_written(tmp_path, name):
+    direct = RecordingGraph()
+    bulk_write_graph_documents(direct, _graph_documents())
+
+    path = str(tmp_path / name)
+    with pytest.warns(UserWarning, match="2 nodes without the __Entity__ label"):
+        counts = export_graph(StoredGraph(_graph_documents(), unlabeled=2), path, page_size=2)
+    assert counts == {"nodes": 4, "documents": 3, "mentions": 6, "relationships": 3}
+    imported = RecordingGraph()
+    import_graph(imported, path, batch_size=2)
+    assert imported.rows() == direct.rows()
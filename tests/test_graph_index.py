@@ -0,0 +1,46 @@
+from langchain_community.graphs.graph_document import GraphDocument, Node
+from langchain_core.documents import Document
+
+from backend.bulk_loader import bulk_write_graph_documents
+from backend.graph_index import backfill_normalized_ids, fulltext_query, normalize_id, search_entities
+#python -m pytest tests/test_graph_index.py
+
+
+class RecordingGraph:
+    def __init__(self, missing=()):
+        self.missing = list(missing)
+        self.queries = []
+
+    def query(self, cypher, params=None):
+        self.queries.append((cypher, params))
+        if "normalized_id IS NULL" in cypher:
+            batch, self.missing = self.missing[:params["limit"]], self.missing[params["limit"]:]
+            return batch
+        return []
+
+
+def test_normalize_and_fulltext_query():
+    assert normalize_id("  Type-2   Diabétes ") == "type 2 diabetes"
+    assert normalize_id("Top_P") == "top p"
+    assert fulltext_query("What is the Temperature of top-p sampling?") == "temperature~ OR top OR p OR sampling~"
+    assert fulltext_query("what is it?") == ""
+    assert search_entities(RecordingGraph(), "what is it?") == []
+
+
+def test_ingestion_writes_normalized_ids_and_indexes():
+    graph = RecordingGraph()
+    document = GraphDocument(nodes=[Node(id="Top-P Sampling", type="Parameter")], relationships=[],
+                             source=Document(page_content="chunk"))
+    bulk_write_graph_documents(graph, [document])
+    cyphers = [cypher for cypher, _ in graph.queries]
+    assert any("CREATE FULLTEXT INDEX entity_fulltext" in cypher for cypher in cyphers)
+    node_params = next(params for cypher, params in graph.queries if "SET n.normalized_id" in cypher)
+    assert node_params["rows"][0]["normalized_id"] == "top p sampling"
+
+
+def test_backfill_pages_through_missing_entities():
+    graph = RecordingGraph([{"element_id": str(i), "id": f"Entity {i}!"} for i in range(5)])
+    assert backfill_normalized_ids(graph, batch_size=2) == 5
+    written = [row for cypher, params in graph.queries if "SET n.normalized_id" in cypher for row in params["rows"]]
+    assert written[0] == {"element_id": "0", "normalized_id": "entity 0"}
+    assert len(written) == 5
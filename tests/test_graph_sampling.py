@@ -0,0 +1,43 @@
+import pytest
+
+from utils.graph_sampling import sample_subgraph
+#python -m pytest tests/test_graph_sampling.py
+
+
+class RowsGraph:
+    """Returns canned sampling rows (nodes and relationships interleaved)."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    def query(self, cypher, params=None):
+        self.queries.append((cypher, params))
+        return self.rows
+
+
+def _node(i):
+    return {"kind": "node", "id": f"n{i}", "labels": ["Concept", "__Entity__"], "properties": {"id": f"C{i}"},
+            "source": None, "target": None, "type": None}
+
+
+def _rel(a, b):
+    return {"kind": "relationship", "id": f"r{a}{b}", "labels": None, "properties": None,
+            "source": f"n{a}", "target": f"n{b}", "type": "RELATED_TO"}
+
+
+def test_one_query_pages_and_reports_fetched_vs_kept():
+    graph = RowsGraph([_rel(0, 1), _node(0), _node(1), _node(2), _rel(1, 2)])
+    nodes, relationships, report = sample_subgraph(graph, max_nodes=3, page_size=2)
+
+    assert len(graph.queries) == 1
+    assert graph.queries[0][1]["excluded"] == ["__GraphMeta__"]
+    assert set(nodes) == {"n0", "n1", "n2"}
+    assert [(r["source"], r["target"]) for r in relationships] == [("n0", "n1"), ("n1", "n2")]
+    assert report["pages"] == 3
+    assert report["fetched"] == report["kept"] == 5
+
+
+def test_ego_needs_seeds():
+    with pytest.raises(ValueError):
+        sample_subgraph(RowsGraph([]), strategy="ego")
@@ -0,0 +1,102 @@
+from types import SimpleNamespace
+
+from langchain_core.runnables import RunnableLambda
+
+from backend.hybrid_retriever import ChunkIndex, HybridGraphQA
+from utils.embeddings import HashingEmbeddings
+#python -m pytest tests/test_hybrid_retriever.py
+
+CHUNKS = {
+    "c1": "Metformin is the first-line treatment for type 2 diabetes.",
+    "c2": "Inhaled corticosteroids control persistent asthma.",
+    "c3": "Statins lower LDL cholesterol and cardiovascular risk.",
+}
+
+
+class ChunkGraph:
+    def __init__(self, chunks):
+        self.chunks = dict(chunks)
+        self.version = 1
+        self.text_queries = 0
+        self.expansions = []
+
+    def query(self, cypher, params=None):
+        if "__GraphMeta__" in cypher and "apoc" not in cypher:
+            return [{"version": self.version}]
+        if "RETURN d.id AS id, d.text AS text" in cypher:
+            self.text_queries += 1
+            return [{"id": i, "text": self.chunks[i]} for i in params["ids"] if i in self.chunks]
+        if "RETURN d.id AS id" in cypher:
+            return [{"id": i} for i in self.chunks]
+        self.expansions.append(params)
+        return [{"chunks": [{"id": i, "text": self.chunks[i]} for i in params["chunk_ids"]],
+                 "entities": ["Metformin", "Type 2 diabetes"],
+                 "triples": [["Metformin", "TREATS", "Type 2 diabetes"]]}]
+
+
+def test_index_embeds_only_new_chunks_and_persists(tmp_path):
+    graph = ChunkGraph(CHUNKS)
+    index = ChunkIndex(HashingEmbeddings(), path=str(tmp_path), backend="numpy")
+    assert index.sync(graph) == 3
+    assert index.search("how is type 2 diabetes treated", k=1)[0][0] == "c1"
+
+    assert index.sync(graph) == 0
+    graph.chunks["c4"] = "Beta blockers reduce blood pressure."
+    del graph.chunks["c2"]
+    graph.version += 1
+    assert index.sync(graph) == 1
+    assert sorted(index.ids) == ["c1", "c3", "c4"]
+
+    reloaded = ChunkIndex(HashingEmbeddings(), path=str(tmp_path), backend="numpy")
+    assert reloaded.version == 2 and reloaded.ids == index.ids
+    assert reloaded.search("blood pressure", k=1)[0][0] == "c4"
+
+
+def test_hybrid_answers_from_chunks_and_expansion_or_falls_back(tmp_path):
+    graph = ChunkGraph(CHUNKS)
+    fallback = SimpleNamespace(
+        graph=graph,
+        chain=SimpleNamespace(qa_chain=RunnableLambda(lambda args: f"{len(args['context'])} items")),
+        invoke=lambda question: {"result": "generated", "cached": None},
+    )
+    index = ChunkIndex(HashingEmbeddings(), path=str(tmp_path), backend="numpy")
+    qa = HybridGraphQA(fallback, index, k=2, min_score=0.2, version_ttl=0)
+
+    result = qa.invoke("What is the treatment for type 2 diabetes?")
+    assert result["cached"] == "hybrid"
+    assert result["params"]["chunk_ids"][0] == "c1"
+    assert {"fact": "Metformin TREATS Type 2 diabetes"} in result["context"]
+    assert result["context"][0]["chunk"] == CHUNKS["c1"]
+    assert set(result["trace"].timings) >= {"retrieval", "database", "answer", "total"}
+
+    assert qa.invoke("zebra migration routes")["result"] == "generated"
+    assert len(graph.expansions) == 1
+
+
+def test_search_sees_the_previous_index_while_a_sync_runs(tmp_path):
+    import threading
+
+    class BlockingEmbeddings(HashingEmbeddings):
+        def __init__(self):
+            super().__init__()
+            self.entered, self.release = threading.Event(), threading.Event()
+
+        def embed_documents(self, texts):
+            if len(texts) == 1:
+                self.entered.set()
+                self.release.wait(5)
+            return super().embed_documents(texts)
+
+    graph = ChunkGraph(CHUNKS)
+    embeddings = BlockingEmbeddings()
+    index = ChunkIndex(embeddings, path=str(tmp_path), backend="numpy")
+    index.sync(graph)
+    graph.chunks["c4"] = "Antihistamines relieve hay fever."
+    graph.version += 1
+    syncing = threading.Thread(target=index.sync, args=(graph,))
+    syncing.start()
+    assert embeddings.entered.wait(5)
+    assert {chunk_id for chunk_id, _ in index.search("asthma", k=5)} == {"c1", "c2", "c3"}
+    embeddings.release.set()
+    syncing.join(5)
+    assert index.version == 2 and "c4" in {chunk_id for chunk_id, _ in index.search("hay fever", k=5)}
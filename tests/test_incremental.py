@@ -0,0 +1,75 @@
+from langchain_core.documents import Document
+
+from backend.extraction import extract_graph_documents
+from backend.incremental import IngestionManifest, apply_ingestion, plan_ingestion
+from utils.fake_llm import make_fake_graph_transformer
+#python -m pytest tests/test_incremental.py
+
+
+class RecordingGraph:
+    def __init__(self):
+        self.queries = []
+        self.written = []
+
+    def query(self, cypher, params=None):
+        self.queries.append((cypher, params))
+        return []
+
+    def add_graph_documents(self, graph_documents, include_source=False):
+        self.written.extend(graph_documents)
+
+
+def _ingest(graph, manifest, docs):
+    transformer, _ = make_fake_graph_transformer()
+    plan = plan_ingestion(docs, manifest)
+    return apply_ingestion(graph, plan, extract_graph_documents(transformer, plan["to_add"]), manifest,
+                           write=graph.add_graph_documents)
+
+
+def test_only_new_and_changed_chunks_are_touched(tmp_path):
+    graph = RecordingGraph()
+    manifest = IngestionManifest(str(tmp_path / "manifest.json"))
+    docs = [Document(page_content=text, metadata={"source": "book.pdf"})
+            for text in ("Alpha Beta Gamma", "Delta Epsilon Zeta", "Theta Iota Kappa")]
+
+    report = _ingest(graph, manifest, docs)
+    assert (report["added"], report["removed"], report["skipped"]) == (3, 0, 0)
+    assert not [cypher for cypher, _ in graph.queries if "DELETE" in cypher]
+
+    # Reload the manifest from disk, change one chunk and keep the other two
+    manifest = IngestionManifest(str(tmp_path / "manifest.json"))
+    docs[2] = Document(page_content="Theta Lambda Omega", metadata={"source": "book.pdf"})
+    graph.written.clear()
+    report = _ingest(graph, manifest, docs)
+
+    assert (report["added"], report["removed"], report["skipped"]) == (1, 1, 2)
+    assert [gd.source.page_content for gd in graph.written] == ["Theta Lambda Omega"]
+    deleted_nodes = [params["ids"] for cypher, params in graph.queries if "DETACH DELETE n" in cypher][0]
+    # "Theta" is still extracted from the new chunk, so only the others go
+    assert deleted_nodes == ["Iota", "Kappa"]
+
+
+def test_a_node_shared_under_another_type_only_loses_the_label(tmp_path):
+    graph = RecordingGraph()
+    manifest = IngestionManifest(str(tmp_path / "manifest.json"))
+    manifest.sources = {
+        "a.pdf": {"fa": {"doc_id": "da", "nodes": [["X", "Concept"], ["Y", "Concept"]], "relationships": []}},
+        "b.pdf": {"fb": {"doc_id": "db", "nodes": [["X", "Technique"]], "relationships": []}},
+    }
+    plan = {"to_add": [], "to_remove": [("a.pdf", "fa")], "skipped": 0}
+    report = apply_ingestion(graph, plan, [], manifest)
+
+    assert report["nodes_removed"] == 1
+    deleted = [params["ids"] for cypher, params in graph.queries if "DETACH DELETE n" in cypher]
+    assert deleted == [["Y"]]
+    relabelled = [(cypher, params["ids"]) for cypher, params in graph.queries if "REMOVE n:" in cypher]
+    assert len(relabelled) == 1 and "REMOVE n:`Concept`" in relabelled[0][0] and relabelled[0][1] == ["X"]
+
+
+def test_other_sources_are_left_alone(tmp_path):
+    graph = RecordingGraph()
+    manifest = IngestionManifest(str(tmp_path / "manifest.json"))
+    _ingest(graph, manifest, [Document(page_content="Alpha Beta", metadata={"source": "a.pdf"})])
+    report = _ingest(graph, manifest, [Document(page_content="Gamma Delta", metadata={"source": "b.pdf"})])
+    assert (report["added"], report["removed"]) == (1, 0)
+    assert set(manifest.sources) == {"a.pdf", "b.pdf"}
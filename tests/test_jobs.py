@@ -0,0 +1,97 @@
+import pytest
+from langchain_core.documents import Document
+
+from backend.incremental import IngestionManifest, fingerprint
+from backend.jobs import EXTRACTED, PENDING, WRITTEN, JobStore, job_id_for, run_job
+from utils.fake_llm import make_fake_graph_transformer
+#python -m pytest tests/test_jobs.py
+
+
+class RecordingGraph:
+    def __init__(self):
+        self.queries = []
+
+    def query(self, cypher, params=None):
+        self.queries.append((cypher, params))
+        return []
+
+    def written_chunks(self):
+        return sorted(row["text"] for cypher, params in self.queries
+                      if params and "rows" in params and "MERGE (d:Document" in cypher
+                      for row in params["rows"])
+
+
+class FailingTransformer:
+    """Extracts with the fake LLM, then fails every call after the first `fail_after`."""
+
+    def __init__(self, fail_after):
+        self.transformer, self.llm = make_fake_graph_transformer()
+        self.fail_after = fail_after
+        self.calls = 0
+
+    def process_response(self, document):
+        self.calls += 1
+        if self.calls > self.fail_after:
+            raise RuntimeError("connection reset")
+        return self.transformer.process_response(document)
+
+
+def _chunks():
+    return [Document(page_content=f"Chunk{i} Alpha{i} Beta{i}", metadata={"source": "book.pdf", "page": i})
+            for i in range(5)]
+
+
+def test_resume_writes_checkpointed_extractions_and_extracts_only_pending(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite"))
+    store.create("job1", "book.pdf", "book.pdf", _chunks())
+    graph = RecordingGraph()
+
+    with pytest.raises(RuntimeError):
+        run_job(store, "job1", FailingTransformer(fail_after=3), graph, max_concurrency=1, write_batch_size=2)
+    assert store.counts("job1") == {PENDING: 2, EXTRACTED: 1, WRITTEN: 2}
+    assert store.get("job1")["status"] == "failed"
+
+    transformer = FailingTransformer(fail_after=100)
+    progress = []
+    report = run_job(store, "job1", transformer, graph, max_concurrency=1, write_batch_size=2,
+                     on_progress=progress.append)
+    # Only the two pending chunks go to the LLM again
+    assert transformer.calls == 2
+    assert (report["added"], report["resumed"]) == (3, 2)
+    assert store.counts("job1") == {PENDING: 0, EXTRACTED: 0, WRITTEN: 5}
+    assert store.get("job1")["status"] == "done"
+    assert progress[-1]["written"] == 5 and progress[-1]["chunks_per_sec"] > 0
+    assert len(graph.written_chunks()) == 5
+
+
+def test_manifest_records_chunks_and_known_chunks_start_written(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite"))
+    manifest = IngestionManifest(str(tmp_path / "manifest.json"))
+    transformer, _ = make_fake_graph_transformer()
+    store.create("job1", "book.pdf", "book.pdf", _chunks())
+    run_job(store, "job1", transformer, RecordingGraph(), manifest=manifest)
+    assert len(manifest.sources["book.pdf"]) == 5
+
+    known = {fingerprint(chunk.page_content) for chunk in _chunks()[:3]}
+    store.create("job2", "book.pdf", "book.pdf", _chunks(), known)
+    assert store.counts("job2") == {PENDING: 2, EXTRACTED: 0, WRITTEN: 3}
+
+
+def test_chunks_with_the_same_text_are_each_marked_written(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite"))
+    chunks = _chunks()
+    # A repeated boilerplate page
+    chunks.append(Document(page_content=chunks[1].page_content, metadata={"source": "book.pdf", "page": 5}))
+    store.create("job1", "book.pdf", "book.pdf", chunks)
+    transformer, _ = make_fake_graph_transformer()
+    run_job(store, "job1", transformer, RecordingGraph(), write_batch_size=2)
+    assert store.counts("job1") == {PENDING: 0, EXTRACTED: 0, WRITTEN: 6}
+    assert store.get("job1")["status"] == "done"
+
+
+def test_the_same_file_ingested_into_two_databases_is_two_jobs(tmp_path):
+    path = tmp_path / "book.pdf"
+    path.write_bytes(b"%PDF-1.4 same bytes")
+    movies, clinic = ("bolt://db", "movies", "reader"), ("bolt://db", "clinic", "reader")
+    assert job_id_for(str(path), "book.pdf", movies) == job_id_for(str(path), "book.pdf", movies)
+    assert job_id_for(str(path), "book.pdf", movies) != job_id_for(str(path), "book.pdf", clinic)
@@ -0,0 +1,34 @@
+import json
+
+from utils.large_graph import export_large_graph
+#python -m pytest tests/test_large_graph.py
+
+
+class SampleGraph:
+    def __init__(self, n):
+        self.layout_queries = 0
+        self.rows = [{"kind": "node", "id": f"n{i}", "labels": ["Concept" if i % 2 else "Person"],
+                      "properties": {"id": "</script>" if i == 0 else f"E{i}"},
+                      "source": None, "target": None, "type": None} for i in range(n)]
+        self.rows += [{"kind": "relationship", "id": f"r{i}", "labels": None, "properties": {},
+                       "source": f"n{i}", "target": f"n{(i + 1) % n}", "type": "RELATED_TO"} for i in range(n)]
+
+    def query(self, cypher, params=None):
+        if "__GraphMeta__" in cypher:
+            return [{"version": 4}]
+        return self.rows
+
+
+def test_layout_is_cached_per_version_and_payload_is_columnar(tmp_path):
+    graph = SampleGraph(200)
+    output = tmp_path / "graph.html"
+    report = export_large_graph(graph, output_file=str(output), layout_dir=str(tmp_path / "layouts"))
+    assert (report["nodes_kept"], report["relationships_kept"], report["version"]) == (200, 200, 4)
+    assert [p.name.startswith("v4-") for p in (tmp_path / "layouts").iterdir()] == [True]
+
+    html = output.read_text()
+    assert "</script>\"" not in html
+    payload = json.loads(html.split("const G = ", 1)[1].split(", DETAIL_BUDGET", 1)[0].replace("<\\/", "</"))
+    assert payload["labels"] == ["Person", "Concept"]
+    assert len(payload["nodes"]["x"]) == 200 and len(payload["edges"]["source"]) == 200
+    assert sorted(c["size"] for c in payload["clusters"]) == [100, 100]
@@ -0,0 +1,68 @@
+from langchain_community.graphs.graph_document import GraphDocument, Node, Relationship
+from langchain_core.documents import Document
+
+from backend.bulk_loader import group_graph_documents
+from backend.packing import iter_unpacked, pack_documents
+#python -m pytest tests/test_packing.py
+
+ROWS = [
+    ("Doctor3 treats Patient 1 for Diabetes.", "patients.csv"),
+    ("Doctor35 treats Patient 2 for Asthma.", "patients.csv"),
+    ("Doctor3 treats Patient 3 for Asthma.", "patients.csv"),
+    ("Hospital A employs Doctor3.", "hospitals.csv"),
+]
+
+
+def _words(text):
+    return len(text.split())
+
+
+def _rows():
+    return [Document(page_content=text, metadata={"source": source, "row": i}) for i, (text, source) in enumerate(ROWS)]
+
+
+def test_packs_within_the_token_budget_without_mixing_sources():
+    # Each row is six words plus four for its marker: two rows fit in 22, three do not
+    packed = list(pack_documents(_rows(), token_budget=22, count=_words))
+    assert [[meta["row"] for meta in doc.metadata["packed"]] for doc in packed] == [[0, 1], [2], [3]]
+    assert [doc.metadata["source"] for doc in packed] == ["patients.csv", "patients.csv", "hospitals.csv"]
+    assert packed[0].page_content.count("### Record") == 2
+
+    # A row larger than the budget still travels, alone
+    assert [len(doc.metadata["packed"]) for doc in pack_documents(_rows(), token_budget=5, count=_words)] == [1] * 4
+
+
+def test_unpacked_rows_keep_their_own_source_document():
+    packed = list(pack_documents(_rows()[:3], token_budget=1000, count=_words))
+    assert len(packed) == 1
+
+    doctor3, doctor35 = Node(id="Doctor3", type="Doctor"), Node(id="Doctor35", type="Doctor")
+    patients = [Node(id=f"Patient {i}", type="Patient") for i in (1, 2, 3)]
+    asthma = Node(id="Asthma", type="Condition")
+    extracted = GraphDocument(
+        nodes=[doctor3, doctor35, *patients, asthma],
+        relationships=[Relationship(source=doctor3, target=patients[0], type="TREATS"),
+                       Relationship(source=doctor35, target=patients[1], type="TREATS"),
+                       Relationship(source=doctor3, target=patients[2], type="TREATS")],
+        source=packed[0],
+    )
+    unpacked = list(iter_unpacked([extracted]))
+
+    # One GraphDocument per row, with that row's text and metadata
+    assert [(doc.source.page_content, doc.source.metadata) for doc in unpacked] == [
+        (document.page_content, document.metadata) for document in _rows()[:3]]
+    # Relationships land on the row naming both endpoints; Doctor3 is not matched inside Doctor35
+    assert [[(rel.source.id, rel.target.id) for rel in doc.relationships] for doc in unpacked] == [
+        [("Doctor3", "Patient 1")], [("Doctor35", "Patient 2")], [("Doctor3", "Patient 3")]]
+    assert [sorted(node.id for node in doc.nodes) for doc in unpacked] == [
+        ["Doctor3", "Patient 1"], ["Asthma", "Doctor35", "Patient 2"], ["Asthma", "Doctor3", "Patient 3"]]
+
+    # Written with include_source, each row becomes its own Document node mentioning its entities
+    grouped = group_graph_documents(unpacked, include_source=True)
+    rows = {row["id"]: row for row in grouped["documents"]}
+    assert sorted(row["metadata"]["row"] for row in rows.values()) == [0, 1, 2]
+    mentioned = {}
+    for mention in grouped["mentions"]:
+        mentioned.setdefault(rows[mention["doc_id"]]["metadata"]["row"], set()).add(mention["id"])
+    assert mentioned == {0: {"Doctor3", "Patient 1"}, 1: {"Asthma", "Doctor35", "Patient 2"},
+                         2: {"Asthma", "Doctor3", "Patient 3"}}
@@ -0,0 +1,139 @@
+from types import SimpleNamespace
+
+from langchain_core.runnables import RunnableLambda
+
+from backend.qa_cache import CachedGraphQA, QueryCache
+#python -m pytest tests/test_qa_cache.py
+
+
+class VersionedGraph:
+    entities = {"diabetes": "Diabetes", "asthma": "Asthma", "flu": "Flu"}
+
+    def __init__(self):
+        self.version = 1
+        self.queries = []
+        self.rows = [{"d.id": "Doctor1"}, {"d.id": "Doctor2"}]
+
+    def query(self, cypher, params=None):
+        if "__GraphMeta__" in cypher:
+            return [{"version": self.version}]
+        if "normalized_id" in cypher:
+            return [{"value": value, "id": self.entities.get(value)} for value in params["values"]]
+        self.queries.append((cypher, params))
+        return self.rows
+
+
+def _qa(graph, generated):
+    def _generate(args):
+        generated.append(args["question"])
+        condition = args["question"].rstrip("?").split()[-1]
+        return f"MATCH (d:Doctor)-[:TREATS]->(:MedicalCondition {{id: '{condition}'}}) RETURN d.id"
+
+    chain = SimpleNamespace(
+        graph=graph, graph_schema="", top_k=10, cypher_query_corrector=None,
+        cypher_generation_chain=RunnableLambda(_generate),
+        qa_chain=RunnableLambda(lambda args: f"{len(args['context'])} doctors"),
+    )
+    return CachedGraphQA(chain, QueryCache(), version_ttl=0)
+
+
+def test_repeat_and_templated_questions_skip_generation():
+    graph, generated = VersionedGraph(), []
+    qa = _qa(graph, generated)
+
+    first = qa.invoke("Who treats Diabetes?")
+    assert first["cached"] is None and first["result"] == "2 doctors"
+    assert qa.invoke("who treats diabetes")["cached"] == "exact"
+    templated = qa.invoke("Who treats Asthma?")
+    assert templated["cached"] == "template"
+    assert templated["params"] == {"p0": "Asthma"}
+    assert generated == ["Who treats Diabetes?"]
+    # The repeat was served from the result cache, the templated question was not
+    assert len(graph.queries) == 2
+
+
+def test_templates_only_match_known_entities_of_the_same_shape():
+    graph, generated = VersionedGraph(), []
+    qa = _qa(graph, generated)
+    qa.invoke("Who treats Diabetes?")
+    # Not an entity, and more words than the literal the template was learned from
+    assert qa.invoke("Who treats Banana?")["cached"] is None
+    assert qa.invoke("Who treats type 2 diabetes?")["cached"] is None
+    assert generated == ["Who treats Diabetes?", "Who treats Banana?", "Who treats type 2 diabetes?"]
+
+
+def test_a_template_hit_without_rows_is_a_miss():
+    graph, generated = VersionedGraph(), []
+    qa = _qa(graph, generated)
+    qa.invoke("Who treats Diabetes?")
+    graph.rows = []
+    result = qa.invoke("Who treats Flu?")
+    assert result["cached"] is None
+    assert generated == ["Who treats Diabetes?", "Who treats Flu?"]
+    assert qa.cache.misses == 2 and qa.cache.hits["template"] == 0
+
+
+def test_ingestion_invalidates_cached_entries():
+    graph, generated = VersionedGraph(), []
+    qa = _qa(graph, generated)
+    qa.invoke("Who treats Diabetes?")
+    graph.version += 1
+    assert qa.invoke("Who treats Diabetes?")["cached"] is None
+    assert len(generated) == 2
+
+
+def test_stream_emits_cypher_rows_then_tokens_and_cancels():
+    import asyncio
+
+    from backend.qa_stream import QueryStream
+
+    graph, generated = VersionedGraph(), []
+    qa = _qa(graph, generated)
+    events = list(QueryStream().submit(qa, "Who treats Diabetes?"))
+    kinds = [kind for kind, _ in events]
+    assert kinds[:2] == ["cypher", "rows"] and kinds[-1] == "done"
+    assert "token" in kinds
+    assert events[-1][1]["result"] == "2 doctors"
+
+    async def _slow(question):
+        yield "cypher", {}
+        await asyncio.sleep(30)
+        yield "done", {}
+
+    stream = QueryStream()
+    slow = stream.submit(SimpleNamespace(astream=_slow), "slow")
+    assert next(slow)[0] == "cypher"
+    stream.submit(qa, "Who treats Asthma?")
+    assert next(slow)[0] == "cancelled"
+
+
+def test_tracer_captures_typed_steps_from_plain_chain():
+    import uuid
+
+    from langchain_core.language_models import FakeListChatModel
+    from langchain_neo4j import GraphCypherQAChain
+    from langchain_neo4j.graphs.graph_store import GraphStore
+
+    from backend.qa_trace import GraphQATracer
+
+    class StoreGraph(VersionedGraph, GraphStore):
+        get_schema = ""
+        get_structured_schema = {"node_props": {}, "rel_props": {}, "relationships": [], "metadata": {}}
+
+        def refresh_schema(self):
+            pass
+
+        def add_graph_documents(self, graph_documents, include_source=False):
+            pass
+
+    graph = StoreGraph()
+    llm = FakeListChatModel(responses=["MATCH (d:Doctor) RETURN d.id", "Two doctors."])
+    chain = GraphCypherQAChain.from_llm(llm=llm, graph=graph, allow_dangerous_requests=True,
+                                        return_intermediate_steps=True)
+    tracer, run_id = GraphQATracer(), uuid.uuid4()
+    chain.invoke({"query": "Which doctors?"}, config={"callbacks": [tracer], "run_id": run_id})
+
+    trace = tracer.pop(run_id)
+    assert trace.cypher == "MATCH (d:Doctor) RETURN d.id"
+    assert trace.records == [{"d.id": "Doctor1"}, {"d.id": "Doctor2"}] and trace.record_count == 2
+    assert {"cypher_generation", "database", "answer", "total"} <= set(trace.timings)
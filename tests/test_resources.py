@@ -0,0 +1,113 @@
+from types import SimpleNamespace
+
+from langchain_core.prompts import PromptTemplate
+from langchain_neo4j import GraphCypherQAChain
+
+from backend import resources
+from backend.resources import PoolSettings, get_llm
+#python -m pytest tests/test_resources.py
+
+
+def test_llm_clients_are_pooled_per_credential_set():
+    settings = PoolSettings(llm_timeout=5.0, llm_max_retries=1)
+    first = get_llm("Anthropic", "key-a", settings=settings)
+    assert get_llm("Anthropic", "key-a", settings=settings) is first
+    assert get_llm("Anthropic", "key-b", settings=settings) is not first
+    assert (first.default_request_timeout, first.max_retries) == (5.0, 1)
+
+
+def test_query_caches_are_kept_per_database_and_user(monkeypatch):
+    monkeypatch.setattr(resources, "connect_graph", lambda *args, **kwargs: SimpleNamespace(close=lambda: None))
+    movies = resources.get_graph("bolt://db", "reader", "pw", database="movies")
+    clinic = resources.get_graph("bolt://db", "reader", "pw", database="clinic")
+    admin = resources.get_graph("bolt://db", "admin", "pw", database="movies")
+    assert resources.graph_scope(movies) == ("bolt://db", "movies", "reader")
+    caches = {id(resources.get_query_cache(resources.graph_scope(g))) for g in (movies, clinic, admin)}
+    assert len(caches) == 3
+    assert resources.get_query_cache(resources.graph_scope(movies)) is resources.get_query_cache(
+        ("bolt://db", "movies", "reader"))
+    assert resources.scoped_dir("idx", resources.graph_scope(movies)) != resources.scoped_dir(
+        "idx", resources.graph_scope(clinic))
+    assert resources.manifest_path(resources.graph_scope(movies)) != resources.manifest_path(
+        resources.graph_scope(clinic))
+    assert resources.credentials_scope("bolt://db", "reader", "movies") == resources.graph_scope(movies)
+
+
+class Driver:
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_least_recently_used_drivers_are_closed_with_what_was_built_on_them(monkeypatch):
+    resources.close_all()
+    monkeypatch.setattr(resources, "MAX_POOLED", 3)
+    first = resources._pooled(("neo4j", "a"), Driver)
+    chain = resources._pooled(("qa", id(first)), object)
+    second = resources._pooled(("neo4j", "b"), Driver)
+    assert resources._pooled(("qa", id(first)), object) is chain and not first.closed
+    resources._pooled(("neo4j", "c"), Driver)
+    # "a" was least recently used; the chain keyed by its id goes with it
+    assert first.closed and not second.closed
+    assert resources._pooled(("qa", id(first)), object) is not chain
+    resources.close_all()
+    assert second.closed
+
+
+def test_a_slow_factory_only_blocks_callers_of_its_own_key():
+    import threading
+
+    resources.close_all()
+    started, release = threading.Event(), threading.Event()
+
+    def _slow():
+        started.set()
+        release.wait(5)
+        return object()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(resources._pooled(("slow",), _slow)))
+               for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    assert started.wait(5)
+    # Another key is created while the slow one is still being built
+    assert resources._pooled(("fast",), object) is not None
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert len(results) == 2 and results[0] is results[1]
+    resources.close_all()
+
+
+def test_metrics_server_listens_on_localhost_unless_a_host_is_configured(monkeypatch):
+    started = []
+    monkeypatch.setattr(resources, "start_metrics_server",
+                        lambda port, host: started.append((host, port)) or SimpleNamespace(shutdown=lambda: None))
+    monkeypatch.setenv("GRAPHRAG_METRICS_PORT", "9464")
+    monkeypatch.delenv("GRAPHRAG_METRICS_HOST", raising=False)
+    resources.close_all()
+    resources.get_metrics_server()
+    monkeypatch.setenv("GRAPHRAG_METRICS_HOST", "0.0.0.0")
+    resources.get_metrics_server()
+    resources.get_metrics_server(port=9465, host="10.0.0.5")
+    resources.close_all()
+    assert started == [("127.0.0.1", 9464), ("0.0.0.0", 9464), ("10.0.0.5", 9465)]
+
+
+def test_equal_cypher_prompts_share_one_chain(monkeypatch):
+    # Streamlit rebuilds the app's prompt on every rerun
+    def _prompt(template="Schema: {schema}\nQuestion: {question}\nCypher:"):
+        return PromptTemplate.from_template(template)
+
+    monkeypatch.setattr(resources, "_ensure_search_indexes", lambda graph: True)
+    monkeypatch.setattr(GraphCypherQAChain, "from_llm", classmethod(
+        lambda cls, llm, graph, **kwargs: SimpleNamespace(graph=graph, cypher_prompt=kwargs.get("cypher_prompt"))))
+    resources.close_all()
+    llm, graph = object(), SimpleNamespace(schema="(:Person)")
+    first = resources.get_qa_chain(llm, graph, cypher_prompt=_prompt())
+    assert resources.get_qa_chain(llm, graph, cypher_prompt=_prompt()) is first
+    assert resources.get_qa_chain(llm, graph, cypher_prompt=_prompt("{schema} {question} Cypher only:")) is not first
+    assert resources.get_qa_chain(llm, graph) is not first
+    resources.close_all()
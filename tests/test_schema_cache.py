@@ -0,0 +1,61 @@
+from backend.schema_cache import load_schema
+#python -m pytest tests/test_schema_cache.py
+
+
+class MetaGraph:
+    """Keeps the __GraphMeta__ node in memory and counts introspections."""
+
+    def __init__(self):
+        self.meta = {"version": 3}
+        self.refreshes = 0
+        self._enhanced_schema = False
+        self.schema = ""
+        self.structured_schema = {}
+
+    def query(self, cypher, params=None):
+        if cypher.lstrip().startswith("MERGE"):
+            self.meta.update(schema_version=params["version"], schema_enhanced=params["enhanced"],
+                             structured_schema=params["structured_schema"])
+            return []
+        return [{"version": self.meta["version"], "schema_version": self.meta.get("schema_version"),
+                 "enhanced": self.meta.get("schema_enhanced"),
+                 "structured_schema": self.meta.get("structured_schema")}]
+
+    def refresh_schema(self):
+        self.refreshes += 1
+        self.structured_schema = {
+            "node_props": {"Doctor": [{"property": "id", "type": "STRING"}],
+                           "__GraphMeta__": [{"property": "version", "type": "INTEGER"}]},
+            "rel_props": {},
+            "relationships": [{"start": "Doctor", "type": "TREATS", "end": "Doctor"}],
+            "metadata": {"constraint": [], "index": []},
+        }
+
+
+def test_snapshot_is_reused_until_the_version_changes():
+    graph = MetaGraph()
+    assert load_schema(graph) is False
+    assert "__GraphMeta__" not in graph.schema and "Doctor" in graph.schema
+
+    fresh = MetaGraph()
+    fresh.meta = graph.meta
+    assert load_schema(fresh) is True
+    assert fresh.refreshes == 0 and fresh.schema == graph.schema
+
+    graph.meta["version"] += 1
+    assert load_schema(graph) is False
+    assert graph.refreshes == 2
+
+
+def test_read_only_users_get_the_fresh_schema_without_saving_it():
+    from neo4j.exceptions import Forbidden
+
+    class ReadOnlyGraph(MetaGraph):
+        def query(self, cypher, params=None):
+            if cypher.lstrip().startswith("MERGE"):
+                raise Forbidden("Write operations are not allowed for user 'reader'")
+            return super().query(cypher, params)
+
+    graph = ReadOnlyGraph()
+    assert load_schema(graph) is False
+    assert "Doctor" in graph.schema and "structured_schema" not in graph.meta
@@ -0,0 +1,52 @@
+import pandas as pd
+
+from backend.structured import HEALTHCARE_MAPPING, iter_csv_documents, load_csv_with_mapping, mapped_rows
+from benchmarks.corpora import write_synthetic_csv
+#python -m pytest tests/test_structured.py
+
+COLUMNS = {"Name": ["bobby jackson", "Bobby Jackson", "Bobby Jackson", "Anna Lee"],
+           "Age": [30, 30, 62, 45], "Gender": ["Male", "Male", "Male", "Female"],
+           "Blood Type": ["B-", "B-", "A+", "O+"],
+           "Medical Condition": ["Cancer", "Cancer", "Asthma", "Asthma"],
+           "Doctor": ["Bobby Jackson", "Bobby Jackson", "Matthew Smith", "Matthew Smith"],
+           "Hospital": ["Sons And Miller", "Sons And Miller", "Kim Inc", "Kim Inc"],
+           "Medication": ["Aspirin", "Aspirin", "Lipitor", "Lipitor"],
+           "Insurance Provider": ["Aetna", "Aetna", "Cigna", "Cigna"],
+           "Date of Admission": ["2024-01-31"] * 4, "Discharge Date": ["2024-02-02"] * 4,
+           "Admission Type": ["Urgent"] * 4, "Room Number": [328, 328, 265, 205],
+           "Billing Amount": [18856.28, 18856.28, 33643.33, 27955.1], "Test Results": ["Normal"] * 4}
+
+
+def test_patients_are_keyed_apart_from_same_named_patients_and_doctors():
+    grouped = mapped_rows(pd.DataFrame(COLUMNS), HEALTHCARE_MAPPING, source="patients.csv")
+    patients = {node["id"]: node["properties"] for node in grouped["nodes"]["Patient"]}
+    assert set(patients) == {"Bobby Jackson (30, Male, B-)", "Bobby Jackson (62, Male, A+)",
+                             "Anna Lee (45, Female, O+)"}
+    assert patients["Bobby Jackson (62, Male, A+)"]["name"] == "Bobby Jackson"
+    assert [node["id"] for node in grouped["nodes"]["Doctor"]] == ["Bobby Jackson", "Matthew Smith"]
+    treated_by = {(rel["source"], rel["target"]) for rel in grouped["relationships"]["TREATED_BY"]}
+    assert ("Bobby Jackson (30, Male, B-)", "Bobby Jackson") in treated_by
+    # One document per row, each mentioning the keyed patient
+    assert len(grouped["documents"]) == 4
+    assert {"doc_id": grouped["documents"][3]["id"], "id": "Anna Lee (45, Female, O+)"} in grouped["mentions"]
+
+
+def test_csv_documents_are_read_in_chunks(tmp_path):
+    path = write_synthetic_csv(str(tmp_path / "patients.csv"), rows=25)
+    documents = list(iter_csv_documents(path, source="patients.csv", chunksize=10, max_rows=23))
+    assert len(documents) == 23
+    assert documents[-1].metadata == {"row": 22, "source": "patients.csv"}
+    assert documents[0].page_content.startswith("Name: patient 0, Age: ")
+
+
+class NullGraph:
+    def query(self, cypher, params=None):
+        return []
+
+
+def test_mapped_load_reports_progress_through_the_callback(tmp_path, capsys):
+    path = write_synthetic_csv(str(tmp_path / "patients.csv"), rows=25)
+    progress = []
+    totals = load_csv_with_mapping(NullGraph(), path, chunksize=10, on_progress=lambda t: progress.append(t["rows"]))
+    assert progress == [10, 20, 25] and totals["rows"] == 25
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,83 @@
+import json
+import time
+
+from langchain_core.documents import Document
+
+from backend import telemetry
+from backend.bulk_loader import bulk_write_graph_documents
+from backend.extraction import extract_graph_documents
+from backend.qa_trace import QueryTrace, StageTimer
+from utils.fake_llm import make_fake_graph_transformer
+#python -m pytest tests/test_telemetry.py
+
+
+class NullGraph:
+    def query(self, cypher, params=None):
+        return []
+
+
+def _spans(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_ingestion_spans_carry_tokens_and_feed_prometheus(tmp_path):
+    exporter = telemetry.add_exporter(telemetry.FileSpanExporter(str(tmp_path / "spans.jsonl")))
+    try:
+        transformer, llm = make_fake_graph_transformer()
+        docs = [Document(page_content=f"Alpha{i} Beta{i} Gamma{i}") for i in range(3)]
+        bulk_write_graph_documents(NullGraph(), extract_graph_documents(transformer, docs))
+    finally:
+        telemetry.remove_exporter(exporter)
+
+    spans = _spans(exporter.path)
+    extracts = [s for s in spans if s["name"] == "extract"]
+    assert len(extracts) == 3
+    assert sum(s["attributes"]["output_tokens"] for s in extracts) == llm.completion_tokens
+    write = [s for s in spans if s["name"] == "write"][0]
+    assert write["attributes"]["documents"] == 3
+    text = telemetry.REGISTRY.render_prometheus()
+    assert 'graphrag_stage_seconds_count{stage="extract"}' in text
+    assert 'graphrag_llm_tokens_total{direction="output"}' in text
+
+
+def test_query_span_has_a_child_per_stage_and_iterators_time_their_own_work(tmp_path):
+    exporter = telemetry.add_exporter(telemetry.FileSpanExporter(str(tmp_path / "spans.jsonl")))
+    try:
+        timer = StageTimer(QueryTrace(question="What is top-k?"))
+        with timer("cypher_generation"):
+            time.sleep(0.01)
+        with timer("database"):
+            pass
+        timer.finish()
+
+        def _pages():
+            for i in range(2):
+                time.sleep(0.02)
+                yield i
+
+        def _chunks(pages):
+            for page in pages:
+                yield page
+
+        assert list(telemetry.timed_iter(_chunks(telemetry.timed_iter(_pages(), "load")), "split")) == [0, 1]
+    finally:
+        telemetry.remove_exporter(exporter)
+
+    spans = _spans(exporter.path)
+    query = [s for s in spans if s["name"] == "query"][0]
+    children = [s["name"] for s in spans if s["parent_id"] == query["span_id"]]
+    assert children == ["cypher_generation", "database"]
+    # Page parsing is attributed to `load`, not to the `split` that pulled it
+    loads = [s["duration_ms"] for s in spans if s["name"] == "load"]
+    splits = [s["duration_ms"] for s in spans if s["name"] == "split"]
+    assert min(loads) >= 15 and max(splits) < 10
+
+
+def test_metrics_server_defaults_to_localhost():
+    server = telemetry.start_metrics_server(0, registry=telemetry.MetricsRegistry())
+    try:
+        assert server.server_address[0] == "127.0.0.1"
+    finally:
+        server.shutdown()
+        server.server_close()
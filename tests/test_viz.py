@@ -4,11 +4,12 @@ from dotenv import load_dotenv
 #python -m tests.test_viz
 from langchain_community.graphs import Neo4jGraph
 from langchain_neo4j import GraphCypherQAChain, Neo4jGraph
+from backend.schema_cache import connect_graph
 from utils.visualizer import visualize_neo4j_graph
 load_dotenv()
-graph = Neo4jGraph(url=os.getenv("NEO4J_URI"), 
-                username=os.getenv("NEO4J_USERNAME"), 
-                password=os.getenv("NEO4J_PASSWORD"),
+graph = connect_graph(os.getenv("NEO4J_URI"),
+                os.getenv("NEO4J_USERNAME"),
+                os.getenv("NEO4J_PASSWORD"),
                 enhanced_schema=True)
 # Run the function with your Neo4j graph
 print("🚀 Creating Neo4j visualization...")
@@ -18,4 +19,5 @@ if result:
     print(f"\n🎉 Visualization completed!")
     print(f"   📊 Nodes: {result['nodes_count']}")
     print(f"   🔗 Relationships: {result['relationships_count']}")
+    print(f"   📥 Records kept/fetched: {result['kept_records']}/{result['fetched_records']}")
     print(f"   📁 File: {result['output_file']}")
\ No newline at end of file
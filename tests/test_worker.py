@@ -0,0 +1,92 @@
+from langchain_community.graphs.graph_document import GraphDocument, Node
+from langchain_core.documents import Document
+
+from backend.entity_resolution import AliasTable, EntityResolver
+from backend.incremental import IngestionManifest, remove_source
+from backend.jobs import WRITTEN, JobStore
+from backend.worker import save_upload
+#python -m pytest tests/test_worker.py
+
+
+def test_concurrent_jobs_keep_each_others_manifest_sources_and_aliases(tmp_path):
+    manifest_path, alias_path = str(tmp_path / "manifest.json"), str(tmp_path / "aliases.json")
+    # Two workers load the (empty) state before either saves
+    first, second = IngestionManifest(manifest_path, scope={"a.pdf"}), IngestionManifest(manifest_path, scope={"b.pdf"})
+    first.sources["a.pdf"] = {"f1": {"doc_id": "f1", "nodes": [], "relationships": []}}
+    second.sources["b.pdf"] = {"f2": {"doc_id": "f2", "nodes": [], "relationships": []}}
+    first.save()
+    second.save()
+    assert set(IngestionManifest(manifest_path).sources) == {"a.pdf", "b.pdf"}
+
+    first_aliases, second_aliases = AliasTable(alias_path, merge_on_save=True), AliasTable(alias_path, merge_on_save=True)
+    first_aliases.aliases["gpt4"] = "GPT-4"
+    second_aliases.aliases["llama"] = "LLaMA"
+    first_aliases.save()
+    second_aliases.save()
+    assert AliasTable(alias_path).aliases == {"gpt4": "GPT-4", "llama": "LLaMA"}
+
+
+class RecordingGraph:
+    def __init__(self):
+        self.queries = []
+
+    def query(self, cypher, params=None):
+        self.queries.append((cypher, params))
+        return []
+
+
+def test_chunk_removal_counts_references_other_workers_saved_since_it_loaded(tmp_path):
+    manifest_path = str(tmp_path / "manifest.json")
+    first = IngestionManifest(manifest_path, scope={"a.pdf"})
+    first.sources["a.pdf"] = {"fa": {"doc_id": "da", "nodes": [["X", "Concept"], ["Y", "Concept"]],
+                                     "relationships": []}}
+    first.save()
+    # Another worker, started before, writes a chunk that also has X
+    second = IngestionManifest(manifest_path, scope={"b.pdf"})
+    second.sources["b.pdf"] = {"fb": {"doc_id": "db", "nodes": [["X", "Concept"]], "relationships": []}}
+    second.save()
+
+    graph = RecordingGraph()
+    remove_source(graph, first, "a.pdf")
+    deleted = [params["ids"] for cypher, params in graph.queries if "DETACH DELETE n" in cypher]
+    assert deleted == [["Y"]]
+    assert set(IngestionManifest(manifest_path).sources) == {"b.pdf"}
+
+
+def _mentions(*ids):
+    return GraphDocument(nodes=[Node(id=i, type="Concept") for i in ids], relationships=[],
+                         source=Document(page_content=" ".join(ids)))
+
+
+def test_workers_resolve_against_the_canonical_ids_others_chose(tmp_path):
+    alias_path = str(tmp_path / "aliases.json")
+    first = EntityResolver(AliasTable(alias_path, merge_on_save=True))
+    second = EntityResolver(AliasTable(alias_path, merge_on_save=True))
+    first.resolve([_mentions("top k"), _mentions("top k", "Top-K")])
+    # On its own the second worker would pick its most mentioned form, "Top-K"
+    documents, _ = second.resolve([_mentions("Top-K"), _mentions("Top-K", "Beam search")])
+    assert {node.id for gd in documents for node in gd.nodes} == {"top k", "Beam search"}
+    assert AliasTable(alias_path).aliases["Top-K"] == "top k"
+
+
+def test_enqueue_keeps_unfinished_chunks_and_replans_finished_jobs(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite"))
+    chunks = [Document(page_content=f"Chunk{i}", metadata={"source": "a.pdf"}) for i in range(3)]
+    store.create("job1", "a.pdf", "a.pdf", chunks)
+    store.set_status("job1", "failed", "connection reset")
+
+    store.enqueue("job1", "a.pdf", "a.pdf", {"provider": "OpenAI"})
+    job = store.get("job1")
+    assert (job["status"], job["error"], sum(job["counts"].values())) == ("queued", None, 3)
+
+    store.set_status("job1", "done")
+    store.enqueue("job1", "a.pdf", "a.pdf", {"provider": "OpenAI"})
+    assert store.get("job1")["counts"][WRITTEN] == 0
+    assert sum(store.counts("job1").values()) == 0
+
+
+def test_save_upload_is_content_addressed(tmp_path):
+    path = save_upload(b"%PDF-1.4 one", "book.pdf", str(tmp_path))
+    assert save_upload(b"%PDF-1.4 one", "renamed.pdf", str(tmp_path)) == path
+    assert save_upload(b"%PDF-1.4 two", "book.pdf", str(tmp_path)) != path
+    assert path.endswith(".pdf")
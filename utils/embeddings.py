@@ -0,0 +1,44 @@
+"""
+Embedding models for the local chunk index.
+
+`default_embeddings()` returns OpenAIEmbeddings when an OpenAI key is set
+and otherwise HashingEmbeddings: a deterministic, offline bag-of-words
+model (signed feature hashing of word unigrams and bigrams). It is much
+weaker than a neural model but needs no API key, so the index and its tests
+work anywhere.
+"""
+import os
+import re
+from hashlib import blake2b
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+_WORD_RE = re.compile(r"\w+")
+
+
+class HashingEmbeddings(Embeddings):
+    def __init__(self, dim=512):
+        self.dim = dim
+
+    def _embed(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        words = _WORD_RE.findall(text.lower())
+        for feature in words + [a + " " + b for a, b in zip(words, words[1:])]:
+            digest = int.from_bytes(blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+            vector[digest % self.dim] += 1.0 if digest >> 63 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+def default_embeddings():
+    if os.getenv("OPENAI_API_KEY"):
+        from langchain_openai import OpenAIEmbeddings
+        return OpenAIEmbeddings(model="text-embedding-3-small")
+    return HashingEmbeddings()
@@ -0,0 +1,114 @@
+"""
+Deterministic fake chat model for exercising the graph pipeline without API keys.
+
+FakeChatModel answers LLMGraphTransformer's unstructured (JSON) prompt with
+head/relation/tail triples built from the chunk text, after a simulated
+latency (a fixed part plus a per-output-token part, like a real LLM). It can
+also fail its first calls with a 429 to test retries, and counts calls and
+prompt/completion tokens for cost comparisons. FakeQAChatModel does the same
+for GraphCypherQAChain's Cypher and answer prompts.
+"""
+import asyncio
+import json
+import re
+import time
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from utils.tokens import count_tokens
+
+
+class FakeRateLimitError(Exception):
+    """Mimics the 429 raised by the Anthropic / OpenAI SDKs."""
+    status_code = 429
+
+
+class FakeChatModel(BaseChatModel):
+    latency: float = 0.0
+    latency_per_token: float = 0.0
+    relations_per_call: int = 3
+    fail_first: int = 0
+    calls: int = 0
+    failures: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+    @property
+    def _llm_type(self):
+        return "fake-graph-chat"
+
+    def _content(self, prompt):
+        # LLMGraphTransformer puts the chunk after the last "Text: " marker
+        text = prompt.rsplit("Text: ", 1)[-1]
+        words = []
+        for word in re.findall(r"[A-Za-z][A-Za-z0-9\-]{2,}", text):
+            if word not in words:
+                words.append(word)
+            if len(words) > self.relations_per_call:
+                break
+        triples = [
+            {"head": head, "head_type": "Concept", "relation": "RELATED_TO",
+             "tail": tail, "tail_type": "Concept"}
+            for head, tail in zip(words, words[1:])
+        ]
+        return json.dumps(triples)
+
+    def _respond(self, messages):
+        if self.failures < self.fail_first:
+            self.failures += 1
+            raise FakeRateLimitError("Error code: 429 - rate limit exceeded")
+        self.calls += 1
+        prompt = "\n".join(str(m.content) for m in messages)
+        prompt_tokens = count_tokens(prompt)
+        self.prompt_tokens += prompt_tokens
+        content = self._content(prompt)
+        tokens = count_tokens(content)
+        self.completion_tokens += tokens
+        usage = {"input_tokens": prompt_tokens, "output_tokens": tokens, "total_tokens": prompt_tokens + tokens}
+        message = AIMessage(content=content, usage_metadata=usage)
+        result = ChatResult(generations=[ChatGeneration(message=message)])
+        return result, self.latency + tokens * self.latency_per_token
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        result, delay = self._respond(messages)
+        if delay:
+            time.sleep(delay)
+        return result
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        result, delay = self._respond(messages)
+        if delay:
+            await asyncio.sleep(delay)
+        return result
+
+
+class FakeQAChatModel(FakeChatModel):
+    """
+    Answers GraphCypherQAChain's two prompts: the Cypher prompt with a
+    neighbourhood lookup of the entity quoted in the question
+    (`What is "Top-K" related to?`), the answer prompt with a one-line
+    summary of the rows it was given.
+    """
+
+    @property
+    def _llm_type(self):
+        return "fake-graph-qa-chat"
+
+    def _content(self, prompt):
+        quoted = re.findall(r'"([^"]+)"', prompt)
+        entity = quoted[-1] if quoted else ""
+        if "Generate Cypher statement" in prompt:
+            return (f"MATCH (n:`__Entity__` {{id: {json.dumps(entity)}}})-[r]-(m) "
+                    f"RETURN n.id AS entity, type(r) AS relationship, m.id AS neighbour")
+        context = prompt.split("Information:", 1)[-1]
+        return f"{entity} is connected to {context.count('neighbour')} entities in the graph."
+
+
+def make_fake_graph_transformer(**kwargs):
+    """LLMGraphTransformer wired to a FakeChatModel (returns transformer, model)."""
+    from langchain_experimental.graph_transformers import LLMGraphTransformer
+
+    llm = FakeChatModel(**kwargs)
+    return LLMGraphTransformer(llm=llm, ignore_tool_usage=True), llm
@@ -0,0 +1,40 @@
+"""
+Advisory lock around read-modify-write of a JSON state file shared by
+several processes (ingestion workers updating the manifest or alias table).
+"""
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, single-process use only
+    fcntl = None
+
+_held = threading.local()  # path -> depth, so a thread can nest locked() on one path
+
+
+@contextmanager
+def locked(path):
+    """
+    Hold an exclusive lock on `path + ".lock"` for the duration of the
+    block. Re-entrant within a thread (e.g. save() inside a locked update).
+    """
+    depths = _held.__dict__.setdefault("depths", {})
+    if fcntl is None or depths.get(path):
+        depths[path] = depths.get(path, 0) + 1
+        try:
+            yield
+        finally:
+            depths[path] -= 1
+        return
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        depths[path] = 1
+        try:
+            yield
+        finally:
+            depths[path] = 0
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
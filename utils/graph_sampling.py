@@ -0,0 +1,149 @@
+"""
+Connected subgraph samples for visualization, pulled in one query.
+
+Fetching `LIMIT n` arbitrary nodes and `LIMIT m` arbitrary relationships in
+two unrelated queries throws away every relationship whose endpoints missed
+the node sample. Here the server picks the nodes first and returns only
+relationships between them, so nothing fetched is dropped:
+
+- "degree": the `max_nodes` best-connected nodes.
+- "ego": everything within `hops` of the seed nodes (matched on `id`),
+  expanded breadth-first with apoc.path.subgraphNodes.
+- "random_walk": `walks` random walks of `walk_length` steps from random
+  start nodes.
+
+Rows are streamed from the driver `page_size` records at a time.
+"""
+from backend.graph_version import META_LABEL
+
+# Bookkeeping nodes that are never drawn
+INTERNAL_LABELS = (META_LABEL,)
+STRATEGIES = ("degree", "ego", "random_walk")
+
+_NODE_FILTER = "NOT any(label IN labels({var}) WHERE label IN $excluded)"
+
+# Shared tail: given `sample` (a list of nodes), emit the nodes and the
+# relationships between them
+_EMIT_SUBGRAPH = """
+WITH sample, [n IN sample | elementId(n)] AS ids
+CALL {
+    WITH sample
+    UNWIND sample AS n
+    RETURN 'node' AS kind, elementId(n) AS id, labels(n) AS labels, properties(n) AS properties,
+           null AS source, null AS target, null AS type
+    UNION ALL
+    WITH sample, ids
+    UNWIND sample AS a
+    MATCH (a)-[r]->(b)
+    WHERE elementId(b) IN ids
+    WITH r, a, b LIMIT $max_relationships
+    RETURN 'relationship' AS kind, elementId(r) AS id, null AS labels, properties(r) AS properties,
+           elementId(a) AS source, elementId(b) AS target, type(r) AS type
+}
+RETURN kind, id, labels, properties, source, target, type
+"""
+
+
+def degree_sample_query():
+    return f"""
+    MATCH (n) WHERE {_NODE_FILTER.format(var='n')}
+    WITH n, COUNT {{ (n)--() }} AS degree
+    ORDER BY degree DESC
+    LIMIT $max_nodes
+    WITH collect(n) AS sample
+    """ + _EMIT_SUBGRAPH
+
+
+def ego_sample_query(hops):
+    return f"""
+    MATCH (seed) WHERE seed.id IN $seeds
+    CALL apoc.path.subgraphNodes(seed, {{maxLevel: {int(hops)}, limit: $max_nodes}}) YIELD node
+    WITH DISTINCT node AS n WHERE {_NODE_FILTER.format(var='n')}
+    LIMIT $max_nodes
+    WITH collect(n) AS sample
+    """ + _EMIT_SUBGRAPH
+
+
+def random_walk_sample_query(walk_length):
+    # Cypher has no loops, so the walk is unrolled into one CALL per step
+    steps = "\n".join(
+        f"""    CALL {{
+        WITH n{i}
+        OPTIONAL MATCH (n{i})--(next) WHERE {_NODE_FILTER.format(var='next')}
+        RETURN next AS n{i + 1} ORDER BY rand() LIMIT 1
+    }}"""
+        for i in range(int(walk_length))
+    )
+    walk = ", ".join(f"n{i}" for i in range(int(walk_length) + 1))
+    return f"""
+    MATCH (n0) WHERE {_NODE_FILTER.format(var='n0')}
+    WITH n0 ORDER BY rand() LIMIT $walks
+{steps}
+    UNWIND [{walk}] AS n
+    WITH DISTINCT n WHERE n IS NOT NULL
+    LIMIT $max_nodes
+    WITH collect(n) AS sample
+    """ + _EMIT_SUBGRAPH
+
+
+def iter_pages(graph, query, params=None, page_size=1000):
+    """
+    Yield result rows in pages of `page_size`. With a Neo4jGraph the driver
+    pulls one page at a time from the server; other graph objects (stand-ins)
+    fall back to graph.query.
+    """
+    driver = getattr(graph, "_driver", None)
+    if driver is None:
+        rows = graph.query(query, params or {})
+        for start in range(0, len(rows), page_size):
+            yield rows[start:start + page_size]
+        return
+    with driver.session(database=getattr(graph, "_database", None), fetch_size=page_size) as session:
+        page = []
+        for record in session.run(query, params or {}):
+            page.append(record.data())
+            if len(page) >= page_size:
+                yield page
+                page = []
+        if page:
+            yield page
+
+
+def sample_subgraph(graph, strategy="degree", max_nodes=1000, max_relationships=5000,
+                    seeds=None, hops=2, walks=50, walk_length=10, page_size=1000,
+                    excluded_labels=INTERNAL_LABELS):
+    """
+    Returns (nodes, relationships, report):
+    nodes maps element id -> {"labels", "properties"}, relationships is a
+    list of {"source", "target", "type", "properties"}, and report counts
+    records fetched vs kept and the pages streamed.
+    """
+    if strategy == "degree":
+        query = degree_sample_query()
+    elif strategy == "ego":
+        if not seeds:
+            raise ValueError("The 'ego' strategy needs seed node ids")
+        query = ego_sample_query(hops)
+    elif strategy == "random_walk":
+        query = random_walk_sample_query(walk_length)
+    else:
+        raise ValueError(f"Unknown sampling strategy {strategy!r}; use one of {STRATEGIES}")
+    params = {"max_nodes": max_nodes, "max_relationships": max_relationships,
+              "seeds": list(seeds or []), "walks": walks, "excluded": list(excluded_labels)}
+
+    nodes, fetched_relationships = {}, []
+    report = {"strategy": strategy, "pages": 0, "fetched": 0}
+    for page in iter_pages(graph, query, params, page_size):
+        report["pages"] += 1
+        report["fetched"] += len(page)
+        for row in page:
+            if row["kind"] == "node":
+                nodes[row["id"]] = {"labels": row["labels"], "properties": row["properties"] or {}}
+            else:
+                fetched_relationships.append({"source": row["source"], "target": row["target"],
+                                              "type": row["type"], "properties": row["properties"] or {}})
+    # The query only returns relationships inside the sample; this is a safety net
+    relationships = [rel for rel in fetched_relationships if rel["source"] in nodes and rel["target"] in nodes]
+    report.update(nodes_kept=len(nodes), relationships_kept=len(relationships),
+                  kept=len(nodes) + len(relationships))
+    return nodes, relationships, report
@@ -0,0 +1,239 @@
+"""
+Large-graph export: offline layout, compact payload, canvas viewer.
+
+The PyVis page runs forceAtlas2 physics in the browser, which freezes past
+a few thousand nodes. Here the layout is computed once in NumPy (a
+Fruchterman-Reingold variant whose repulsion is approximated on a coarse
+grid, so one iteration is O(nodes x cells + edges) instead of O(nodes^2)),
+cached per graph version, and shipped as a columnar JSON payload to a small
+canvas viewer without physics. Zoomed out, the viewer draws one bubble per
+label (level of detail); zoomed in, it draws the nodes and edges on screen.
+
+    from utils.large_graph import export_large_graph
+    export_large_graph(graph, max_nodes=50000)
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from backend.graph_version import get_graph_version
+from utils.graph_sampling import sample_subgraph
+
+DEFAULT_LAYOUT_DIR = os.path.join(".graphrag_cache", "layouts")
+PALETTE = ["#4ECDC4", "#FF6B6B", "#45B7D1", "#96CEB4", "#FFEAA7", "#DDA0DD", "#98D8C8",
+           "#A8E6CF", "#FF8C94", "#F7B267", "#B5A1E0", "#7FB3D5"]
+
+
+def _initial_positions(groups, rng):
+    """Each group starts as a disc on a ring, so clusters stay recognisable."""
+    n = len(groups)
+    counts = np.bincount(groups)
+    ring = np.sqrt(n) * 2.0
+    angles = 2 * np.pi * np.arange(len(counts)) / max(len(counts), 1)
+    centers = np.stack([np.cos(angles), np.sin(angles)], axis=1) * ring
+    if len(counts) == 1:
+        centers[:] = 0.0
+    radius = np.sqrt(counts[groups]) * rng.random(n)
+    theta = 2 * np.pi * rng.random(n)
+    return centers[groups] + np.stack([np.cos(theta), np.sin(theta)], axis=1) * radius[:, None]
+
+
+def force_layout(n, sources, targets, groups=None, iterations=60, grid=32, seed=7):
+    """
+    2-D positions (n x 2 float32) for a graph given as edge index arrays.
+
+    Repulsion is computed between grid cells (each acting through its
+    centroid and node count) and applied to every node of a cell, plus a
+    push away from the node's own cell centroid; attraction runs along the
+    edges. One iteration costs O(cells^2 + nodes + edges).
+    """
+    rng = np.random.default_rng(seed)
+    groups = np.zeros(n, dtype=np.int64) if groups is None else np.asarray(groups, dtype=np.int64)
+    pos = _initial_positions(groups, rng)
+    if n < 2:
+        return pos.astype(np.float32)
+    sources, targets = np.asarray(sources, dtype=np.int64), np.asarray(targets, dtype=np.int64)
+    start_temperature = np.sqrt(n)
+
+    for step in range(iterations):
+        lo, hi = pos.min(axis=0), pos.max(axis=0)
+        cell = np.minimum(((pos - lo) / np.maximum(hi - lo, 1e-9) * grid).astype(np.int64), grid - 1)
+        # Ideal distance between nodes for the current layout area
+        k = np.sqrt(np.prod(np.maximum(hi - lo, 1e-9)) / n)
+        flat = cell[:, 0] * grid + cell[:, 1]
+        occupied, slot = np.unique(flat, return_inverse=True)
+        mass = np.bincount(slot).astype(np.float64)
+        centroid = np.stack([np.bincount(slot, pos[:, d]) for d in (0, 1)], axis=1) / mass[:, None]
+
+        # Cell-to-cell field (a cell does not repel itself here)
+        delta = centroid[:, None, :] - centroid[None, :, :]
+        dist2 = (delta ** 2).sum(axis=2)
+        np.fill_diagonal(dist2, np.inf)
+        field = (delta * (mass * k * k / np.maximum(dist2, 1e-2))[:, :, None]).sum(axis=1)
+        # Inside a cell, spread nodes away from the cell centroid
+        local = pos - centroid[slot]
+        local_dist2 = np.maximum((local ** 2).sum(axis=1), 1e-2)
+        displacement = field[slot] + local * (mass[slot] * k * k / local_dist2)[:, None]
+
+        if len(sources):
+            delta = pos[sources] - pos[targets]
+            dist = np.maximum(np.linalg.norm(delta, axis=1), 1e-6)
+            pull = delta * (dist / k)[:, None]
+            for d in (0, 1):
+                displacement[:, d] -= np.bincount(sources, pull[:, d], n)
+                displacement[:, d] += np.bincount(targets, pull[:, d], n)
+
+        # Linear cooling caps how far a node moves per iteration
+        temperature = start_temperature * (1.0 - step / iterations)
+        length = np.maximum(np.linalg.norm(displacement, axis=1), 1e-9)
+        pos += displacement / length[:, None] * np.minimum(length, temperature)[:, None]
+
+    return pos.astype(np.float32)
+
+
+def _layout_key(node_ids, sources, targets):
+    digest = hashlib.sha256()
+    digest.update("\x1f".join(node_ids).encode("utf-8"))
+    digest.update(np.asarray(sources, dtype=np.int64).tobytes())
+    digest.update(np.asarray(targets, dtype=np.int64).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def cached_layout(version, node_ids, sources, targets, groups, layout_dir=DEFAULT_LAYOUT_DIR, **kwargs):
+    """force_layout, stored as .npy under the graph version and the sample's shape."""
+    path = os.path.join(layout_dir, f"v{version}-{_layout_key(node_ids, sources, targets)}.npy")
+    if os.path.exists(path):
+        return np.load(path)
+    pos = force_layout(len(node_ids), sources, targets, groups, **kwargs)
+    os.makedirs(layout_dir, exist_ok=True)
+    np.save(path, pos)
+    return pos
+
+
+def build_payload(nodes, relationships, pos, version=None):
+    """
+    Columnar payload: parallel arrays instead of one object per node, labels
+    and relationship types as indexes into small tables, integer coordinates.
+    """
+    node_ids = list(nodes)
+    index = {node_id: i for i, node_id in enumerate(node_ids)}
+    labels, label_index, node_labels, names = [], {}, [], []
+    for node_id in node_ids:
+        visible = [l for l in nodes[node_id]["labels"] if not l.startswith("__")] or ["Unknown"]
+        label = visible[0]
+        if label not in label_index:
+            label_index[label] = len(labels)
+            labels.append(label)
+        node_labels.append(label_index[label])
+        names.append(str(nodes[node_id]["properties"].get("id", node_id)))
+
+    types, type_index = [], {}
+    sources, targets, edge_types = [], [], []
+    for rel in relationships:
+        if rel["type"] not in type_index:
+            type_index[rel["type"]] = len(types)
+            types.append(rel["type"])
+        sources.append(index[rel["source"]])
+        targets.append(index[rel["target"]])
+        edge_types.append(type_index[rel["type"]])
+
+    node_labels = np.asarray(node_labels, dtype=np.int64)
+    xy = np.round(pos).astype(np.int64)
+    clusters = []
+    for i, label in enumerate(labels):
+        members = node_labels == i
+        center = pos[members].mean(axis=0)
+        spread = float(np.sqrt(((pos[members] - center) ** 2).sum(axis=1).mean()))
+        clusters.append({"label": label, "x": round(float(center[0])), "y": round(float(center[1])),
+                         "size": int(members.sum()), "radius": round(max(spread, 1.0))})
+    return {
+        "version": version,
+        "labels": labels,
+        "colors": [PALETTE[i % len(PALETTE)] for i in range(len(labels))],
+        "types": types,
+        "nodes": {"name": names, "label": node_labels.tolist(),
+                  "x": xy[:, 0].tolist(), "y": xy[:, 1].tolist()},
+        "edges": {"source": sources, "target": targets, "type": edge_types},
+        "clusters": clusters,
+    }
+
+
+_VIEWER = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Knowledge graph</title>
+<style>html,body{margin:0;height:100%;background:#222;overflow:hidden;font:12px sans-serif}
+#info{position:fixed;top:8px;left:8px;color:#ddd}</style></head>
+<body><canvas id="c"></canvas><div id="info"></div>
+<script>
+const G = __PAYLOAD__, DETAIL_BUDGET = 20000;
+const c = document.getElementById('c'), ctx = c.getContext('2d'), info = document.getElementById('info');
+const N = G.nodes.x.length, X = G.nodes.x, Y = G.nodes.y, L = G.nodes.label;
+const S = G.edges.source, T = G.edges.target;
+let minX = Math.min(...G.clusters.map(k => k.x - k.radius * 2)), maxX = Math.max(...G.clusters.map(k => k.x + k.radius * 2));
+let minY = Math.min(...G.clusters.map(k => k.y - k.radius * 2)), maxY = Math.max(...G.clusters.map(k => k.y + k.radius * 2));
+let scale = 1, ox = 0, oy = 0;
+function fit() { c.width = innerWidth; c.height = innerHeight;
+  scale = Math.min(c.width / (maxX - minX || 1), c.height / (maxY - minY || 1));
+  ox = -minX * scale; oy = -minY * scale; draw(); }
+const sx = x => x * scale + ox, sy = y => y * scale + oy;
+const visible = (x, y) => x > -20 && y > -20 && x < c.width + 20 && y < c.height + 20;
+function draw() {
+  ctx.clearRect(0, 0, c.width, c.height);
+  const area = (maxX - minX) * (maxY - minY) || 1;
+  const onScreen = Math.min(N, N * c.width * c.height / (area * scale * scale));
+  if (onScreen > DETAIL_BUDGET) {  // level of detail: one bubble per label
+    for (const k of G.clusters) { const i = G.labels.indexOf(k.label);
+      ctx.fillStyle = G.colors[i]; ctx.globalAlpha = 0.6; ctx.beginPath();
+      ctx.arc(sx(k.x), sy(k.y), Math.max(k.radius * scale, 6), 0, 7); ctx.fill(); ctx.globalAlpha = 1;
+      ctx.fillStyle = '#fff'; ctx.fillText(k.label + ' (' + k.size + ')', sx(k.x) + 8, sy(k.y)); }
+    info.textContent = N + ' nodes, ' + S.length + ' edges - scroll to zoom in';
+    return; }
+  ctx.strokeStyle = 'rgba(150,150,150,0.35)'; ctx.beginPath(); let shown = 0;
+  for (let e = 0; e < S.length; e++) { const a = S[e], b = T[e];
+    const x1 = sx(X[a]), y1 = sy(Y[a]), x2 = sx(X[b]), y2 = sy(Y[b]);
+    if (visible(x1, y1) || visible(x2, y2)) { ctx.moveTo(x1, y1); ctx.lineTo(x2, y2); } }
+  ctx.stroke();
+  const r = Math.max(2, Math.min(8, scale * 0.6)), labels = scale > 6;
+  for (let i = 0; i < N; i++) { const x = sx(X[i]), y = sy(Y[i]); if (!visible(x, y)) continue;
+    shown++; ctx.fillStyle = G.colors[L[i]]; ctx.fillRect(x - r, y - r, 2 * r, 2 * r);
+    if (labels) { ctx.fillStyle = '#ddd'; ctx.fillText(G.nodes.name[i], x + r + 2, y + 3); } }
+  info.textContent = shown + ' of ' + N + ' nodes on screen';
+}
+c.addEventListener('wheel', ev => { ev.preventDefault(); const f = ev.deltaY < 0 ? 1.25 : 0.8;
+  ox = ev.clientX - (ev.clientX - ox) * f; oy = ev.clientY - (ev.clientY - oy) * f; scale *= f; draw(); }, {passive: false});
+let drag = null;
+c.addEventListener('mousedown', ev => drag = [ev.clientX - ox, ev.clientY - oy]);
+addEventListener('mouseup', () => drag = null);
+addEventListener('mousemove', ev => { if (drag) { ox = ev.clientX - drag[0]; oy = ev.clientY - drag[1]; draw(); } });
+addEventListener('resize', fit); fit();
+</script></body></html>
+"""
+
+
+def render_html(payload, output_file):
+    with open(output_file, "w", encoding="utf-8") as f:
+        # "</" is escaped so a node name cannot close the <script> element
+        data = json.dumps(payload, separators=(",", ":")).replace("</", "<\\/")
+        f.write(_VIEWER.replace("__PAYLOAD__", data))
+    return output_file
+
+
+def export_large_graph(graph, max_nodes=50000, max_relationships=200000, strategy="degree",
+                       output_file="neo4j_knowledge_graph_large.html", layout_dir=DEFAULT_LAYOUT_DIR,
+                       **sample_kwargs):
+    """Sample, lay out (cached per graph version) and write the canvas viewer."""
+    nodes, relationships, report = sample_subgraph(graph, strategy=strategy, max_nodes=max_nodes,
+                                                   max_relationships=max_relationships, **sample_kwargs)
+    node_ids = list(nodes)
+    index = {node_id: i for i, node_id in enumerate(node_ids)}
+    sources = [index[rel["source"]] for rel in relationships]
+    targets = [index[rel["target"]] for rel in relationships]
+    label_ids = {}
+    groups = [label_ids.setdefault(next((l for l in nodes[i]["labels"] if not l.startswith("__")), "Unknown"),
+                                   len(label_ids)) for i in node_ids]
+    version = get_graph_version(graph)
+    pos = cached_layout(version, node_ids, sources, targets, groups, layout_dir=layout_dir)
+    render_html(build_payload(nodes, relationships, pos, version), output_file)
+    report.update(output_file=output_file, version=version)
+    return report
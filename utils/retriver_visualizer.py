@@ -1,22 +1,15 @@
-import ast
-from backend.graph_query import SimpleGraphTracker
-
-# Create tracker and chain
-tracker = SimpleGraphTracker()
-# --- Visualization Section ---
-# Parse the context data (safe for your own generated data)
-print("=== DEBUG: tracker.context ===")
-print(repr(tracker.context))
-
-try:
-    context_list = ast.literal_eval(tracker.context)
-except Exception as e:
-    print(f"Error parsing context: {e}")
-    context_list = []
-print("=== DEBUG: context_list ===")
-print(repr(context_list))
-print("=== DEBUG: context_list type and length ===")
-print(type(context_list), len(context_list))
+import os
+import webbrowser
+
+from pyvis.network import Network
+
+# Running the query script leaves its structured trace behind; the records
+# are the raw result dicts, so nothing has to be parsed back from text
+from backend.graph_query import trace
+
+context_list = trace.records
+print(f"Records: {trace.record_count} | Cypher: {trace.cypher}")
+
 # Create a PyVis network
 net = Network(height="600px", width="100%", bgcolor="#222222", font_color="white", directed=True)
 
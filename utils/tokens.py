@@ -0,0 +1,27 @@
+"""
+Token counting for budgeting LLM calls.
+
+Uses tiktoken's cl100k_base encoding when it is installed and its vocabulary
+can be loaded; otherwise falls back to the usual ~4 characters per token
+estimate. Claude's tokenizer is not public, so both are approximations that
+are close enough for sizing chunks and batches.
+"""
+from functools import lru_cache
+
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+
+def count_tokens(text):
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return max(1, len(text) // CHARS_PER_TOKEN) if text else 0
@@ -1,39 +1,62 @@
 from pyvis.network import Network
 import os
 
-def visualize_neo4j_graph(graph, max_nodes, max_relationships):
+from utils.graph_sampling import sample_subgraph
+from utils.large_graph import export_large_graph
+
+# Color mapping for different node types
+COLOR_MAP = {
+    'Concept': '#4ECDC4',
+    'Person': '#FF6B6B',
+    'Research': '#FF8C94',
+    'Technology': '#45B7D1',
+    'Organization': '#96CEB4',
+    'Publication': '#FFEAA7',
+    'Method': '#DDA0DD',
+    'Framework': '#98D8C8',
+    'Document': '#A8E6CF'
+}
+
+# Past this many nodes PyVis' in-browser physics freezes the page
+PYVIS_MAX_NODES = 3000
+
+
+def visualize_neo4j_graph(graph, max_nodes, max_relationships, strategy="degree", seeds=None,
+                          hops=2, page_size=1000, renderer=None):
     """
     Visualize Neo4j database using PyVis (similar to your existing function structure)
+
+    The nodes and the relationships between them come from one sampling query
+    (utils.graph_sampling): strategy "degree", "ego" (around `seeds`) or
+    "random_walk". renderer="canvas" (the default above PYVIS_MAX_NODES)
+    writes the large-graph viewer from utils.large_graph instead: layout
+    precomputed and cached per graph version, no physics.
     """
+    if renderer is None:
+        renderer = "canvas" if max_nodes > PYVIS_MAX_NODES else "pyvis"
+    if renderer == "canvas":
+        report = export_large_graph(graph, max_nodes=max_nodes, max_relationships=max_relationships,
+                                    strategy=strategy, seeds=seeds, hops=hops, page_size=page_size)
+        print(f"✅ Graph saved to {os.path.abspath(report['output_file'])} "
+              f"({report['nodes_kept']} nodes, {report['relationships_kept']} relationships)")
+        return {
+            'nodes_count': report['nodes_kept'],
+            'relationships_count': report['relationships_kept'],
+            'fetched_records': report['fetched'],
+            'kept_records': report['kept'],
+            'output_file': report['output_file']
+        }
     
-    print("🔄 Fetching data from Neo4j...")
-    
-    # Get nodes from Neo4j
-    nodes_query = f"""
-    MATCH (n)
-    RETURN 
-        id(n) as node_id,
-        labels(n) as labels,
-        properties(n) as properties
-    LIMIT {max_nodes}
-    """
-    
-    # Get relationships from Neo4j
-    relationships_query = f"""
-    MATCH (a)-[r]->(b)
-    RETURN 
-        id(a) as source_id,
-        id(b) as target_id,
-        type(r) as relationship_type,
-        properties(r) as rel_properties
-    LIMIT {max_relationships}
-    """
+    print(f"🔄 Sampling a connected subgraph from Neo4j ({strategy})...")
     
     try:
-        nodes_result = graph.query(nodes_query)
-        relationships_result = graph.query(relationships_query)
+        nodes_result, valid_edges, report = sample_subgraph(
+            graph, strategy=strategy, max_nodes=max_nodes, max_relationships=max_relationships,
+            seeds=seeds, hops=hops, page_size=page_size,
+        )
         
-        print(f"✅ Retrieved {len(nodes_result)} nodes and {len(relationships_result)} relationships")
+        print(f"✅ Retrieved {report['nodes_kept']} nodes and {report['relationships_kept']} relationships "
+              f"({report['kept']} of {report['fetched']} fetched records kept, {report['pages']} pages)")
         
         if not nodes_result:
             print("❌ No nodes found in database")
@@ -45,9 +68,9 @@ def visualize_neo4j_graph(graph, max_nodes, max_relationships):
         
         # Build lookup for valid nodes (similar to your approach)
         node_dict = {}
-        for node_data in nodes_result:
-            node_id = str(node_data['node_id'])
-            labels = node_data['labels']
+        for node_id, node_data in nodes_result.items():
+            # Skip internal labels such as __Entity__ (added by the bulk loader)
+            labels = [l for l in node_data['labels'] if not l.startswith('__')]
             properties = node_data['properties']
             
             # Create a node object-like structure
@@ -57,44 +80,13 @@ def visualize_neo4j_graph(graph, max_nodes, max_relationships):
                 'neo4j_id': node_id,
                 'properties': properties
             }
-        
-        # Filter out invalid edges and collect valid node IDs (your same logic)
-        valid_edges = []
-        valid_node_ids = set()
-        
-        for rel_data in relationships_result:
-            source_id = str(rel_data['source_id'])
-            target_id = str(rel_data['target_id'])
-            
-            if source_id in node_dict and target_id in node_dict:
-                valid_edges.append({
-                    'source_id': source_id,
-                    'target_id': target_id,
-                    'type': rel_data['relationship_type'],
-                    'properties': rel_data.get('rel_properties', {})
-                })
-                valid_node_ids.update([source_id, target_id])
-        
-        print(f"📊 Valid edges: {len(valid_edges)}, Valid nodes: {len(valid_node_ids)}")
+        valid_node_ids = set(node_dict)
         
         # Add valid nodes (using your same approach)
         for node_id in valid_node_ids:
             node = node_dict[node_id]
             try:
-                # Color mapping for different node types
-                color_map = {
-                    'Concept': '#4ECDC4',
-                    'Person': '#FF6B6B', 
-                    'Research': '#FF8C94',
-                    'Technology': '#45B7D1',
-                    'Organization': '#96CEB4',
-                    'Publication': '#FFEAA7',
-                    'Method': '#DDA0DD',
-                    'Framework': '#98D8C8',
-                    'Document': '#A8E6CF'
-                }
-                
-                node_color = color_map.get(node['type'], '#CCCCCC')
+                node_color = COLOR_MAP.get(node['type'], '#CCCCCC')
                 
                 net.add_node(
                     node_id, 
@@ -112,8 +104,8 @@ def visualize_neo4j_graph(graph, max_nodes, max_relationships):
         for rel in valid_edges:
             try:
                 net.add_edge(
-                    rel['source_id'], 
-                    rel['target_id'], 
+                    rel['source'], 
+                    rel['target'], 
                     label=rel['type'].lower(),
                     title=f"Relationship: {rel['type']}",
                     color={'color': '#666666'},
@@ -157,6 +149,8 @@ def visualize_neo4j_graph(graph, max_nodes, max_relationships):
         return {
             'nodes_count': len(valid_node_ids),
             'relationships_count': len(valid_edges),
+            'fetched_records': report['fetched'],
+            'kept_records': report['kept'],
             'output_file': output_file
         }
         